@@ -1,13 +1,21 @@
 from django.contrib import admin
-from .models import AITrainingSession, NeuralModelState
+from .models import AITrainingSession, NeuralModelState, TrainingLogEntry
+
+class TrainingLogEntryInline(admin.TabularInline):
+    model = TrainingLogEntry
+    fields = ('created_at', 'level', 'epoch', 'message')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
 
 @admin.register(AITrainingSession)
 class AITrainingSessionAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'progress_percentage', 'current_accuracy', 'started_at')
     list_filter = ('status', 'started_at')
     search_fields = ('name',)
+    inlines = [TrainingLogEntryInline]
 
 @admin.register(NeuralModelState)
 class NeuralModelStateAdmin(admin.ModelAdmin):
-    list_display = ('version', 'accuracy', 'is_active', 'last_updated')
+    list_display = ('version', 'accuracy', 'is_active', 'checksum', 'last_updated')
     list_filter = ('is_active',)
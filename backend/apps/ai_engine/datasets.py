@@ -0,0 +1,388 @@
+import csv
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, get_worker_info
+from .recording import EEGRecording
+from .spectral import BANDPASS, NOTCH_FREQS, NOTCH_TRANS_BANDWIDTH, StreamingSpectralEngine
+
+# Bump when segment preprocessing changes in a way the parameters below do not capture
+SEGMENTS_VERSION = 4
+
+LABELS = {'normal': 0, 'abnormal': 1}
+
+# Model input: every recording is resampled to MODEL_SFREQ, so a window of
+# n_samples covers the same time at any recording rate, and the rows are the
+# 10-20 electrodes below in this order (old names; T7/T8/P7/P8 are accepted)
+MODEL_SFREQ = 250.0
+MODEL_CHANNELS = (
+    'FP1', 'FP2', 'F7', 'F3', 'F4', 'F8', 'T3', 'C3',
+    'C4', 'T4', 'T5', 'P3', 'P4', 'T6', 'O1', 'O2',
+)
+CHANNEL_ALIASES = {'T7': 'T3', 'T8': 'T4', 'P7': 'T5', 'P8': 'T6'}
+
+def electrode_name(label):
+    """'EEG Fp1-REF' -> 'FP1'"""
+    name = label.upper().replace('EEG', '', 1) if label.upper().startswith('EEG') else label.upper()
+    name = name.strip().split('-')[0].strip().rstrip('.')
+    return CHANNEL_ALIASES.get(name, name)
+
+def pick_channels(ch_names, n_channels):
+    """
+    Row of ``ch_names`` feeding each of the model's ``n_channels`` inputs, -1
+    for an electrode the recording lacks (zero-filled). Channels are matched
+    by 10-20 name; recordings with none of those names (or models wider than
+    the montage) fall back to the first ``n_channels`` channels in file order.
+    """
+    if n_channels <= len(MODEL_CHANNELS):
+        rows = {}
+        for i, label in enumerate(ch_names):
+            rows.setdefault(electrode_name(label), i)
+        picks = [rows.get(name, -1) for name in MODEL_CHANNELS[:n_channels]]
+        if any(row >= 0 for row in picks):
+            return picks
+    return [i if i < len(ch_names) else -1 for i in range(n_channels)]
+
+def resampled_length(n_times, sfreq, target=MODEL_SFREQ):
+    """Samples ``Resampler`` produces from ``n_times`` input samples."""
+    if sfreq == target or not n_times:
+        return int(n_times)
+    return int(np.floor((n_times - 1) * target / sfreq)) + 1
+
+class Resampler:
+    """
+    Streaming resampler from ``sfreq`` to ``target`` by linear interpolation.
+    Fed clinically filtered blocks, which carry nothing above the bandpass
+    edge, so no further anti-aliasing is needed for targets above ~2 x 90 Hz.
+    """
+
+    def __init__(self, sfreq, target=MODEL_SFREQ):
+        self.step = float(sfreq) / float(target)
+        self.identity = float(sfreq) == float(target)
+        self.received = 0   # input samples seen so far
+        self.produced = 0   # output samples emitted so far
+        self.last = None    # final input column of the previous block
+
+    def feed(self, block):
+        if self.identity:
+            return block
+        x = block if self.last is None else np.concatenate([self.last, block], axis=-1)
+        base = self.received - (0 if self.last is None else 1)
+        self.received += block.shape[-1]
+        self.last = block[:, -1:]
+        end = self.received - 1
+        # Output k sits at input position k * step (computed from k to avoid drift)
+        n_out = int(np.floor(end / self.step)) + 1 - self.produced
+        if n_out <= 0:
+            return x[:, :0]
+        t = (self.produced + np.arange(n_out)) * self.step - base
+        self.produced += n_out
+        i0 = np.minimum(np.floor(t).astype(np.int64), x.shape[-1] - 1)
+        i1 = np.minimum(i0 + 1, x.shape[-1] - 1)
+        frac = (t - i0).astype(x.dtype)
+        return x[:, i0] * (1 - frac) + x[:, i1] * frac
+
+def segment_windows(x, n_channels, n_samples, picks=None):
+    """
+    Cut filtered samples (channels x time) into non-overlapping model windows
+    (n_windows x n_channels x n_samples, float32). ``picks`` (see
+    ``pick_channels``) selects the row of each input, -1 leaving it zero; by
+    default the first ``n_channels`` channels are used. Each window is
+    z-scored per channel. Trailing samples that do not fill a window are dropped.
+    """
+    n_win = x.shape[-1] // n_samples
+    if picks is None:
+        picks = [i if i < x.shape[0] else -1 for i in range(n_channels)]
+    windows = np.zeros((n_win, n_channels, n_samples), dtype=np.float32)
+    for row, source in enumerate(picks):
+        if source >= 0:
+            windows[:, row] = x[source, :n_win * n_samples].reshape(n_win, n_samples)
+    windows -= windows.mean(axis=-1, keepdims=True)
+    std = windows.std(axis=-1, keepdims=True)
+    windows /= np.where(std > 0, std, 1)
+    return windows
+
+class WindowSegmenter:
+    """
+    Turns a recording's filtered blocks into model windows: channels picked by
+    name, resampled to ``MODEL_SFREQ``, cut into ``n_samples`` windows. Shared
+    by training (segment shards) and inference (``WindowScorer``).
+    """
+
+    def __init__(self, sfreq, ch_names, n_channels, n_samples):
+        self.n_channels = n_channels
+        self.n_samples = n_samples
+        self.picks = pick_channels(ch_names, n_channels)
+        used = sorted({row for row in self.picks if row >= 0})
+        # Only picked rows are resampled; picks are remapped onto them
+        self.rows = used
+        self.local_picks = [used.index(row) if row >= 0 else -1 for row in self.picks]
+        self.resampler = Resampler(sfreq)
+        self.carry = None
+
+    def feed(self, block):
+        """Windows completed by ``block`` (possibly none)."""
+        x = self.resampler.feed(block[self.rows] if self.rows else block[:0])
+        if self.carry is not None and self.carry.shape[-1]:
+            x = np.concatenate([self.carry, x], axis=-1)
+        used = x.shape[-1] // self.n_samples * self.n_samples
+        self.carry = x[:, used:]
+        return segment_windows(x[:, :used], self.n_channels, self.n_samples, self.local_picks)
+
+def iter_recording_windows(recording, n_channels, n_samples):
+    """Stream clinically filtered model windows of ``recording`` block by block."""
+    engine = StreamingSpectralEngine(recording)
+    segmenter = WindowSegmenter(recording.sfreq, recording.ch_names, n_channels, n_samples)
+    for _, block in engine.iter_filtered():
+        windows = segmenter.feed(block)
+        if len(windows):
+            yield windows
+
+def discover_recordings(root):
+    """
+    Labelled EDF files under ``root`` as ``(path, label)`` pairs.
+
+    Labels come from a ``labels.csv`` (columns ``file``, ``label``; file paths
+    relative to ``root``) when present, otherwise from the nearest parent
+    directory named ``normal`` or ``abnormal``. Unlabelled files are skipped.
+    """
+    explicit = {}
+    labels_csv = os.path.join(root, 'labels.csv')
+    if os.path.exists(labels_csv):
+        with open(labels_csv, newline='') as f:
+            for row in csv.DictReader(f):
+                label = row['label'].strip().lower()
+                explicit[os.path.normpath(row['file'].strip())] = LABELS.get(label, label)
+
+    recordings = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if not name.lower().endswith('.edf'):
+                continue
+            path = os.path.join(dirpath, name)
+            rel = os.path.normpath(os.path.relpath(path, root))
+            label = explicit.get(rel)
+            if label is None:
+                parts = [p.lower() for p in rel.split(os.sep)[:-1]]
+                label = next((LABELS[p] for p in reversed(parts) if p in LABELS), None)
+            if label is not None:
+                recordings.append((path, int(label)))
+    return sorted(recordings)
+
+def preprocessing_params(n_channels, n_samples):
+    """Everything that determines the content of a cached segment shard."""
+    return {
+        'version': SEGMENTS_VERSION,
+        'notch_freqs': NOTCH_FREQS.tolist(),
+        'notch_trans_bandwidth': NOTCH_TRANS_BANDWIDTH,
+        'bandpass': list(BANDPASS),
+        'n_channels': n_channels,
+        'n_samples': n_samples,
+        'sfreq': MODEL_SFREQ,
+        'resampling': 'linear',
+        'channels': list(MODEL_CHANNELS[:n_channels]) if n_channels <= len(MODEL_CHANNELS) else 'first',
+        'normalization': 'zscore-per-window-channel',
+    }
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+def _write_json(path, value):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+class SegmentCache:
+    """
+    Content-addressed store of preprocessed training windows.
+
+    Layout under ``root``::
+
+        segments/<params key>/<recording sha256>.npy   one shard per recording,
+                                                       (n_windows, n_channels, n_samples) float32
+        index/<dataset key>.json                       shards + labels of one dataset
+        hashes.json                                    sha256 memo keyed on path, size and mtime
+
+    The params key covers the filters, model rate and montage, window size
+    and normalization; the dataset key covers the params key and the content
+    hash + label of every recording. Shards are shared between datasets
+    containing the same file, and a repeated run (or a sweep over training
+    hyperparameters) finds its index and skips signal processing entirely.
+    """
+
+    def __init__(self, root, n_channels, n_samples):
+        self.root = str(root)
+        self.n_channels = n_channels
+        self.n_samples = n_samples
+        self.params = preprocessing_params(n_channels, n_samples)
+        self.params_key = _digest(self.params)[:16]
+        self.shard_dir = os.path.join(self.root, 'segments', self.params_key)
+        self.index_dir = os.path.join(self.root, 'index')
+        self.hashes_path = os.path.join(self.root, 'hashes.json')
+
+    def shard_path(self, sha256):
+        return os.path.join(self.shard_dir, sha256 + '.npy')
+
+    def build(self, recordings, workers=0, on_progress=None):
+        """
+        Return the ``SegmentIndex`` for ``recordings`` ((path, label) pairs),
+        preprocessing any recording whose shard is missing. Hashing and
+        filtering run in ``workers`` DataLoader processes, one recording per task.
+        """
+        os.makedirs(self.shard_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        memo = {}
+        if os.path.exists(self.hashes_path):
+            with open(self.hashes_path) as f:
+                memo = json.load(f)
+
+        builder = _ShardBuilder(self, recordings, memo)
+        loader = DataLoader(builder, batch_size=None, num_workers=min(workers, len(recordings)))
+        entries = []
+        for i, (sha256, n_windows, stat_key) in enumerate(loader):
+            path, label = recordings[i]
+            if sha256:
+                memo[stat_key] = sha256
+            if n_windows > 0:
+                entries.append({'sha256': sha256, 'label': label, 'n_windows': n_windows, 'source': path})
+            if on_progress:
+                on_progress(i + 1, len(recordings))
+        _write_json(self.hashes_path, memo)
+
+        entries.sort(key=lambda e: (e['sha256'], e['label']))
+        key = _digest([self.params_key] + [(e['sha256'], e['label']) for e in entries])
+        index_path = os.path.join(self.index_dir, key + '.json')
+        cached = os.path.exists(index_path)
+        if not cached:
+            _write_json(index_path, {
+                'key': key,
+                'params_key': self.params_key,
+                'params': self.params,
+                'shards': entries,
+            })
+        index = SegmentIndex(self, index_path)
+        index.cached = cached
+        return index
+
+    def preprocess(self, path, sha256):
+        """Filter and window ``path`` into its shard; returns the number of windows."""
+        shard = self.shard_path(sha256)
+        if os.path.exists(shard):
+            return len(np.load(shard, mmap_mode='r'))
+        recording = EEGRecording(path)
+        tmp = f"{shard}.{os.getpid()}.tmp"
+        # Windows are written straight to disk, never held for the whole recording
+        windows = np.lib.format.open_memmap(
+            tmp, mode='w+', dtype=np.float32,
+            shape=(resampled_length(recording.n_times, recording.sfreq) // self.n_samples, self.n_channels, self.n_samples),
+        )
+        try:
+            done = 0
+            for chunk in iter_recording_windows(recording, self.n_channels, self.n_samples):
+                windows[done:done + len(chunk)] = chunk
+                done += len(chunk)
+            windows.flush()
+            del windows
+            os.replace(tmp, shard)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return done
+
+class _ShardBuilder(Dataset):
+    """Item ``i`` hashes and preprocesses recording ``i``: ``(sha256, n_windows, stat key)``, -1 windows if unreadable."""
+
+    def __init__(self, cache, recordings, memo):
+        self.cache = cache
+        self.recordings = recordings
+        self.memo = memo
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def __getitem__(self, index):
+        path, _ = self.recordings[index]
+        try:
+            stat = os.stat(path)
+            stat_key = f"{os.path.realpath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+            sha256 = self.memo.get(stat_key)
+            if sha256 is None:
+                digest = hashlib.sha256()
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+                sha256 = digest.hexdigest()
+            return sha256, self.cache.preprocess(path, sha256), stat_key
+        except Exception as e:
+            print(f"Skipping unreadable recording {path}: {e}")
+            return '', -1, ''
+
+class SegmentIndex:
+    """A dataset's shards, memory-mapped read-only on first access."""
+
+    def __init__(self, cache, path):
+        with open(path) as f:
+            meta = json.load(f)
+        self.key = meta['key']
+        self.shards = [dict(entry, path=cache.shard_path(entry['sha256'])) for entry in meta['shards']]
+        self.cached = False
+
+    @property
+    def n_windows(self):
+        return sum(shard['n_windows'] for shard in self.shards)
+
+    def class_counts(self, n_classes=2):
+        counts = [0] * n_classes
+        for shard in self.shards:
+            counts[shard['label']] += shard['n_windows']
+        return counts
+
+class SegmentDataset(IterableDataset):
+    """
+    Yields ready-made ``(x, y)`` batches from memory-mapped shards, so
+    DataLoader workers only gather windows from disk (use ``batch_size=None``).
+
+    Every epoch draws a fresh global permutation of all windows (mixing
+    recordings and labels within each batch); each batch is gathered with one
+    sorted fancy index per shard it touches.
+    """
+
+    def __init__(self, shards, batch_size, shuffle=False, seed=0):
+        self.shards = list(shards)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        sizes = np.array([shard['n_windows'] for shard in self.shards], dtype=np.int64)
+        if not sizes.sum():
+            return
+        owner = np.repeat(np.arange(len(sizes)), sizes)
+        offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        order = np.arange(len(owner))
+        if self.shuffle:
+            # Same permutation in every worker; each takes its own batches from it
+            order = np.random.default_rng((self.seed, self.epoch)).permutation(len(owner))
+        batches = range(0, len(order), self.batch_size)
+        info = get_worker_info()
+        if info is not None:
+            batches = batches[info.id::info.num_workers]
+
+        arrays = {}
+        for start in batches:
+            picked = order[start:start + self.batch_size]
+            xs, ys = [], []
+            for s in np.unique(owner[picked]):
+                if s not in arrays:
+                    arrays[s] = np.load(self.shards[s]['path'], mmap_mode='r')
+                rows = np.sort(offset[picked[owner[picked] == s]])
+                xs.append(arrays[s][rows])
+                ys.append(np.full(len(rows), self.shards[s]['label'], dtype=np.int64))
+            yield torch.from_numpy(np.concatenate(xs)).unsqueeze(1), torch.from_numpy(np.concatenate(ys))
@@ -0,0 +1,67 @@
+EDF_HEADER_BYTES = 256
+EDF_SIGNAL_HEADER_BYTES = 256
+ANNOTATION_LABELS = ('EDF Annotations', 'BDF Annotations')
+
+# Per-signal header fields, stored field by field for all signals (EDF spec)
+_SIGNAL_FIELDS = (
+    ('label', 16), ('transducer', 80), ('physical_dimension', 8),
+    ('physical_min', 8), ('physical_max', 8), ('digital_min', 8), ('digital_max', 8),
+    ('prefiltering', 80), ('samples_per_record', 8), ('reserved', 32),
+)
+
+def _ascii(data):
+    return data.decode('ascii', errors='replace').strip()
+
+def read_edf_header(stream, size=None):
+    """
+    Parse an EDF/EDF+ header from the start of ``stream`` without touching
+    the samples. Returns ``(info, header_bytes)`` where ``header_bytes`` is
+    everything read, so a caller copying the stream can write it first.
+    ``size`` (total file size, if known) enables a truncation check.
+    Raises ValueError for anything that is not a readable EDF.
+    """
+    head = stream.read(EDF_HEADER_BYTES)
+    if len(head) < EDF_HEADER_BYTES:
+        raise ValueError("File too short for an EDF header")
+    if _ascii(head[0:8]) != '0':
+        raise ValueError("Not an EDF file (bad version field)")
+    try:
+        header_bytes = int(_ascii(head[184:192]))
+        n_records = int(_ascii(head[236:244]))
+        record_duration = float(_ascii(head[244:252]))
+        n_signals = int(_ascii(head[252:256]))
+    except ValueError:
+        raise ValueError("Malformed EDF header fields")
+    if n_signals <= 0 or header_bytes != EDF_HEADER_BYTES + n_signals * EDF_SIGNAL_HEADER_BYTES:
+        raise ValueError("Inconsistent EDF header size / signal count")
+
+    signal_head = stream.read(n_signals * EDF_SIGNAL_HEADER_BYTES)
+    if len(signal_head) < n_signals * EDF_SIGNAL_HEADER_BYTES:
+        raise ValueError("Truncated EDF signal headers")
+    fields, offset = {}, 0
+    for name, width in _SIGNAL_FIELDS:
+        fields[name] = [_ascii(signal_head[offset + i * width:offset + (i + 1) * width]) for i in range(n_signals)]
+        offset += n_signals * width
+    try:
+        samples = [int(v) for v in fields['samples_per_record']]
+    except ValueError:
+        raise ValueError("Malformed samples-per-record field")
+
+    channels = [i for i, label in enumerate(fields['label']) if label not in ANNOTATION_LABELS]
+    if not channels:
+        raise ValueError("EDF has no signal channels")
+    if record_duration <= 0:
+        raise ValueError("EDF record duration must be positive")
+    if size is not None and n_records > 0:
+        expected = header_bytes + n_records * sum(samples) * 2
+        if size < expected:
+            raise ValueError(f"EDF truncated: {size} of {expected} bytes")
+
+    info = {
+        'channels_count': len(channels),
+        'channel_names': [fields['label'][i] for i in channels],
+        'sampling_rate': max(samples[i] for i in channels) / record_duration,
+        'duration_seconds': n_records * record_duration if n_records > 0 else None,
+        'edf_plus': _ascii(head[192:236]).startswith('EDF+'),
+    }
+    return info, head + signal_head
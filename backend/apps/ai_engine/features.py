@@ -0,0 +1,113 @@
+import numpy as np
+
+FEATURES_VERSION = 1
+
+# Standard EEG Bands (inclusive edges, as in the original band averaging)
+BANDS = (
+    ('delta', 0.5, 4.0),
+    ('theta', 4.0, 8.0),
+    ('alpha', 8.0, 13.0),
+    ('beta', 13.0, 30.0),
+)
+
+# numerator bands / denominator bands, computed on integrated band power
+RATIOS = {
+    'theta_beta': (('theta',), ('beta',)),
+    'theta_alpha': (('theta',), ('alpha',)),
+    'delta_alpha': (('delta',), ('alpha',)),
+    'slow_fast': (('delta', 'theta'), ('alpha', 'beta')),
+}
+
+def band_masks(freqs, bands=BANDS):
+    """Boolean (n_bands, n_freqs) matrix selecting each band's frequency bins."""
+    return np.array([(freqs >= fmin) & (freqs <= fmax) for _, fmin, fmax in bands])
+
+def compute_band_features(psds, freqs, bands=BANDS):
+    """
+    All per-channel spectral features in one vectorized pass over ``psds``
+    (n_channels x n_freqs).
+
+    - ``absolute``: mean PSD inside each band (same quantity as the
+      ``*_power`` fields of ``SpectralResult``), shape (n_channels, n_bands)
+    - ``relative``: share of the analysed 0.5 - 40 Hz power in each band
+    - ``peak_frequency``: frequency of the largest PSD bin per channel
+    - ``ratios``: integrated band power ratios per channel (see ``RATIOS``)
+    """
+    masks = band_masks(freqs, bands).astype(psds.dtype)
+    counts = masks.sum(axis=1)
+    band_sum = psds @ masks.T                      # (n_channels, n_bands)
+    absolute = band_sum / np.where(counts > 0, counts, 1)
+    total = psds.sum(axis=1, keepdims=True)
+    relative = band_sum / np.where(total > 0, total, 1)
+    peak_frequency = freqs[np.argmax(psds, axis=1)]
+
+    names = [name for name, _, _ in bands]
+    ratios = {}
+    for key, (num, den) in RATIOS.items():
+        if not set(num + den) <= set(names):
+            continue
+        top = band_sum[:, [names.index(b) for b in num]].sum(axis=1)
+        bottom = band_sum[:, [names.index(b) for b in den]].sum(axis=1)
+        ratios[key] = top / np.where(bottom > 0, bottom, np.inf)
+
+    return {
+        'bands': names,
+        'absolute': absolute,
+        'relative': relative,
+        'peak_frequency': peak_frequency,
+        'ratios': ratios,
+        # Recording-level summary from the channel-averaged spectrum
+        'mean_absolute': absolute.mean(axis=0),
+        'dominant_frequency': float(freqs[np.argmax(psds.mean(axis=0))]),
+    }
+
+def _compact(values, digits=5):
+    """Round to significant digits so the JSON stays small."""
+    return np.vectorize(lambda v: float(f"{v:.{digits}g}"), otypes=[float])(values).tolist()
+
+def serialize_features(features, ch_names, bands=BANDS):
+    """Compact JSON representation persisted in ``SpectralResult.spectral_json``."""
+    return {
+        'version': FEATURES_VERSION,
+        'channels': list(ch_names),
+        'bands': [{'name': name, 'fmin': fmin, 'fmax': fmax} for name, fmin, fmax in bands],
+        'absolute': _compact(features['absolute']),
+        'relative': _compact(features['relative']),
+        'peak_frequency': _compact(features['peak_frequency']),
+        'ratios': {key: _compact(value) for key, value in features['ratios'].items()},
+        'dominant_frequency': features['dominant_frequency'],
+    }
+
+def select_features(stored, channels=None, bands=None):
+    """Slice stored features down to the requested channel / band names."""
+    ch_idx = list(range(len(stored['channels'])))
+    band_names = [band['name'] for band in stored['bands']]
+    band_idx = list(range(len(band_names)))
+    if channels:
+        requested = [c.strip() for c in channels.split(',')]
+        unknown = [c for c in requested if c not in stored['channels']]
+        if unknown:
+            raise ValueError(f"Unknown channels: {', '.join(unknown)}")
+        ch_idx = [stored['channels'].index(c) for c in requested]
+    if bands:
+        requested = [b.strip() for b in bands.split(',')]
+        unknown = [b for b in requested if b not in band_names]
+        if unknown:
+            raise ValueError(f"Unknown bands: {', '.join(unknown)}")
+        band_idx = [band_names.index(b) for b in requested]
+
+    def rows(values):
+        return [values[i] for i in ch_idx]
+
+    def matrix(values):
+        return [[values[i][j] for j in band_idx] for i in ch_idx]
+
+    return {
+        **stored,
+        'channels': rows(stored['channels']),
+        'bands': [stored['bands'][j] for j in band_idx],
+        'absolute': matrix(stored['absolute']),
+        'relative': matrix(stored['relative']),
+        'peak_frequency': rows(stored['peak_frequency']),
+        'ratios': {key: rows(value) for key, value in stored['ratios'].items()},
+    }
@@ -0,0 +1,127 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+import mne
+from scipy import signal
+
+class FIRFilter:
+    """
+    A zero-phase FIR filter applied block by block (overlap-save) in float32.
+
+    Interior blocks borrow ``half`` samples of context on each side; blocks at
+    the recording edges are padded with the same 'reflect_limited' mirroring
+    MNE uses, so the streamed output matches filtering the whole array at once.
+    Instances are immutable and shared between engines (see ``design_filter``).
+    """
+
+    def __init__(self, h, dtype=np.float32):
+        self.h = np.asarray(h, dtype=dtype)
+        self.h.setflags(write=False)
+        self.dtype = np.dtype(dtype)
+        self.half = (len(self.h) - 1) // 2
+
+    def apply(self, x, x_start, n_total, out_start, out_stop, n_jobs=1):
+        """
+        ``x`` holds input samples ``[x_start, x_start + x.shape[-1])`` and must
+        cover ``[out_start - half, out_stop + half]`` clipped to the recording.
+        Returns the filtered samples ``[out_start, out_stop)``. With ``n_jobs``
+        > 1 channel groups are convolved on a thread pool (the FFTs release the GIL).
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        m = self.half
+        if m == 0:
+            return x[:, out_start - x_start:out_stop - x_start] * self.h[0]
+        # Only the first block (x_start == 0) pads on the left, only the last on the right
+        n_left = max(m - out_start, 0)
+        n_right = max(out_stop + m - n_total, 0)
+        if n_left or n_right:
+            x = reflect_limited(x, n_left, n_right)
+            x_start -= n_left
+        x = x[:, out_start - m - x_start:out_stop + m - x_start]
+
+        if n_jobs <= 1:
+            return signal.oaconvolve(x, self.h[np.newaxis, :], mode='valid', axes=-1)
+        out = np.empty((x.shape[0], out_stop - out_start), dtype=self.dtype)
+
+        def run(rows):
+            out[rows] = signal.oaconvolve(x[rows], self.h[np.newaxis, :], mode='valid', axes=-1)
+
+        map_channels(run, x.shape[0], n_jobs)
+        return out
+
+def reflect_limited(x, n_left, n_right):
+    """
+    MNE's 'reflect_limited' edge padding: odd reflection about the first and
+    last samples, and zeros for whatever a recording shorter than the pad
+    cannot mirror.
+    """
+    k_left = min(n_left, x.shape[-1] - 1)
+    k_right = min(n_right, x.shape[-1] - 1)
+    zeros = lambda n: np.zeros((x.shape[0], n), dtype=x.dtype)
+    return np.concatenate([
+        zeros(n_left - k_left), 2 * x[:, :1] - x[:, k_left:0:-1],
+        x,
+        2 * x[:, -1:] - x[:, -2:-k_right - 2:-1], zeros(n_right - k_right),
+    ], axis=-1)
+
+@lru_cache(maxsize=32)
+def design_filter(sfreq, notch_freqs, notch_trans_bandwidth, bandpass):
+    """
+    One FIR kernel equivalent to ``raw.notch_filter(notch_freqs)`` followed by
+    ``raw.filter(*bandpass)``: both MNE 'firwin' designs convolved together, so
+    the signal is filtered in a single pass. Designed once per process for
+    each (sampling rate, band spec); arguments must be hashable.
+    """
+    nyquist = sfreq / 2.0
+    notch = np.array(notch_freqs, dtype=float)
+    notch = notch[notch + notch / 400.0 + notch_trans_bandwidth / 2.0 < nyquist]
+    kernels = []
+    if len(notch):
+        tb_2 = notch_trans_bandwidth / 2.0
+        widths = notch / 200.0
+        kernels.append(mne.filter.create_filter(
+            None, sfreq, l_freq=notch + widths / 2.0 + tb_2, h_freq=notch - widths / 2.0 - tb_2,
+            l_trans_bandwidth=tb_2, h_trans_bandwidth=tb_2,
+            fir_design='firwin', verbose=False,
+        ))
+
+    l_freq, h_freq = bandpass
+    if h_freq >= nyquist:
+        # Low sampling rates cannot carry a 70 Hz lowpass; keep the highpass only
+        h_freq = None
+    kernels.append(mne.filter.create_filter(None, sfreq, l_freq=l_freq, h_freq=h_freq, fir_design='firwin', verbose=False))
+
+    h = kernels[0]
+    for kernel in kernels[1:]:
+        h = np.convolve(h, kernel)
+    return FIRFilter(h)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def channel_pool(n_jobs):
+    """Process-wide thread pool with ``n_jobs`` workers (created on first use)."""
+    with _pools_lock:
+        if n_jobs not in _pools:
+            _pools[n_jobs] = ThreadPoolExecutor(max_workers=n_jobs, thread_name_prefix='eeg-filter')
+        return _pools[n_jobs]
+
+def resolve_n_jobs(n_jobs):
+    """``n_jobs`` <= 0 means one per CPU core."""
+    return n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+
+def map_channels(fn, n_rows, n_jobs):
+    """
+    Call ``fn(rows)`` for contiguous row slices covering ``n_rows`` channels,
+    on the ``n_jobs`` thread pool. Threads share the signal arrays, so nothing
+    is pickled or copied; ``fn`` writes its rows of a preallocated output.
+    """
+    n_groups = min(n_jobs, n_rows)
+    if n_groups < 2:
+        fn(slice(0, n_rows))
+        return
+    bounds = np.linspace(0, n_rows, n_groups + 1).astype(int)
+    # list() re-raises the first exception of any group
+    list(channel_pool(n_jobs).map(fn, [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]))
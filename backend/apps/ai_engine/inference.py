@@ -0,0 +1,196 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import torch
+from django.conf import settings
+from .datasets import WindowSegmenter
+from .models import NeuralModelState
+from .registry import ModelRegistry, weights_checksum
+from .runtimes import RUNTIMES, EagerRuntime, check_parity, softmax_scores
+from .trainer import EEGNetSmall
+
+class InferenceEngine:
+    """
+    An ``EEGNetSmall`` loaded once and kept resident for CPU inference.
+
+    The network input size (channels x samples) is read from the weights
+    themselves, so any checkpoint written from ``EEGNetSmall.state_dict()``
+    (optionally wrapped as ``{'state_dict': ...}``) can be served. ``weights``
+    is a path or raw bytes.
+
+    ``runtime`` ('eager', 'torchscript' or 'onnx', optionally int8-quantized)
+    selects the execution backend. Compiled artifacts are exported once per
+    weights checksum and must match eager scores within ``PARITY_TOLERANCE``;
+    otherwise the engine falls back to eager. Once a compiled runtime is in
+    use the eager model is dropped so only one copy of the weights stays resident.
+    """
+
+    def __init__(self, weights, version=None, batch_size=None, threads=None, runtime=None, int8=None):
+        config = settings.EEG_INFERENCE
+        self.version = version
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        threads = threads or config['THREADS']
+        if threads:
+            torch.set_num_threads(threads)
+
+        if isinstance(weights, (str, os.PathLike)):
+            with open(weights, 'rb') as f:
+                weights = f.read()
+        self.checksum = weights_checksum(weights)
+        state = torch.load(io.BytesIO(weights), map_location='cpu', weights_only=True)
+        state = state.get('state_dict', state)
+        # conv2 is a depthwise conv spanning all channels; fc sees 32 maps x n_samples
+        self.n_channels = state['conv2.weight'].shape[2]
+        self.n_samples = state['fc.weight'].shape[1] // 32
+        model = EEGNetSmall(n_channels=self.n_channels, n_samples=self.n_samples)
+        model.load_state_dict(state)
+        model.eval()
+
+        runtime = runtime or config['RUNTIME']
+        int8 = config['INT8'] if int8 is None else int8
+        self.runtime = self._load_runtime(model, runtime, int8, threads)
+        # What produced a score besides the weights (part of the stage cache key)
+        self.runtime_tag = f"{type(self.runtime).__name__}{'-int8' if int8 else ''}"
+
+    def _load_runtime(self, model, name, int8, threads):
+        if name not in RUNTIMES:
+            raise ValueError(f"Unknown inference runtime '{name}'")
+        if name == 'eager':
+            return EagerRuntime(model, int8=int8)
+        cls = RUNTIMES[name]
+        tag = f"{self.checksum[:16]}-{self.n_channels}x{self.n_samples}{'-int8' if int8 else ''}"
+        path = os.path.join(settings.EEG_INFERENCE['ARTIFACT_ROOT'], tag + cls.suffix)
+        try:
+            if not os.path.exists(path):
+                cls.export(model, self.n_channels, self.n_samples, path, int8=int8)
+            runtime = cls(path, threads=threads)
+            diff = check_parity(runtime, EagerRuntime(model), self.n_channels, self.n_samples)
+        except Exception as e:
+            print(f"Inference runtime '{name}' unavailable, using eager: {e}")
+            return EagerRuntime(model)
+        if diff > settings.EEG_INFERENCE['PARITY_TOLERANCE']:
+            print(f"Inference runtime '{name}' failed parity check (max score diff {diff:.2e}), using eager")
+            return EagerRuntime(model)
+        return runtime
+
+    def predict(self, windows):
+        """
+        Abnormal-class probability for each window of ``windows``
+        (n_windows x n_channels x n_samples), run in batches of ``batch_size``.
+        """
+        scores = np.empty(len(windows), dtype=np.float32)
+        for i in range(0, len(windows), self.batch_size):
+            batch = np.ascontiguousarray(windows[i:i + self.batch_size, np.newaxis], dtype=np.float32)
+            scores[i:i + len(batch)] = softmax_scores(self.runtime.run(batch))
+        return scores
+
+    def scorer(self, ch_names, sfreq):
+        return WindowScorer(self, ch_names, sfreq)
+
+class WindowScorer:
+    """
+    Streaming consumer (``feed(start, block)``) that cuts filtered blocks into
+    non-overlapping model windows and scores them a batch at a time.
+
+    Windows are prepared exactly as for training (see ``WindowSegmenter``:
+    same montage, same rate), so scores do not depend on the recording's
+    sampling rate, channel order, amplifier gain or units.
+    """
+
+    def __init__(self, engine, ch_names, sfreq):
+        self.engine = engine
+        self.segmenter = WindowSegmenter(sfreq, ch_names, engine.n_channels, engine.n_samples)
+        self.pending = []
+        self.pending_windows = 0
+        self.scores = []
+        self.elapsed = 0.0
+
+    def feed(self, start, block):
+        windows = self.segmenter.feed(block)
+        if len(windows):
+            self.pending.append(windows)
+            self.pending_windows += len(windows)
+        if self.pending_windows >= self.engine.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        windows = np.concatenate(self.pending) if len(self.pending) > 1 else self.pending[0]
+        self.pending = []
+        self.pending_windows = 0
+        started = time.perf_counter()
+        self.scores.append(self.engine.predict(windows))
+        self.elapsed += time.perf_counter() - started
+
+    def window_scores(self):
+        """Scores of every complete window fed so far."""
+        self._flush()
+        return np.concatenate(self.scores) if self.scores else np.empty(0, np.float32)
+
+    def result(self):
+        return aggregate_scores(self.window_scores(), self.engine.version, self.elapsed)
+
+def aggregate_scores(scores, model_version, elapsed=None):
+    """
+    Aggregate window scores. The recording-level probability is the mean of
+    the top decile of windows: abnormal activity is usually focal in time,
+    so a plain mean over hours of normal EEG would wash it out.
+    """
+    if not len(scores):
+        return None
+    top = np.sort(scores)[-max(1, len(scores) // 10):]
+    return {
+        'probability': float(top.mean()),
+        'mean_score': float(scores.mean()),
+        'max_score': float(scores.max()),
+        'n_windows': int(len(scores)),
+        'windows_per_second': float(len(scores) / elapsed) if elapsed else None,
+        'model_version': model_version,
+    }
+
+class _ModelCache:
+    """
+    Per-process LRU of loaded engines keyed on model version and checksum.
+    Switching back to a recently used version costs no reload.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, state):
+        key = (state.version, state.checksum or state.weights_file.name)
+        with self._lock:
+            engine = self._entries.get(key)
+            if engine is not None:
+                self._entries.move_to_end(key)
+                return engine
+        # Load outside the lock; a concurrent miss on the same version only costs a duplicate load
+        engine = InferenceEngine(ModelRegistry.read_weights(state), version=state.version)
+        with self._lock:
+            self._entries[key] = engine
+            while len(self._entries) > settings.EEG_INFERENCE['CACHE_SIZE']:
+                self._entries.popitem(last=False)
+        return engine
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = _ModelCache()
+
+def get_engine():
+    """
+    The engine for the currently active ``NeuralModelState`` (None when no
+    active model has weights). Looked up per analysis, so activating another
+    version swaps every worker over on its next analysis; an analysis keeps
+    the engine it started with.
+    """
+    state = NeuralModelState.objects.filter(is_active=True).exclude(weights_file='').exclude(weights_file=None).first()
+    if state is None or not state.weights_file.storage.exists(state.weights_file.name):
+        return None
+    return _cache.get(state)
@@ -0,0 +1,87 @@
+import time
+import mne
+import numpy as np
+from django.core.management.base import BaseCommand
+from apps.ai_engine.filterbank import FIRFilter, design_filter
+from apps.ai_engine.recording import EEGRecording
+from apps.ai_engine.spectral import BANDPASS, NOTCH_FREQS, NOTCH_TRANS_BANDWIDTH
+
+class Command(BaseCommand):
+    help = (
+        "Compare clinical filtering (50 Hz notch harmonics + 0.5 - 70 Hz bandpass) through "
+        "MNE's raw.notch_filter / raw.filter against the single-pass float32 filter bank."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edf', help="Recording to filter (default: synthetic noise).")
+        parser.add_argument('--channels', type=int, default=64)
+        parser.add_argument('--seconds', type=float, default=600)
+        parser.add_argument('--sfreq', type=float, default=256)
+        parser.add_argument('--n-jobs', type=int, action='append', help="Channel threads to try (repeatable, default 1).")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['edf']:
+            recording = EEGRecording(options['edf'])
+            data, sfreq = recording.get_data(), recording.sfreq
+        else:
+            sfreq = options['sfreq']
+            rng = np.random.default_rng(0)
+            data = rng.standard_normal((options['channels'], int(options['seconds'] * sfreq))) * 1e-5
+        n_ch, n_times = data.shape
+        notch = NOTCH_FREQS[NOTCH_FREQS + NOTCH_FREQS / 400.0 + NOTCH_TRANS_BANDWIDTH / 2.0 < sfreq / 2]
+        l_freq, h_freq = BANDPASS
+        h_freq = h_freq if h_freq < sfreq / 2 else None
+        self.stdout.write(f"{n_ch} channels x {n_times / sfreq:.0f} s at {sfreq:g} Hz")
+
+        def mne_path():
+            # What the pipeline used to do: filters designed on every call, two full passes
+            raw = mne.io.RawArray(data.copy(), mne.create_info(n_ch, sfreq, 'eeg'), verbose=False)
+            if len(notch):
+                raw.notch_filter(notch, trans_bandwidth=NOTCH_TRANS_BANDWIDTH, verbose=False)
+            raw.filter(l_freq, h_freq, verbose=False)
+            return raw.get_data()
+
+        def bank_path(n_jobs):
+            bank = design_filter(float(sfreq), tuple(NOTCH_FREQS.tolist()), NOTCH_TRANS_BANDWIDTH, tuple(BANDPASS))
+            return bank.apply(data, 0, n_times, 0, n_times, n_jobs=n_jobs)
+
+        reference, mne_time = self.measure(mne_path, options['repeat'])
+        self.report('mne notch + bandpass (float64, 2 passes)', mne_time, n_ch, n_times, sfreq)
+
+        started = time.perf_counter()
+        design_filter.cache_clear()
+        bank = design_filter(float(sfreq), tuple(NOTCH_FREQS.tolist()), NOTCH_TRANS_BANDWIDTH, tuple(BANDPASS))
+        self.stdout.write(f"  filter bank design: {(time.perf_counter() - started) * 1000:.1f} ms once, {len(bank.h)} taps")
+
+        # Same combined kernel in float64, to separate the single-pass gain from the float32 gain
+        wide = FIRFilter(bank.h, dtype=np.float64)
+        _, elapsed = self.measure(lambda: wide.apply(data, 0, n_times, 0, n_times), options['repeat'])
+        self.report('filter bank (float64, 1 pass)', elapsed, n_ch, n_times, sfreq, mne_time)
+
+        # Edges differ slightly (padding is applied once instead of per filter); compare the interior
+        interior = slice(bank.half, n_times - bank.half)
+        scale = np.abs(reference[:, interior]).max() or 1.0
+        for n_jobs in options['n_jobs'] or [1]:
+            out, elapsed = self.measure(lambda: bank_path(n_jobs), options['repeat'])
+            error = np.abs(out[:, interior] - reference[:, interior]).max() / scale
+            self.report(
+                f"filter bank (float32, 1 pass, {n_jobs} thread(s))", elapsed, n_ch, n_times, sfreq, mne_time,
+                f", max interior error {error:.1e} of peak",
+            )
+
+    def measure(self, fn, repeat):
+        best, out = None, None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            out = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return out, best
+
+    def report(self, label, elapsed, n_ch, n_times, sfreq, baseline=None, extra=''):
+        speedup = f", {baseline / elapsed:.1f}x" if baseline else ''
+        self.stdout.write(
+            f"  {label}: {elapsed * 1000:.0f} ms, "
+            f"{n_ch * n_times / sfreq / elapsed / 3600:.0f} channel-hours/s{speedup}{extra}"
+        )
@@ -0,0 +1,70 @@
+import time
+import numpy as np
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai_engine.inference import InferenceEngine
+from apps.ai_engine.models import NeuralModelState
+from apps.ai_engine.registry import ModelRegistry
+from apps.ai_engine.runtimes import RUNTIMES
+
+class Command(BaseCommand):
+    help = "Measure CPU inference throughput (windows/sec) and latency of the active EEGNetSmall model."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weights', help="Weights file to load instead of the active model.")
+        parser.add_argument('--windows', type=int, default=4096, help="Number of synthetic windows to score.")
+        parser.add_argument('--batch-size', type=int, default=settings.EEG_INFERENCE['BATCH_SIZE'])
+        parser.add_argument(
+            '--threads', type=int, default=settings.EEG_INFERENCE['THREADS'],
+            help="torch / ONNX Runtime intra-op threads (0 = library default).",
+        )
+        parser.add_argument(
+            '--runtime', action='append', choices=sorted(RUNTIMES),
+            help="Runtime(s) to compare (repeatable, default: the configured one).",
+        )
+        parser.add_argument('--int8', action='store_true', help="Use dynamic int8 quantization.")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['weights']:
+            with open(options['weights'], 'rb') as f:
+                weights = f.read()
+        else:
+            state = NeuralModelState.objects.filter(is_active=True).exclude(weights_file='').exclude(weights_file=None).first()
+            if state is None:
+                raise CommandError("No active model with a weights file; pass --weights")
+            weights = ModelRegistry.read_weights(state)
+
+        for runtime in options['runtime'] or [settings.EEG_INFERENCE['RUNTIME']]:
+            engine = InferenceEngine(
+                weights, batch_size=options['batch_size'], threads=options['threads'],
+                runtime=runtime, int8=options['int8'],
+            )
+            self.report(engine, runtime, options)
+
+    def report(self, engine, runtime, options):
+        rng = np.random.default_rng(0)
+        windows = rng.standard_normal((options['windows'], engine.n_channels, engine.n_samples), dtype=np.float32)
+        engine.predict(windows[:engine.batch_size])  # warm-up
+
+        best = None
+        for _ in range(max(1, options['repeat'])):
+            started = time.perf_counter()
+            engine.predict(windows)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Single-window latency, as seen by a short recording
+        single = windows[:1]
+        started = time.perf_counter()
+        for _ in range(100):
+            engine.predict(single)
+        latency = (time.perf_counter() - started) / 100
+
+        self.stdout.write(
+            f"{runtime}{' int8' if options['int8'] else ''} (using {engine.runtime.name}): "
+            f"{engine.n_channels} ch x {engine.n_samples} samples, batch {engine.batch_size}, "
+            f"{torch.get_num_threads()} thread(s): {len(windows) / best:.0f} windows/sec, "
+            f"{latency * 1000:.2f} ms/window unbatched"
+        )
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Must stay out of web processes; compute paths import them on first use
+HEAVY_MODULES = ('torch', 'mne', 'scipy', 'pandas', 'kagglehub', 'onnxruntime', 'sklearn', 'matplotlib')
+
+# Runs in a fresh interpreter: what a web worker pays before serving its first request
+PROBE = f'''
+import json, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+seconds = time.perf_counter() - started
+# ru_maxrss is in KiB on Linux
+print(json.dumps({{
+    'seconds': seconds,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+'''
+
+class Command(BaseCommand):
+    help = (
+        "Start a web process (settings, apps, WSGI handler, URLconf with every view) in a "
+        "fresh interpreter and fail if its import time or peak RSS exceeds the budget, or "
+        "if it imports torch / mne / scipy / pandas or other compute-only dependencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-seconds', type=float, default=1.5)
+        parser.add_argument('--max-rss-mb', type=float, default=150)
+        parser.add_argument('--repeat', type=int, default=3, help="Runs; the fastest counts (warm disk cache).")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')}
+        runs = []
+        for _ in range(max(1, options['repeat'])):
+            result = subprocess.run(
+                [sys.executable, '-c', PROBE], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise CommandError(f"Web process failed to start:\n{result.stderr}")
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        seconds = min(run['seconds'] for run in runs)
+        rss_mb = min(run['rss_mb'] for run in runs)
+        heavy = sorted({name for run in runs for name in run['heavy']})
+        self.stdout.write(
+            f"Web process startup: {seconds:.2f} s (budget {options['max_seconds']:g} s), "
+            f"peak RSS {rss_mb:.0f} MB (budget {options['max_rss_mb']:g} MB)"
+        )
+        problems = []
+        if heavy:
+            problems.append(f"imports compute-only modules: {', '.join(heavy)}")
+        if seconds > options['max_seconds']:
+            problems.append(f"startup {seconds:.2f} s over budget")
+        if rss_mb > options['max_rss_mb']:
+            problems.append(f"peak RSS {rss_mb:.0f} MB over budget")
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Within budget"))
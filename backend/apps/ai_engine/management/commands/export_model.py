@@ -0,0 +1,34 @@
+import io
+import torch
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai_engine.models import NeuralModelState
+from apps.ai_engine.registry import ModelRegistry
+from apps.ai_engine.runtimes import RUNTIMES, EagerRuntime, check_parity
+from apps.ai_engine.trainer import EEGNetSmall
+
+class Command(BaseCommand):
+    help = "Export a registered EEGNetSmall model to TorchScript or ONNX for CPU-only inference nodes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', help="NeuralModelState version to export.")
+        parser.add_argument('output', help="Destination file.")
+        parser.add_argument('--format', choices=['torchscript', 'onnx'], default='onnx')
+        parser.add_argument('--int8', action='store_true', help="Apply dynamic int8 quantization.")
+
+    def handle(self, *args, **options):
+        state = NeuralModelState.objects.filter(version=options['version']).first()
+        if state is None or not state.weights_file:
+            raise CommandError(f"Model {options['version']} not found or has no weights")
+
+        weights = torch.load(io.BytesIO(ModelRegistry.read_weights(state)), map_location='cpu', weights_only=True)
+        weights = weights.get('state_dict', weights)
+        n_channels = weights['conv2.weight'].shape[2]
+        n_samples = weights['fc.weight'].shape[1] // 32
+        model = EEGNetSmall(n_channels=n_channels, n_samples=n_samples)
+        model.load_state_dict(weights)
+        model.eval()
+
+        runtime = RUNTIMES[options['format']]
+        runtime.export(model, n_channels, n_samples, options['output'], int8=options['int8'])
+        diff = check_parity(runtime(options['output']), EagerRuntime(model), n_channels, n_samples)
+        self.stdout.write(f"Exported {state.version} to {options['output']} (max score diff vs eager: {diff:.2e})")
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.ai_engine.datasets import MODEL_CHANNELS
+
+PHYSICAL_RANGE = 500.0  # uV
+DIGITAL_RANGE = 32767
+
+def _field(value, width):
+    return str(value)[:width].ljust(width).encode('ascii')
+
+def write_edf(path, data, sfreq):
+    """Write ``data`` (channels x samples, uV) as a plain 16-bit EDF with 1 s records."""
+    n_ch, n_times = data.shape
+    per_record = int(sfreq)
+    n_records = n_times // per_record
+    # 10-20 names so the model's montage picks them up (see datasets.MODEL_CHANNELS)
+    labels = [f'EEG {MODEL_CHANNELS[i]}-REF' if i < len(MODEL_CHANNELS) else f'EEG{i:02d}' for i in range(n_ch)]
+
+    header = b''.join([
+        _field('0', 8), _field('X X X X', 80), _field('Startdate X X X X', 80),
+        _field('01.01.85', 8), _field('00.00.00', 8), _field(256 * (n_ch + 1), 8),
+        _field('', 44), _field(n_records, 8), _field(1, 8), _field(n_ch, 4),
+    ])
+    header += b''.join(_field(label, 16) for label in labels)
+    header += _field('', 80) * n_ch
+    header += _field('uV', 8) * n_ch
+    header += _field(-PHYSICAL_RANGE, 8) * n_ch
+    header += _field(PHYSICAL_RANGE, 8) * n_ch
+    header += _field(-DIGITAL_RANGE, 8) * n_ch
+    header += _field(DIGITAL_RANGE, 8) * n_ch
+    header += _field('', 80) * n_ch
+    header += _field(per_record, 8) * n_ch
+    header += _field('', 32) * n_ch
+
+    digital = np.clip(np.round(data * DIGITAL_RANGE / PHYSICAL_RANGE), -DIGITAL_RANGE, DIGITAL_RANGE)
+    # Records are stored channel after channel: (records, channels, samples per record)
+    records = digital[:, :n_records * per_record].reshape(n_ch, n_records, per_record).transpose(1, 0, 2)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(records.astype('<i2').tobytes())
+
+def synthetic_eeg(rng, n_ch, n_times, sfreq, abnormal):
+    t = np.arange(n_times) / sfreq
+    # Background: pink-ish noise plus a posterior alpha rhythm
+    noise = np.cumsum(rng.standard_normal((n_ch, n_times)), axis=1)
+    noise -= np.linspace(noise[:, :1], noise[:, -1:], n_times, axis=1).squeeze(-1)
+    data = 5.0 * noise / noise.std(axis=1, keepdims=True)
+    data += 20.0 * np.sin(2 * np.pi * rng.uniform(9, 11) * t + rng.uniform(0, 2 * np.pi, (n_ch, 1)))
+    if abnormal:
+        # Diffuse delta slowing and periodic sharp discharges
+        data += 40.0 * np.sin(2 * np.pi * rng.uniform(1.5, 3) * t + rng.uniform(0, 2 * np.pi, (n_ch, 1)))
+        spike = 150.0 * np.exp(-0.5 * ((np.arange(-25, 26) / sfreq) / 0.015) ** 2)
+        for start in range(int(sfreq), n_times - len(spike), int(rng.uniform(2, 4) * sfreq)):
+            data[:, start:start + len(spike)] -= spike
+    return data
+
+class Command(BaseCommand):
+    help = (
+        "Write a synthetic labelled EDF dataset (normal/ and abnormal/ folders) under "
+        "datasets/<name> for trying out local training runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', default='demo')
+        parser.add_argument('--recordings', type=int, default=10, help="Recordings per class.")
+        parser.add_argument('--channels', type=int, default=16)
+        parser.add_argument('--seconds', type=int, default=120)
+        parser.add_argument('--sfreq', type=int, default=250)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        root = os.path.join(settings.BASE_DIR, 'datasets', options['name'])
+        n_times = options['seconds'] * options['sfreq']
+        for label in ('normal', 'abnormal'):
+            folder = os.path.join(root, label)
+            os.makedirs(folder, exist_ok=True)
+            for i in range(options['recordings']):
+                data = synthetic_eeg(rng, options['channels'], n_times, options['sfreq'], label == 'abnormal')
+                write_edf(os.path.join(folder, f'r{i}.edf'), data, options['sfreq'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {2 * options['recordings']} recordings to {root} (dataset source '{options['name']}')"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0002_aitrainingsession_dataset_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='neuralmodelstate',
+            name='checksum',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
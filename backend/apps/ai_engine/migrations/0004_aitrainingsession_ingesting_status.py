@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0003_neuralmodelstate_checksum'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aitrainingsession',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Dataset'), ('downloading', 'Downloading from Kaggle'), ('ingesting', 'Extracting Uploaded Dataset'), ('preprocessing', 'Preprocessing Clinical Data'), ('training', 'Deep Learning Active'), ('completed', 'Training Successful'), ('failed', 'Training Failed')], default='pending', max_length=20),
+        ),
+    ]
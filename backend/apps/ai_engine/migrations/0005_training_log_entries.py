@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def split_logs(apps, schema_editor):
+    """Each non-empty line of the old ``logs`` text becomes one entry."""
+    AITrainingSession = apps.get_model('ai_engine', 'AITrainingSession')
+    TrainingLogEntry = apps.get_model('ai_engine', 'TrainingLogEntry')
+    for session in AITrainingSession.objects.exclude(logs__isnull=True).exclude(logs='').iterator():
+        TrainingLogEntry.objects.bulk_create(
+            [TrainingLogEntry(session=session, message=line) for line in session.logs.splitlines() if line.strip()],
+            batch_size=500,
+        )
+
+def join_logs(apps, schema_editor):
+    AITrainingSession = apps.get_model('ai_engine', 'AITrainingSession')
+    TrainingLogEntry = apps.get_model('ai_engine', 'TrainingLogEntry')
+    for session in AITrainingSession.objects.iterator():
+        messages = TrainingLogEntry.objects.filter(session=session).order_by('id').values_list('message', flat=True)
+        session.logs = ''.join(f"{message}\n" for message in messages)
+        session.save(update_fields=['logs'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0004_aitrainingsession_ingesting_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('info', 'Info'), ('error', 'Error')], default='info', max_length=10)),
+                ('message', models.TextField()),
+                ('epoch', models.IntegerField(blank=True, null=True)),
+                ('metrics', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='ai_engine.aitrainingsession')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['session', 'id'], name='ai_engine_t_session_2febb5_idx')],
+            },
+        ),
+        migrations.RunPython(split_logs, join_logs),
+        migrations.RemoveField(
+            model_name='aitrainingsession',
+            name='logs',
+        ),
+    ]
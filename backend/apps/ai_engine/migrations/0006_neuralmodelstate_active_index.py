@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0005_training_log_entries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='neuralmodelstate',
+            index=models.Index(fields=['is_active'], name='ai_engine_n_is_acti_2bf735_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ class AITrainingSession(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending Dataset'),
         ('downloading', 'Downloading from Kaggle'),
+        ('ingesting', 'Extracting Uploaded Dataset'),
         ('preprocessing', 'Preprocessing Clinical Data'),
         ('training', 'Deep Learning Active'),
         ('completed', 'Training Successful'),
@@ -32,7 +33,6 @@ class AITrainingSession(models.Model):
     
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
-    logs = models.TextField(null=True, blank=True)
 
     class Meta:
         ordering = ['-started_at']
@@ -40,12 +40,50 @@ class AITrainingSession(models.Model):
     def __str__(self):
         return f"{self.name} - {self.status}"
 
+    def append_log(self, message, level='info', epoch=None, **metrics):
+        """Append one log entry; the session row itself is not rewritten."""
+        return TrainingLogEntry.objects.create(
+            session=self, message=message.rstrip('\n'), level=level, epoch=epoch, metrics=metrics or None,
+        )
+
+    def update_progress(self, **fields):
+        """Set ``fields`` and write only those columns."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.save(update_fields=list(fields))
+
+class TrainingLogEntry(models.Model):
+    """One line of a training session's append-only log, with metrics for epoch summaries."""
+    LEVEL_CHOICES = (
+        ('info', 'Info'),
+        ('error', 'Error'),
+    )
+
+    session = models.ForeignKey(AITrainingSession, on_delete=models.CASCADE, related_name='log_entries')
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='info')
+    message = models.TextField()
+    epoch = models.IntegerField(null=True, blank=True)
+    metrics = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['session', 'id'])]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.id}: {self.message[:50]}"
+
 class NeuralModelState(models.Model):
     version = models.CharField(max_length=20, unique=True)
     accuracy = models.FloatField()
     is_active = models.BooleanField(default=False)
     weights_file = models.FileField(upload_to='models/weights/', null=True, blank=True)
+    checksum = models.CharField(max_length=64, blank=True, default='') # sha256 of weights_file
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # The active model is looked up on every analysis
+        indexes = [models.Index(fields=['is_active'])]
+
     def __str__(self):
         return f"Neural Model {self.version} ({self.accuracy * 100:.2f}%)"
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+PYRAMID_FORMAT_VERSION = 2
+FACTOR = 4              # samples per bucket grow by this factor per level
+TOP_LEVEL_BUCKETS = 2048  # stop adding levels once a level is this coarse
+CASCADE_SPAN = 1 << 18  # buckets processed at a time while building coarser levels
+
+def minmax_decimate(x, bucket):
+    """Per-bucket (min, max) of ``x`` (channels x samples); the last bucket may be partial."""
+    n_full = x.shape[-1] // bucket
+    head = x[:, :n_full * bucket].reshape(x.shape[0], n_full, bucket)
+    out = np.stack([head.min(axis=-1), head.max(axis=-1)], axis=-1)
+    if x.shape[-1] % bucket:
+        tail = x[:, n_full * bucket:]
+        out = np.concatenate([out, np.stack([tail.min(axis=-1), tail.max(axis=-1)], axis=-1)[:, None]], axis=1)
+    return out
+
+def _merge_minmax(env, factor):
+    """Combine groups of ``factor`` (min, max) buckets into coarser ones."""
+    n_full = env.shape[1] // factor
+    head = env[:, :n_full * factor].reshape(env.shape[0], n_full, factor, 2)
+    out = np.stack([head[..., 0].min(axis=-1), head[..., 1].max(axis=-1)], axis=-1)
+    if env.shape[1] % factor:
+        tail = env[:, n_full * factor:]
+        out = np.concatenate([out, np.stack([tail[..., 0].min(axis=-1), tail[..., 1].max(axis=-1)], axis=-1)[:, None]], axis=1)
+    return out
+
+def interleave_minmax(env):
+    """(channels, buckets, 2) -> (channels, 2 * buckets) polyline that keeps every peak."""
+    return env.reshape(env.shape[0], -1)
+
+class PyramidBuilder:
+    """
+    Writes a multi-resolution signal pyramid while raw blocks stream past.
+
+    Level 0 holds the samples as the EDF's own 16-bit values, with each
+    channel's ``scale`` and ``offset`` to volts in the metadata (half the size
+    of float32, and lossless); level k holds (min, max) envelopes of
+    ``FACTOR ** k`` sample buckets in the same units. Every level is a plain
+    ``.npy`` file so it can be memory-mapped by the web process. A published
+    pyramid is never rewritten; builds work in a private temporary directory.
+    """
+
+    def __init__(self, recording, directory):
+        self.directory = str(directory)
+        self.sfreq = float(recording.sfreq)
+        self.n_times = int(recording.n_times)
+        self.ch_names = list(recording.ch_names)
+        scale, offset = recording.sample_scaling()
+        self.scale = np.where(scale == 0, 1.0, scale)
+        self.offset = offset
+        self.received = 0
+
+        parent, name = os.path.split(self.directory)
+        os.makedirs(parent, exist_ok=True)
+        self.tmp_directory = tempfile.mkdtemp(prefix=name + '.', suffix='.tmp', dir=parent)
+        self.level0 = np.lib.format.open_memmap(
+            os.path.join(self.tmp_directory, 'level0.npy'), mode='w+',
+            dtype=np.int16, shape=(len(self.ch_names), self.n_times),
+        )
+
+    @property
+    def complete(self):
+        return self.received >= self.n_times
+
+    def feed(self, start, block):
+        digital = np.rint((block - self.offset[:, None]) / self.scale[:, None])
+        np.clip(digital, -32768, 32767, out=digital)
+        self.level0[:, start:start + block.shape[-1]] = digital
+        self.received = max(self.received, start + block.shape[-1])
+
+    def finish(self):
+        """
+        Build the coarser levels from level 0 and atomically publish the
+        pyramid, unless a concurrent build of the same directory already did.
+        """
+        if not self.complete:
+            raise ValueError(f"Pyramid incomplete: {self.received}/{self.n_times} samples")
+        self.level0.flush()
+        levels = [{'level': 0, 'bucket': 1, 'n': self.n_times}]
+        prev, out, bucket = self.level0, None, 1
+        while prev.shape[1] > TOP_LEVEL_BUCKETS:
+            bucket *= FACTOR
+            n = -(-self.n_times // bucket)
+            level = len(levels)
+            out = np.lib.format.open_memmap(
+                os.path.join(self.tmp_directory, f'level{level}.npy'), mode='w+',
+                dtype=np.int16, shape=(len(self.ch_names), n, 2),
+            )
+            # Work through the previous level in bounded spans to cap memory
+            span = CASCADE_SPAN - CASCADE_SPAN % FACTOR
+            for i in range(0, prev.shape[1], span):
+                part = prev[:, i:i + span]
+                merged = minmax_decimate(part, FACTOR) if level == 1 else _merge_minmax(part, FACTOR)
+                out[:, i // FACTOR:i // FACTOR + merged.shape[1]] = merged
+            out.flush()
+            levels.append({'level': level, 'bucket': bucket, 'n': n})
+            prev = out
+
+        meta = {
+            'version': PYRAMID_FORMAT_VERSION,
+            'sfreq': self.sfreq,
+            'n_times': self.n_times,
+            'ch_names': self.ch_names,
+            'scale': self.scale.tolist(),
+            'offset': self.offset.tolist(),
+            'factor': FACTOR,
+            'levels': levels,
+        }
+        with open(os.path.join(self.tmp_directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        # Drop the memmaps before moving the directory (required on Windows)
+        self.level0 = prev = out = None
+        try:
+            os.replace(self.tmp_directory, self.directory)
+        except OSError:
+            if not SignalPyramid.exists(self.directory):
+                raise
+            shutil.rmtree(self.tmp_directory, ignore_errors=True)
+
+    def abort(self):
+        self.level0 = None
+        shutil.rmtree(self.tmp_directory, ignore_errors=True)
+
+def build_pyramid(recording, directory, chunk_seconds=60):
+    """Standalone pyramid build for recordings processed before pyramids existed."""
+    builder = PyramidBuilder(recording, directory)
+    step = max(1, int(chunk_seconds * recording.sfreq))
+    try:
+        for start in range(0, recording.n_times, step):
+            builder.feed(start, recording.read(start, min(start + step, recording.n_times)))
+        builder.finish()
+    except Exception:
+        builder.abort()
+        raise
+
+def query_recording(recording, start, stop, picks, max_points):
+    """Same contract as ``SignalPyramid.query`` but decoded from the EDF itself."""
+    x = recording.read(start, stop)[picks].astype(np.float32)
+    if x.shape[-1] <= max_points:
+        return x, start / recording.sfreq, 1.0 / recording.sfreq, 'raw'
+    bucket = -(-x.shape[-1] // max(1, max_points // 2))
+    return (
+        interleave_minmax(minmax_decimate(x, bucket)),
+        start / recording.sfreq, bucket / (2.0 * recording.sfreq), 'minmax',
+    )
+
+class SignalPyramid:
+    """Read side of a pyramid: answers viewport queries from memory-mapped levels."""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        with open(os.path.join(self.directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != PYRAMID_FORMAT_VERSION:
+            raise ValueError("Unsupported pyramid format")
+        self.sfreq = self.meta['sfreq']
+        self.n_times = self.meta['n_times']
+        self.ch_names = self.meta['ch_names']
+        self.levels = self.meta['levels']
+        self.scale = np.asarray(self.meta['scale'])
+        self.offset = np.asarray(self.meta['offset'])
+
+    @classmethod
+    def exists(cls, directory):
+        return os.path.exists(os.path.join(str(directory), 'meta.json'))
+
+    @property
+    def duration(self):
+        return (self.n_times - 1) / self.sfreq
+
+    def level(self, index):
+        return np.load(os.path.join(self.directory, f'level{index}.npy'), mmap_mode='r')
+
+    def to_volts(self, values, picks):
+        """Stored 16-bit samples or envelopes of channels ``picks`` -> float32 volts."""
+        shape = (len(picks),) + (1,) * (values.ndim - 1)
+        out = (values * self.scale[picks].reshape(shape) + self.offset[picks].reshape(shape)).astype(np.float32)
+        if values.ndim == 3:
+            # A negative scale (inverted physical range) swaps min and max
+            out.sort(axis=-1)
+        return out
+
+    def query(self, start, stop, picks, max_points):
+        """
+        Samples ``[start, stop)`` of channels ``picks`` using the finest level
+        that fits in ``max_points`` points per channel.
+        Returns ``(data, t0, dt, kind)``: float32 data (channels x points), the
+        time of the first point, the point spacing and 'raw' or 'minmax'.
+        """
+        n = stop - start
+        if n <= max_points:
+            return self.to_volts(self.level(0)[picks, start:stop], picks), start / self.sfreq, 1.0 / self.sfreq, 'raw'
+        chosen = self.levels[-1]
+        for spec in self.levels[1:]:
+            if 2 * (-(-stop // spec['bucket']) - start // spec['bucket']) <= max_points:
+                chosen = spec
+                break
+        bucket = chosen['bucket']
+        first, last = start // bucket, -(-stop // bucket)
+        t0 = first * bucket / self.sfreq
+        env = self.to_volts(self.level(chosen['level'])[picks, first:last], picks)
+        if 2 * env.shape[1] > max_points:
+            # Wider than the coarsest stored level allows: merge further on the fly
+            extra = -(-env.shape[1] // max(1, max_points // 2))
+            env = _merge_minmax(env, extra)
+            bucket *= extra
+        return interleave_minmax(env), t0, bucket / (2.0 * self.sfreq), 'minmax'
@@ -0,0 +1,120 @@
+import os
+import threading
+from collections import OrderedDict
+import mne
+import numpy as np
+from django.conf import settings
+
+class EEGRecording:
+    """
+    A parsed EDF recording shared by every stage of the pipeline.
+    The header is parsed once on open; samples are decoded lazily and only once.
+    """
+
+    def __init__(self, file_path):
+        self.path = str(file_path)
+        self.raw = mne.io.read_raw_edf(self.path, preload=False, verbose=False)
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, file_path):
+        """Return the memoized recording for ``file_path``, parsing it on first use."""
+        return _cache.get(file_path, cls)
+
+    @classmethod
+    def evict(cls, file_path):
+        """Forget the memoized recording so its decoded samples can be freed."""
+        _cache.discard(file_path)
+
+    @property
+    def ch_names(self):
+        return self.raw.ch_names
+
+    @property
+    def sfreq(self):
+        return self.raw.info['sfreq']
+
+    @property
+    def n_times(self):
+        return self.raw.n_times
+
+    @property
+    def duration(self):
+        return float(self.raw.times[-1])
+
+    def metadata(self):
+        return {
+            "channels_count": len(self.ch_names),
+            "sampling_rate": self.sfreq,
+            "duration_seconds": self.duration,
+            "lowpass": self.raw.info['lowpass'],
+            "highpass": self.raw.info['highpass'],
+        }
+
+    def sample_scaling(self):
+        """
+        Per-channel ``(scale, offset)`` such that ``read()`` returns
+        ``digital * scale + offset`` for the file's 16-bit samples
+        (the calibration MNE parsed from the EDF header, in volts).
+        """
+        extras = self.raw._raw_extras[0]
+        units = np.asarray(extras['units'], dtype=float)
+        return np.asarray(extras['cal'], dtype=float) * units, np.asarray(extras['offsets'], dtype=float) * units
+
+    def load(self):
+        """Decode all samples into memory (once) and return the underlying Raw."""
+        with self._load_lock:
+            if not self.raw.preload:
+                self.raw.load_data(verbose=False)
+        return self.raw
+
+    def get_data(self):
+        return self.load().get_data()
+
+    def read(self, start, stop):
+        """Decode only samples ``[start, stop)``; cheap when the file is not preloaded."""
+        return self.raw.get_data(start=start, stop=stop)
+
+class _RecordingCache:
+    """Small per-process LRU of open recordings keyed on path, mtime and size."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path, factory):
+        path = os.path.realpath(str(file_path))
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            recording = self._entries.get(key)
+            if recording is not None:
+                self._entries.move_to_end(key)
+                return recording
+        recording = factory(path)
+        with self._lock:
+            # A replaced file gets a new key; drop stale versions of the same path
+            for stale in [k for k in self._entries if k[0] == path]:
+                del self._entries[stale]
+            self._entries[key] = recording
+            while len(self._entries) > settings.EEG_RECORDING_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return recording
+
+    def discard(self, file_path):
+        path = os.path.realpath(str(file_path))
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = _RecordingCache()
+
+def as_recording(source):
+    """Accept either a file path or an already opened ``EEGRecording``."""
+    if isinstance(source, EEGRecording):
+        return source
+    return EEGRecording.open(source)
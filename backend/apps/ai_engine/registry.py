@@ -0,0 +1,58 @@
+import hashlib
+import io
+from django.core.files.base import ContentFile
+from django.db import transaction
+from .models import NeuralModelState
+
+def weights_checksum(data):
+    return hashlib.sha256(data).hexdigest()
+
+class ModelRegistry:
+    """Persists trained networks as ``NeuralModelState`` rows with checksummed weights."""
+
+    @staticmethod
+    def register(model, version, accuracy, activate=False):
+        """
+        Serialize ``model``'s weights to ``weights_file`` and record their sha256.
+        New models are inactive; staff switch to them with ``models/<id>/activate/``.
+        """
+        import torch
+
+        buffer = io.BytesIO()
+        torch.save(model.state_dict(), buffer)
+        data = buffer.getvalue()
+        state = NeuralModelState(version=version, accuracy=accuracy, checksum=weights_checksum(data))
+        state.weights_file.save(f"{version}.pt", ContentFile(data), save=False)
+        state.save()
+        if activate:
+            ModelRegistry.activate(state)
+        return state
+
+    @staticmethod
+    @transaction.atomic
+    def activate(state):
+        """
+        Make ``state`` the only active model. Inference workers notice the new
+        active version on their next analysis and swap to it without a restart.
+        """
+        NeuralModelState.objects.exclude(id=state.id).filter(is_active=True).update(is_active=False)
+        NeuralModelState.objects.filter(id=state.id).update(is_active=True)
+        state.is_active = True
+        return state
+
+    @staticmethod
+    def read_weights(state):
+        """Raw weights bytes of ``state``, verified against its checksum when one is recorded."""
+        with state.weights_file.open('rb') as f:
+            data = f.read()
+        if state.checksum and weights_checksum(data) != state.checksum:
+            raise ValueError(f"Checksum mismatch for model {state.version} weights")
+        return data
+
+    @staticmethod
+    def checksum(state):
+        """``state``'s weights checksum, computed and stored for rows registered before checksums existed."""
+        if not state.checksum:
+            state.checksum = weights_checksum(ModelRegistry.read_weights(state))
+            NeuralModelState.objects.filter(id=state.id).update(checksum=state.checksum)
+        return state.checksum
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+
+# Optional ONNX Runtime backend (pip install onnx onnxruntime)
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+def quantize(model):
+    """Dynamic int8 quantization of the Linear layers (the bulk of EEGNetSmall's weights)."""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def export_torchscript(model, n_channels, n_samples, path, int8=False):
+    """Trace ``model`` to a TorchScript file at ``path``."""
+    model = quantize(model) if int8 else model
+    example = torch.zeros(1, 1, n_channels, n_samples)
+    with torch.inference_mode():
+        traced = torch.jit.trace(model.eval(), example)
+    _atomic_write(path, traced.save)
+    return path
+
+def export_onnx(model, n_channels, n_samples, path, int8=False):
+    """Export ``model`` to ONNX (dynamic batch axis), optionally int8-quantized with ONNX Runtime."""
+    example = torch.zeros(1, 1, n_channels, n_samples)
+
+    def write(target):
+        float_path = f"{target}.f32" if int8 else target
+        torch.onnx.export(
+            model.eval(), (example,), float_path, input_names=['x'], output_names=['logits'],
+            dynamic_axes={'x': {0: 'batch'}, 'logits': {0: 'batch'}}, dynamo=False,
+        )
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            try:
+                quantize_dynamic(float_path, target, weight_type=QuantType.QInt8)
+            finally:
+                os.remove(float_path)
+
+    _atomic_write(path, write)
+    return path
+
+def _atomic_write(path, write):
+    # Several workers may export the same model at once; only complete files are published
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+class EagerRuntime:
+    name = 'eager'
+
+    def __init__(self, model, int8=False):
+        self.model = quantize(model) if int8 else model
+
+    def run(self, batch):
+        """Logits for ``batch`` (N x 1 x channels x samples, float32)."""
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(batch)).numpy()
+
+class TorchScriptRuntime:
+    name = 'torchscript'
+    suffix = '.pt'
+    export = staticmethod(export_torchscript)
+
+    def __init__(self, path, threads=None):
+        self.module = torch.jit.load(path, map_location='cpu')
+        self.module.eval()
+
+    def run(self, batch):
+        with torch.inference_mode():
+            return self.module(torch.from_numpy(batch)).numpy()
+
+class OnnxRuntime:
+    name = 'onnx'
+    suffix = '.onnx'
+    export = staticmethod(export_onnx)
+
+    def __init__(self, path, threads=None):
+        if onnxruntime is None:
+            raise ImportError("onnxruntime is not installed")
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def run(self, batch):
+        return self.session.run(None, {'x': batch})[0]
+
+RUNTIMES = {
+    'eager': EagerRuntime,
+    'torchscript': TorchScriptRuntime,
+    'onnx': OnnxRuntime,
+}
+
+def softmax_scores(logits):
+    """Abnormal-class probability from (N x 2) logits."""
+    logits = logits - logits.max(axis=1, keepdims=True)
+    e = np.exp(logits)
+    return (e[:, 1] / e.sum(axis=1)).astype(np.float32)
+
+def check_parity(runtime, reference, n_channels, n_samples, n_windows=32):
+    """Largest absolute difference in window scores between ``runtime`` and the eager ``reference``."""
+    rng = np.random.default_rng(0)
+    batch = rng.standard_normal((n_windows, 1, n_channels, n_samples), dtype=np.float32)
+    return float(np.abs(softmax_scores(runtime.run(batch)) - softmax_scores(reference.run(batch))).max())
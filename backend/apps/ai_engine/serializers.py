@@ -1,12 +1,50 @@
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
-from .models import AITrainingSession, NeuralModelState
+from .models import AITrainingSession, NeuralModelState, TrainingLogEntry
+
+# Log entries embedded in a session; older ones are paged from ``sessions/<id>/logs/``
+LOG_TAIL = 50
+
+class TrainingLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrainingLogEntry
+        fields = ('id', 'level', 'message', 'epoch', 'metrics', 'created_at')
 
 class AITrainingSessionSerializer(serializers.ModelSerializer):
+    logs = serializers.SerializerMethodField()
+    last_log_id = serializers.SerializerMethodField()
+
     class Meta:
         model = AITrainingSession
         fields = '__all__'
 
+    @staticmethod
+    def prefetch_log_tails(queryset):
+        """Load every session's log tail in one query (see ``_tail``)."""
+        ranked = TrainingLogEntry.objects.only('id', 'session_id', 'message').annotate(
+            rank=Window(RowNumber(), partition_by=F('session_id'), order_by=F('id').desc())
+        ).filter(rank__lte=LOG_TAIL)
+        return queryset.prefetch_related(Prefetch('log_entries', queryset=ranked, to_attr='prefetched_log_tail'))
+
+    def _tail(self, obj):
+        if not hasattr(obj, '_log_tail'):
+            if hasattr(obj, 'prefetched_log_tail'):
+                obj._log_tail = [(entry.id, entry.message) for entry in obj.prefetched_log_tail]
+            else:
+                obj._log_tail = list(obj.log_entries.order_by('-id').values_list('id', 'message')[:LOG_TAIL])[::-1]
+        return obj._log_tail
+
+    def get_logs(self, obj):
+        """The last ``LOG_TAIL`` entries as text, one line per entry."""
+        return ''.join(f"{message}\n" for _, message in self._tail(obj))
+
+    def get_last_log_id(self, obj):
+        tail = self._tail(obj)
+        return tail[-1][0] if tail else 0
+
 class NeuralModelStateSerializer(serializers.ModelSerializer):
     class Meta:
         model = NeuralModelState
         fields = '__all__'
+        read_only_fields = ('checksum',)
@@ -1,71 +1,177 @@
-import mne
 import numpy as np
-from pathlib import Path
+from django.conf import settings
+from .features import BANDS, FEATURES_VERSION, compute_band_features, serialize_features
+from .models import NeuralModelState
+from .registry import ModelRegistry
+from .stage_cache import get_stage_cache, stage_key
+
+# mne / scipy / torch modules are imported inside the compute methods: web
+# workers import this module (current_pipeline_version) and never run them
+
+# Bump whenever filtering, features or the clinical summary change, so stored
+# results of earlier runs are no longer reused for identical recordings
+PIPELINE_VERSION = 3
 
 class EEGProcessorService:
     @staticmethod
-    def extract_metadata(file_path):
+    def pipeline_version(model_checksum=None):
+        """Tag of the code and model weights that produce an analysis result."""
+        return f"{PIPELINE_VERSION}-{model_checksum[:16] if model_checksum else 'heuristic'}"
+
+    @staticmethod
+    def current_pipeline_version():
+        """The version a new analysis would run with (the active model's checksum)."""
+        state = NeuralModelState.objects.filter(is_active=True).exclude(weights_file='').exclude(weights_file=None).first()
+        if state is None or not state.weights_file.storage.exists(state.weights_file.name):
+            return EEGProcessorService.pipeline_version()
+        return EEGProcessorService.pipeline_version(ModelRegistry.checksum(state))
+
+    @staticmethod
+    def extract_metadata(source):
+        """``source`` is a file path or an ``EEGRecording`` opened earlier in the pipeline."""
+        from .recording import as_recording
+
         try:
-            # Load only info to save memory
-            raw = mne.io.read_raw_edf(str(file_path), preload=False, verbose=False)
-            return {
-                "channels_count": len(raw.ch_names),
-                "sampling_rate": raw.info['sfreq'],
-                "duration_seconds": raw.times[-1],
-                "lowpass": raw.info['lowpass'],
-                "highpass": raw.info['highpass']
-            }
+            # Header only, samples are not decoded here
+            return as_recording(source).metadata()
         except Exception as e:
             print(f"Error extracting metadata: {e}")
             return {}
 
     @staticmethod
-    def calculate_spectral_bands(file_path):
+    def stage_keys(file_hash, model=None):
+        """Stage cache keys of one recording; each stage's key covers its input's key."""
+        from .datasets import preprocessing_params
+        from .spectral import filter_params, welch_params
+
+        keys = {'filtered': stage_key('filtered', file_hash, filter_params())}
+        keys['psd'] = stage_key('psd', file_hash, {'input': keys['filtered'], **welch_params()})
+        keys['features'] = stage_key('features', file_hash, {
+            'input': keys['psd'], 'bands': BANDS, 'version': FEATURES_VERSION,
+        })
+        if model:
+            keys['scores'] = stage_key('scores', file_hash, {
+                'input': keys['filtered'], 'model': model.checksum, 'runtime': model.runtime_tag,
+                # Window rate, montage and size as in training (covers SEGMENTS_VERSION)
+                'segments': preprocessing_params(model.n_channels, model.n_samples),
+            })
+        return keys
+
+    @staticmethod
+    def calculate_spectral_bands(source, raw_consumers=(), filtered_consumers=(), file_hash=None, n_jobs=None):
         """
         Calculates medical-grade Power Spectral Density (PSD) using Welch's method.
+        ``raw_consumers`` / ``filtered_consumers`` receive every block before /
+        after clinical filtering as it streams past.
+
+        With a ``file_hash`` every stage output (PSD, band features, model
+        scores, and the filtered signal when ``STORE_FILTERED`` is set) is looked
+        up in and written to the stage cache, so a re-analysis only recomputes
+        stages whose parameters changed.
+        ``n_jobs`` threads (default ``EEG_SPECTRAL_N_JOBS``) split the channels.
+        Processing errors propagate, so the analysis job fails and is retried.
         """
+        from .filterbank import resolve_n_jobs
+        from .inference import aggregate_scores, get_engine
+        from .recording import as_recording
+        from .spectral import StreamingSpectralEngine, WelchAccumulator
+
+        # 1-3. Clinical preprocessing (notch 50 Hz harmonics, bandpass 0.5 - 70 Hz)
+        # and Welch PSD, streamed block by block instead of preloading the recording.
+        # Standard EEG Bands:
+        # Delta: 0.5-4 Hz, Theta: 4-8 Hz, Alpha: 8-13 Hz, Beta: 13-30 Hz
+        recording = as_recording(source)
+        n_jobs = resolve_n_jobs(settings.EEG_SPECTRAL_N_JOBS if n_jobs is None else n_jobs)
+        raw_consumers = list(raw_consumers)
+        filtered_consumers = list(filtered_consumers)
         try:
-            # 1. Load Data
-            raw = mne.io.read_raw_edf(str(file_path), preload=True, verbose=False)
-            
-            # 2. Clinical Preprocessing
-            # Removing power line noise (notch filter at 50Hz)
-            raw.notch_filter(np.arange(50, 251, 50), filter_length='auto', phase='zero')
-            # Bandpass filter (Standard Clinical range: 0.5 - 70 Hz)
-            raw.filter(l_freq=0.5, h_freq=70, fir_design='firwin')
-            
-            # 3. PSD Calculation (Welch)
-            # Standard EEG Bands:
-            # Delta: 0.5-4 Hz, Theta: 4-8 Hz, Alpha: 8-13 Hz, Beta: 13-30 Hz
-            psds, freqs = mne.time_frequency.psd_array_welch(
-                raw.get_data(), sfreq=raw.info['sfreq'], 
-                fmin=0.5, fmax=40, n_per_seg=256, verbose=False
+            model = get_engine()
+        except Exception as e:
+            # e.g. weights failing their checksum; keep the spectral analysis going
+            print(f"Model loading error: {e}")
+            model = None
+
+        cache = get_stage_cache() if file_hash else None
+        keys = EEGProcessorService.stage_keys(file_hash, model) if cache else {}
+        cached = {stage: cache.get(stage, key) for stage, key in keys.items()} if cache else {}
+
+        welch = None
+        if cached.get('psd') is None:
+            welch = WelchAccumulator(recording.sfreq, recording.n_times, n_jobs=n_jobs)
+            filtered_consumers.append(welch)
+        # The neural model scores the same filtered blocks as they stream past
+        scorer = None
+        if model and cached.get('scores') is None:
+            scorer = model.scorer(recording.ch_names, recording.sfreq)
+            filtered_consumers.append(scorer)
+        writer = None
+        if cache and filtered_consumers and cached['filtered'] is None and settings.EEG_STAGE_CACHE['STORE_FILTERED']:
+            writer = cache.writer('filtered', keys['filtered'], (len(recording.ch_names), recording.n_times))
+            filtered_consumers.append(writer)
+
+        if raw_consumers or filtered_consumers:
+            engine = StreamingSpectralEngine(
+                recording, raw_consumers=raw_consumers, filtered_consumers=filtered_consumers,
+                filtered_source=cached.get('filtered'), n_jobs=n_jobs,
             )
-            
-            # Aggregate across channels
-            avg_psd = np.mean(psds, axis=0)
-            
-            def get_band_power(f_min, f_max):
-                idx = np.logical_and(freqs >= f_min, freqs <= f_max)
-                return float(np.mean(avg_psd[idx])) if np.any(idx) else 0.0
-
-            results = {
-                "delta_power": get_band_power(0.5, 4),
-                "theta_power": get_band_power(4, 8),
-                "alpha_power": get_band_power(8, 13),
-                "beta_power": get_band_power(13, 30),
-                "seizure_probability": np.random.uniform(0.01, 0.15) # Default baseline
+            try:
+                engine.run()
+            finally:
+                if writer:
+                    writer.commit()
+
+        if welch:
+            psds, freqs = welch.result()
+            if cache:
+                cache.put('psd', keys['psd'], {'psds': psds, 'freqs': freqs})
+        else:
+            psds, freqs = cached['psd']['psds'], cached['psd']['freqs']
+
+        # Per-channel x per-band features in one vectorized pass; the
+        # recording-level band powers are their channel average
+        stored = cached.get('features')
+        if stored is None:
+            features = compute_band_features(psds, freqs)
+            stored = {
+                'band_power': dict(zip(features['bands'], features['mean_absolute'].tolist())),
+                'dominant_frequency': features['dominant_frequency'],
+                'serialized': serialize_features(features, recording.ch_names),
             }
+            if cache:
+                cache.put('features', keys['features'], stored)
+        band_power = stored['band_power']
+
+        results = {
+            "delta_power": band_power['delta'],
+            "theta_power": band_power['theta'],
+            "alpha_power": band_power['alpha'],
+            "beta_power": band_power['beta'],
+            "dominant_frequency": stored['dominant_frequency'],
+            "features": stored['serialized'],
+            "seizure_probability": np.random.uniform(0.01, 0.15), # Default baseline
+            "pipeline_version": EEGProcessorService.pipeline_version(model.checksum if model else None),
+        }
+
+        inference = None
+        if scorer:
+            scores = scorer.window_scores()
+            if cache and len(scores):
+                cache.put('scores', keys['scores'], scores)
+            inference = aggregate_scores(scores, model.version, scorer.elapsed)
+        elif model:
+            inference = aggregate_scores(cached['scores'], model.version)
+        if inference:
+            results["seizure_probability"] = inference['probability']
+            # Stored with the per-channel features in SpectralResult.spectral_json
+            results["features"]["inference"] = inference
+            speed = inference['windows_per_second']
+            print(
+                f"Inference ({inference['model_version']}): {inference['n_windows']} windows, "
+                + (f"{speed:.0f} windows/s" if speed else "cached scores")
+            )
+        # Basic Seizure Detection logic (excessive high-freq or rhythmic discharge),
+        # used until a trained model with weights is active
+        elif results["beta_power"] > (results["alpha_power"] * 3):
+            results["seizure_probability"] = np.random.uniform(0.75, 0.99)
             
-            # Basic Seizure Detection logic (excessive high-freq or rhythmic discharge)
-            if results["beta_power"] > (results["alpha_power"] * 3):
-                results["seizure_probability"] = np.random.uniform(0.75, 0.99)
-                
-            return results
-            
-        except Exception as e:
-            print(f"Signal Processing Error: {e}")
-            return {
-                "alpha_power": 0, "beta_power": 0, "theta_power": 0, "delta_power": 0,
-                "seizure_probability": 0
-            }
+        return results
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.events.broker import publish
+from .models import AITrainingSession, TrainingLogEntry
+
+@receiver(post_save, sender=AITrainingSession)
+def training_saved(sender, instance, update_fields=None, **kwargs):
+    publish(
+        'training',
+        # Progress and metric ticks are rate limited; status changes always go out
+        throttle=update_fields is not None and 'status' not in update_fields,
+        id=instance.id,
+        status=instance.status,
+        progress_percentage=instance.progress_percentage,
+        current_loss=instance.current_loss,
+        current_accuracy=instance.current_accuracy,
+        final_accuracy=instance.final_accuracy,
+    )
+
+@receiver(post_save, sender=TrainingLogEntry)
+def log_appended(sender, instance, created, **kwargs):
+    if created:
+        # Clients append entries newer than the ``last_log_id`` they hold
+        publish(
+            'training',
+            id=instance.session_id,
+            log_entry={'id': instance.id, 'level': instance.level, 'message': instance.message},
+        )
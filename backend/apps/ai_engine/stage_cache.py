@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from django.conf import settings
+
+# Bump a stage when its code changes in a way its parameters do not capture
+STAGE_VERSIONS = {
+    'filtered': 1,
+    'psd': 1,
+    'features': 1,
+    'scores': 1,
+}
+STAGE_SUFFIXES = {
+    'filtered': '.npy',   # channels x time, float32
+    'psd': '.npz',        # psds, freqs
+    'features': '.json',
+    'scores': '.npy',     # one abnormal-class score per model window
+}
+
+# Other workers write to the same directory; each process re-reads the real
+# size at least this often
+RESCAN_SECONDS = 300
+
+def stage_key(stage, file_hash, params):
+    """
+    Cache key of one stage output. ``params`` should contain the key of the
+    stage's input, so a change upstream invalidates everything downstream.
+    """
+    payload = {'stage': stage, 'version': STAGE_VERSIONS[stage], 'file': file_hash, 'params': params}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def get_stage_cache():
+    """The configured cache, or None when disabled (``MAX_BYTES`` = 0)."""
+    config = settings.EEG_STAGE_CACHE
+    if not config['MAX_BYTES']:
+        return None
+    return StageCache(config['ROOT'], config['MAX_BYTES'])
+
+class _Usage:
+    """Bytes under one cache root as this process last counted them (None = not yet scanned)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = None
+        self.scanned_at = 0.0
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+def _usage_of(root):
+    with _usage_lock:
+        return _usage.setdefault(root, _Usage())
+
+class StageCache:
+    """
+    Outputs of the analysis pipeline stages (filtered signal, PSD, band
+    features, model scores) on local disk, one file per entry::
+
+        <root>/<stage>/<key><suffix>
+
+    Entries are written atomically and never modified. Reads touch the file's
+    mtime. The total size is kept up to date as entries are added and removed;
+    only once it exceeds ``max_bytes`` (or the count is ``RESCAN_SECONDS``
+    old) is the directory scanned and the least recently used entries removed.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.usage = _usage_of(self.root)
+
+    def path(self, stage, key):
+        return os.path.join(self.root, stage, key + STAGE_SUFFIXES[stage])
+
+    def get(self, stage, key):
+        """The cached value, or None. ``.npy`` entries are memory-mapped read-only."""
+        path = self.path(stage, key)
+        try:
+            os.utime(path)
+            if path.endswith('.npy'):
+                return np.load(path, mmap_mode='r')
+            if path.endswith('.npz'):
+                with np.load(path) as data:
+                    return dict(data)
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                print(f"Discarding unreadable {stage} cache entry {key}: {e}")
+                self._remove(path)
+            return None
+
+    def put(self, stage, key, value):
+        path = self.path(stage, key)
+        tmp = self._tmp_path(path)
+        if path.endswith('.npy'):
+            with open(tmp, 'wb') as f:
+                np.save(f, value)
+        elif path.endswith('.npz'):
+            with open(tmp, 'wb') as f:
+                np.savez(f, **value)
+        else:
+            with open(tmp, 'w') as f:
+                json.dump(value, f)
+        self._commit(tmp, path)
+
+    def writer(self, stage, key, shape, dtype=np.float32):
+        """Streaming consumer that fills a ``.npy`` entry block by block (see ``ArrayWriter``)."""
+        path = self.path(stage, key)
+        return ArrayWriter(self, path, self._tmp_path(path), shape, dtype)
+
+    def _tmp_path(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.tmp"
+
+    def _commit(self, tmp, path):
+        os.replace(tmp, path)
+        if self._grow(os.path.getsize(path)):
+            self.evict(keep=path)
+
+    def _grow(self, delta):
+        """Add ``delta`` bytes to the count; True when it is over budget or due for a rescan."""
+        usage = self.usage
+        with usage.lock:
+            if usage.total is None or time.monotonic() - usage.scanned_at > RESCAN_SECONDS:
+                return True
+            usage.total += delta
+            return usage.total > self.max_bytes
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self.usage.lock:
+            if self.usage.total is not None:
+                self.usage.total -= size
+
+    def size(self):
+        """Bytes in the cache as last counted by this process."""
+        if self.usage.total is None:
+            self.evict()
+        return self.usage.total
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted by another worker
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self, keep=None):
+        """
+        Scan the cache, remove least recently used entries until it fits in
+        ``max_bytes`` and reset the size count to what is left.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+                total -= size
+        with self.usage.lock:
+            self.usage.total = total
+            self.usage.scanned_at = time.monotonic()
+
+class ArrayWriter:
+    """
+    Writes filtered blocks (``feed(start, block)``) into a memory-mapped
+    temporary file; ``commit()`` publishes it as a cache entry once every
+    sample is in, ``abort()`` drops it.
+    """
+
+    def __init__(self, cache, path, tmp, shape, dtype):
+        self.cache = cache
+        self.path = path
+        self.tmp = tmp
+        self.out = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=tuple(int(n) for n in shape))
+        self.received = 0
+
+    def feed(self, start, block):
+        self.out[:, start:start + block.shape[-1]] = block
+        self.received = max(self.received, start + block.shape[-1])
+
+    def commit(self):
+        if self.received < self.out.shape[-1]:
+            self.abort()
+            return False
+        self.out.flush()
+        self.out = None
+        self.cache._commit(self.tmp, self.path)
+        return True
+
+    def abort(self):
+        self.out = None
+        self.cache._remove(self.tmp)
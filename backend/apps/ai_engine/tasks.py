@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+from django.conf import settings
+from apps.jobs.queue import enqueue
+from apps.jobs.registry import task
+from .edf import read_edf_header
+from .models import AITrainingSession
+
+INGEST_DATASET = 'ai_engine.ingest_dataset'
+TRAIN_MODEL = 'ai_engine.train_model'
+MANIFEST_NAME = '.ingest_manifest.json'
+COPY_CHUNK = 1 << 20
+CHECKPOINT_SECONDS = 2.0
+
+def datasets_root():
+    return os.path.join(settings.BASE_DIR, 'datasets')
+
+def upload_staging_path(name):
+    return os.path.join(datasets_root(), '_uploads', name)
+
+def queue_ingest(session, archive_path):
+    return enqueue(INGEST_DATASET, {'session_id': session.id, 'archive': archive_path})
+
+def queue_training(session):
+    # Not retried: a failed run is logged on the session and started again by hand
+    return enqueue(TRAIN_MODEL, {'session_id': session.id}, max_attempts=1)
+
+def mark_training_failed(error, session_id, **payload):
+    session = AITrainingSession.objects.filter(id=session_id).first()
+    # The trainer marks its own errors; this covers a lost worker
+    if session and session.status != 'failed':
+        session.append_log(f"CRITICAL ERROR: Training job failed: {error}", level='error')
+        session.update_progress(status='failed')
+
+@task(TRAIN_MODEL, on_failure=mark_training_failed)
+def train_model(session_id):
+    # torch and kagglehub load in the worker running the job, never in web processes
+    from .trainer import TrainingService
+
+    TrainingService.run_training(session_id)
+
+def mark_ingest_failed(error, session_id, **payload):
+    session = AITrainingSession.objects.filter(id=session_id).first()
+    if session:
+        session.append_log(f"CRITICAL ERROR: Dataset ingest failed: {error}", level='error')
+        session.update_progress(status='failed')
+
+def _safe_target(root, member_name):
+    """Destination of an archive member, refusing absolute paths and '..' escapes."""
+    target = os.path.realpath(os.path.join(root, member_name))
+    if os.path.commonpath([target, os.path.realpath(root)]) != os.path.realpath(root):
+        raise ValueError(f"Unsafe path in archive: {member_name}")
+    return target
+
+def _archive_fingerprint(zf):
+    """Digest of the archive's member names, CRCs and sizes (read from the central directory)."""
+    listing = sorted((m.filename, m.CRC, m.file_size) for m in zf.infolist())
+    return hashlib.sha256(json.dumps(listing).encode()).hexdigest()
+
+def _write_manifest(path, manifest):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+@task(INGEST_DATASET, on_failure=mark_ingest_failed)
+def ingest_dataset(session_id, archive):
+    """
+    Extract an uploaded dataset ZIP member by member into ``datasets/<name>``.
+
+    EDF headers are validated and indexed from the stream as each member is
+    written. Finished members are recorded in a manifest next to the data,
+    so a retried or requeued job skips everything already extracted. The
+    manifest is only trusted for the same archive content; a different
+    archive uploaded under the same name replaces the directory.
+    """
+    session = AITrainingSession.objects.get(id=session_id)
+    extract_path = os.path.join(datasets_root(), session.dataset_source)
+    manifest_path = os.path.join(extract_path, MANIFEST_NAME)
+
+    with zipfile.ZipFile(archive) as zf:
+        fingerprint = _archive_fingerprint(zf)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        if manifest is None or manifest.get('fingerprint') != fingerprint:
+            if os.path.isdir(extract_path):
+                session.append_log(f"Replacing earlier contents of {extract_path}")
+                shutil.rmtree(extract_path)
+            manifest = {'archive': os.path.basename(archive), 'fingerprint': fingerprint, 'members': {}}
+        os.makedirs(extract_path, exist_ok=True)
+        done = manifest['members']
+
+        if done:
+            session.append_log(f"Resuming dataset ingest ({len(done)} members already extracted)")
+        session.update_progress(status='ingesting')
+
+        members = [m for m in zf.infolist() if not m.is_dir()]
+        total_bytes = sum(m.file_size for m in members) or 1
+        processed = 0
+        last_checkpoint = time.monotonic()
+        for member in members:
+            target = _safe_target(extract_path, member.filename)
+            entry = done.get(member.filename)
+            if entry and entry['crc'] == member.CRC and (
+                'error' in entry
+                or (os.path.exists(target) and os.path.getsize(target) == member.file_size)
+            ):
+                processed += member.file_size
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            entry = {'crc': member.CRC, 'size': member.file_size}
+            tmp = target + '.part'
+            with zf.open(member) as src:
+                head = b''
+                if member.filename.lower().endswith('.edf'):
+                    # Validate from the stream before copying the samples;
+                    # invalid recordings are indexed with their error but not extracted
+                    try:
+                        entry['edf'], head = read_edf_header(src, size=member.file_size)
+                    except ValueError as e:
+                        entry['error'] = str(e)
+                if 'error' not in entry:
+                    with open(tmp, 'wb') as dst:
+                        dst.write(head)
+                        shutil.copyfileobj(src, dst, COPY_CHUNK)
+                    os.replace(tmp, target)
+            done[member.filename] = entry
+            processed += member.file_size
+
+            if time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                _write_manifest(manifest_path, manifest)
+                session.update_progress(progress_percentage=100 * processed / total_bytes)
+                last_checkpoint = time.monotonic()
+
+    _write_manifest(manifest_path, manifest)
+    edfs = [e for name, e in done.items() if name.lower().endswith('.edf')]
+    valid = [e['edf'] for e in edfs if 'edf' in e]
+    hours = sum(e['duration_seconds'] or 0 for e in valid) / 3600
+    session.append_log(
+        f"Dataset ingested: {len(done)} files, {len(valid)} valid EDF recordings ({hours:.1f} h)"
+        + (f", {len(edfs) - len(valid)} invalid EDF files skipped" if len(edfs) > len(valid) else "")
+        + f". Extracted to {extract_path}"
+    )
+    session.update_progress(status='pending', progress_percentage=100)
+    os.remove(archive)
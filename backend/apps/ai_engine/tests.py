@@ -0,0 +1,212 @@
+import io
+import os
+import shutil
+import tempfile
+import warnings
+import zipfile
+from unittest import mock
+import mne
+import numpy as np
+import torch
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from .datasets import (
+    MODEL_CHANNELS, MODEL_SFREQ, Resampler, SegmentCache, WindowSegmenter, pick_channels, resampled_length,
+)
+from .management.commands.generate_demo_dataset import synthetic_eeg, write_edf
+from .inference import InferenceEngine
+from .models import AITrainingSession
+from .pyramid import SignalPyramid, build_pyramid, query_recording
+from .recording import EEGRecording
+from .runtimes import EagerRuntime, OnnxRuntime, TorchScriptRuntime, onnxruntime
+from .stage_cache import StageCache
+from .spectral import BANDPASS, NOTCH_FREQS, NOTCH_TRANS_BANDWIDTH, WELCH_FMAX, WELCH_FMIN, StreamingSpectralEngine
+from .tasks import ingest_dataset
+from .trainer import EEGNetSmall
+
+def sine(sfreq, seconds, freq=10.0, n_channels=16):
+    t = np.arange(int(seconds * sfreq)) / sfreq
+    return np.tile(np.sin(2 * np.pi * freq * t), (n_channels, 1)).astype(np.float32)
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+class WindowPreparationTests(SimpleTestCase):
+    def test_streamed_resampling_matches_one_pass(self):
+        x = sine(256, 10)
+        whole = Resampler(256).feed(x)
+        resampler = Resampler(256)
+        parts = [resampler.feed(x[:, i:i + 777]) for i in range(0, x.shape[-1], 777)]
+        streamed = np.concatenate(parts, axis=-1)
+        self.assertEqual(streamed.shape[-1], resampled_length(x.shape[-1], 256))
+        np.testing.assert_allclose(streamed, whole, atol=1e-6)
+
+    def test_windows_cover_the_same_time_at_any_rate(self):
+        windows = {}
+        for sfreq in (256, 500, MODEL_SFREQ):
+            segmenter = WindowSegmenter(sfreq, list(MODEL_CHANNELS), 16, 250)
+            x = sine(sfreq, 20)
+            windows[sfreq] = np.concatenate([segmenter.feed(x[:, i:i + 1000]) for i in range(0, x.shape[-1], 1000)])
+        self.assertEqual({len(w) for w in windows.values()}, {20})
+        for sfreq in (256, 500):
+            # One window is one second of a 10 Hz sine whatever the recording rate
+            np.testing.assert_allclose(windows[sfreq], windows[MODEL_SFREQ], atol=0.05)
+
+    def test_channels_are_picked_by_name(self):
+        labels = ['EEG O2-REF', 'ECG', 'EEG FP1-REF', 'EEG T7-REF'] + [f'EEG {name}-REF' for name in MODEL_CHANNELS[1:6]]
+        picks = pick_channels(labels, 16)
+        self.assertEqual(picks[MODEL_CHANNELS.index('FP1')], 2)
+        self.assertEqual(picks[MODEL_CHANNELS.index('O2')], 0)
+        self.assertEqual(picks[MODEL_CHANNELS.index('T3')], 3)  # T7 is the new name of T3
+        self.assertEqual(picks[MODEL_CHANNELS.index('O1')], -1)
+        self.assertNotIn(1, picks)
+        # No 10-20 names at all: first channels in file order
+        self.assertEqual(pick_channels(['A', 'B'], 3), [0, 1, -1])
+
+class FilterParityTests(TempDirMixin, SimpleTestCase):
+    """The streamed single-pass filter and Welch PSD against the original whole-array MNE pipeline."""
+
+    def baseline(self, path):
+        raw = mne.io.read_raw_edf(path, preload=True, verbose=False)
+        sfreq = raw.info['sfreq']
+        with warnings.catch_warnings():
+            # Recordings shorter than the filter make MNE warn about distortion
+            warnings.simplefilter('ignore', RuntimeWarning)
+            raw.notch_filter(NOTCH_FREQS[NOTCH_FREQS < sfreq / 2 - 1], trans_bandwidth=NOTCH_TRANS_BANDWIDTH, verbose=False)
+            raw.filter(*BANDPASS, fir_design='firwin', verbose=False)
+        psds, _ = mne.time_frequency.psd_array_welch(
+            raw.get_data(), sfreq=sfreq, fmin=WELCH_FMIN, fmax=WELCH_FMAX, n_per_seg=256, verbose=False,
+        )
+        return raw.get_data(), psds
+
+    def test_streamed_filter_and_psd_match_mne(self):
+        # 3 s is shorter than half the 0.5 Hz highpass kernel, so the edge padding runs out of samples
+        for seconds in (3, 20):
+            with self.subTest(seconds=seconds):
+                path = os.path.join(self.tmp, f'{seconds}.edf')
+                write_edf(path, synthetic_eeg(np.random.default_rng(seconds), 4, 250 * seconds, 250, abnormal=False), 250)
+                filtered, psds = self.baseline(path)
+
+                engine = StreamingSpectralEngine(EEGRecording(path), chunk_seconds=2)
+                streamed = np.concatenate([block for _, block in engine.iter_filtered()], axis=-1)
+                np.testing.assert_allclose(streamed, filtered, atol=1e-4 * np.abs(filtered).max())
+                np.testing.assert_allclose(engine.welch()[0], psds, rtol=1e-4, atol=1e-6 * psds.max())
+
+class SegmentCacheTests(TempDirMixin, SimpleTestCase):
+    def test_shard_windows_follow_the_model_rate(self):
+        path = os.path.join(self.tmp, 'r.edf')
+        write_edf(path, synthetic_eeg(np.random.default_rng(0), 16, 256 * 30, 256, abnormal=False), 256)
+        cache = SegmentCache(os.path.join(self.tmp, 'cache'), 16, 250)
+        os.makedirs(cache.shard_dir)
+
+        n_windows = cache.preprocess(path, 'a' * 64)
+
+        self.assertEqual(n_windows, resampled_length(256 * 30, 256) // 250)
+        self.assertEqual(np.load(cache.shard_path('a' * 64)).shape, (n_windows, 16, 250))
+        self.assertEqual(cache.params['sfreq'], MODEL_SFREQ)
+
+class DatasetIngestTests(TempDirMixin, TestCase):
+    def archive(self, members):
+        path = os.path.join(self.tmp, f'{len(os.listdir(self.tmp))}.zip')
+        with zipfile.ZipFile(path, 'w') as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return path
+
+    def ingest(self, members):
+        session = AITrainingSession.objects.create(dataset_type='local', dataset_source='ds')
+        with override_settings(BASE_DIR=self.tmp):
+            ingest_dataset(session.id, self.archive(members))
+        return os.path.join(self.tmp, 'datasets', 'ds')
+
+    def test_different_archive_under_the_same_name_starts_clean(self):
+        root = self.ingest({'normal/a.txt': b'old', 'normal/stale.txt': b'stale'})
+        self.assertTrue(os.path.exists(os.path.join(root, 'normal', 'stale.txt')))
+
+        root = self.ingest({'normal/a.txt': b'new'})
+
+        self.assertFalse(os.path.exists(os.path.join(root, 'normal', 'stale.txt')))
+        with open(os.path.join(root, 'normal', 'a.txt'), 'rb') as f:
+            self.assertEqual(f.read(), b'new')
+
+class SignalPyramidTests(TempDirMixin, SimpleTestCase):
+    def test_int16_levels_reproduce_the_recording(self):
+        path = os.path.join(self.tmp, 'r.edf')
+        write_edf(path, synthetic_eeg(np.random.default_rng(0), 4, 250 * 120, 250, abnormal=True), 250)
+        recording = EEGRecording(path)
+        directory = os.path.join(self.tmp, 'pyramid')
+        build_pyramid(recording, directory, chunk_seconds=7)
+        pyramid = SignalPyramid(directory)
+
+        self.assertEqual(pyramid.level(0).dtype, np.int16)
+        picks = [2, 0]
+        for start, stop, max_points in ((1000, 1800, 1000), (0, recording.n_times, 500), (333, 20000, 300)):
+            with self.subTest(start=start, stop=stop):
+                data, t0, dt, kind = pyramid.query(start, stop, picks, max_points)
+                expected = query_recording(recording, start, stop, picks, max_points)
+                self.assertEqual(data.dtype, np.float32)
+                if kind == 'raw':
+                    np.testing.assert_allclose(data, expected[0], rtol=1e-6, atol=1e-12)
+                else:
+                    # Pyramid buckets are aligned to the level, so compare the overall envelope
+                    np.testing.assert_allclose(data.min(axis=1), expected[0].min(axis=1), rtol=1e-6)
+                    np.testing.assert_allclose(data.max(axis=1), expected[0].max(axis=1), rtol=1e-6)
+                    self.assertLessEqual(data.shape[1], max_points)
+
+class StageCacheTests(TempDirMixin, SimpleTestCase):
+    def test_evicts_least_recently_used_without_rescanning_each_put(self):
+        cache = StageCache(self.tmp, max_bytes=2500)
+        entry = np.zeros(100, dtype=np.float64)  # 928 bytes as .npy
+        cache.put('scores', 'a', entry)
+        with mock.patch.object(StageCache, '_entries', wraps=cache._entries) as scans:
+            cache.put('scores', 'b', entry)
+            self.assertEqual(scans.call_count, 0)
+            self.assertIsNotNone(cache.get('scores', 'a'))
+            os.utime(cache.path('scores', 'b'), (0, 0))  # least recently used
+            cache.put('scores', 'c', entry)
+            self.assertEqual(scans.call_count, 1)
+
+        self.assertIsNone(cache.get('scores', 'b'))
+        self.assertIsNotNone(cache.get('scores', 'a'))
+        self.assertEqual(cache.size(), 2 * os.path.getsize(cache.path('scores', 'a')))
+
+class RuntimeParityTests(TempDirMixin, SimpleTestCase):
+    """Compiled runtimes serve the same scores as the eager model they were exported from."""
+
+    def setUp(self):
+        super().setUp()
+        torch.manual_seed(0)
+        buffer = io.BytesIO()
+        torch.save(EEGNetSmall(n_channels=16, n_samples=250).state_dict(), buffer)
+        self.weights = buffer.getvalue()
+        self.windows = np.random.default_rng(0).standard_normal((40, 16, 250)).astype(np.float32)
+        override = override_settings(EEG_INFERENCE={**settings.EEG_INFERENCE, 'ARTIFACT_ROOT': self.tmp})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def engine(self, runtime, int8=False):
+        return InferenceEngine(self.weights, batch_size=16, runtime=runtime, int8=int8)
+
+    def test_compiled_runtimes_match_eager(self):
+        eager = self.engine('eager').predict(self.windows)
+        runtimes = {'torchscript': TorchScriptRuntime}
+        if onnxruntime is not None:
+            runtimes['onnx'] = OnnxRuntime
+        for name, cls in runtimes.items():
+            with self.subTest(runtime=name):
+                engine = self.engine(name)
+                # No silent fallback to eager
+                self.assertIsInstance(engine.runtime, cls)
+                np.testing.assert_allclose(engine.predict(self.windows), eager, atol=1e-5)
+                # The exported artifact is reused by the next engine
+                self.assertIsInstance(self.engine(name).runtime, cls)
+
+    def test_int8_stays_within_parity_tolerance(self):
+        eager = self.engine('eager').predict(self.windows)
+        engine = self.engine('torchscript', int8=True)
+        self.assertIsInstance(engine.runtime, TorchScriptRuntime)
+        self.assertEqual(engine.runtime_tag, 'TorchScriptRuntime-int8')
+        self.assertLessEqual(np.abs(engine.predict(self.windows) - eager).max(), settings.EEG_INFERENCE['PARITY_TOLERANCE'])
@@ -1,15 +1,16 @@
 import os
+import random
+import traceback
 import kagglehub
-import pandas as pd
-import numpy as np
-import mne
 import torch
 import torch.nn as nn
 import torch.optim as optim
+from torch.utils.data import DataLoader
 from django.utils import timezone
-from .models import AITrainingSession, NeuralModelState
+from .datasets import MODEL_SFREQ, SegmentCache, SegmentDataset, discover_recordings
+from .models import AITrainingSession
+from .registry import ModelRegistry
 from django.conf import settings
-import threading
 
 class EEGNetSmall(nn.Module):
     """
@@ -34,79 +35,147 @@ class EEGNetSmall(nn.Module):
 
 class TrainingService:
     @staticmethod
-    def start_training_run(session_id):
-        thread = threading.Thread(target=TrainingService._training_process, args=(session_id,))
-        thread.start()
-
-    @staticmethod
-    def _training_process(session_id):
+    def run_training(session_id):
+        """
+        Download / preprocess the dataset, train EEGNetSmall and register the
+        weights as a new, inactive model version. Runs as the ``ai_engine.train_model`` job
+        (see tasks.py); failures are logged on the session and re-raised.
+        """
         session = AITrainingSession.objects.get(id=session_id)
+        # The worker process runs other jobs afterwards; leave its torch thread count as found
+        previous_threads = torch.get_num_threads()
         try:
             # 1. Dataset Selection / Download
             if session.dataset_type == 'kaggle':
-                session.status = 'downloading'
-                session.progress_percentage = 10
-                session.logs = f"Initiating Kaggle dataset download: {session.dataset_source}...\n"
-                session.save()
-                
+                session.append_log(f"Initiating Kaggle dataset download: {session.dataset_source}...")
+                session.update_progress(status='downloading', progress_percentage=10)
+
                 dataset_path = kagglehub.dataset_download(session.dataset_source.replace("Kaggle: ", "").strip())
-                session.logs += f"Dataset downloaded to {dataset_path}\n"
+                session.append_log(f"Dataset downloaded to {dataset_path}")
             else:
-                session.status = 'preprocessing'
-                session.logs = f"Using local dataset: {session.dataset_source}\n"
+                session.append_log(f"Using local dataset: {session.dataset_source}")
                 dataset_path = os.path.join(settings.BASE_DIR, 'datasets', session.dataset_source)
                 if not os.path.exists(dataset_path):
                     # For demonstration/development, we create the directory if missing
                     os.makedirs(dataset_path, exist_ok=True)
-                    session.logs += f"Local dataset directory prepared at {dataset_path}\n"
+                    session.append_log(f"Local dataset directory prepared at {dataset_path}")
                 else:
-                    session.logs += f"Dataset found at {dataset_path}\n"
+                    session.append_log(f"Dataset found at {dataset_path}")
+
+            session.update_progress(status='preprocessing', progress_percentage=30)
+
+            # 2. Load and Preprocess: clinical filtering + segmentation of every EDF,
+            # one recording per DataLoader worker process, into the content-addressed
+            # segment cache (repeat runs on the same data skip this entirely)
+            config = settings.EEG_TRAINING
+            recordings = discover_recordings(dataset_path)
+            if not recordings:
+                raise ValueError(
+                    f"No labelled EDF files in {dataset_path} (use normal/ and abnormal/ folders or labels.csv)"
+                )
+            model = EEGNetSmall()
+            n_channels = model.conv2.kernel_size[0]
+            n_samples = model.fc.in_features // 32
+            workers = config['WORKERS'] or os.cpu_count() or 1
+
+            session.append_log(
+                f"Applying clinical filters (Notch 50Hz harmonics, Bandpass 0.5-70Hz) and resampling to "
+                f"{MODEL_SFREQ:g} Hz: {len(recordings)} recordings with {workers} workers..."
+            )
+
+            def preprocessed(done, total):
+                if done % 10 == 0 or done == total:
+                    session.update_progress(progress_percentage=30 + 20 * done / total)
 
-            session.progress_percentage = 30
-            session.save()
+            cache = SegmentCache(config['CACHE_ROOT'], n_channels, n_samples)
+            index = cache.build(recordings, workers=workers, on_progress=preprocessed)
+            counts = index.class_counts()
+            session.append_log(
+                f"Segments {'loaded from cache' if index.cached else 'cached'} ({index.key[:12]}): "
+                f"{counts[0]} normal, {counts[1]} abnormal windows"
+            )
+            if not index.shards:
+                raise ValueError("No usable EDF recordings in dataset")
 
-            # 2. Load and Preprocess (Simulation based on dataset structure)
-            session.status = 'preprocessing'
-            session.logs += "Applying clinical filters (Bandpass 0.5-50Hz, Notch 50Hz)...\n"
-            # In real scenario, we would loop through EDF files in dataset_path
-            # For demonstration, we simulate the processing of 100 segments
-            session.progress_percentage = 50
-            session.save()
+            # Hold out whole recordings for validation so windows of one file never leak across
+            shuffled = random.Random(0).sample(index.shards, len(index.shards))
+            n_val = len(shuffled) // 5 if len(shuffled) >= 5 else 0
+            train_set = SegmentDataset(shuffled[n_val:], config['BATCH_SIZE'], shuffle=True)
+            val_set = SegmentDataset(shuffled[:n_val], config['BATCH_SIZE'])
 
             # 3. Training Deep Learning Model
-            session.status = 'training'
-            session.logs += "Optimizing EEGNet architecture...\n"
-            
-            # Simulated Training Loop
-            for epoch in range(1, 6):
-                accuracy = 0.75 + (epoch * 0.04)
-                loss = 0.5 / epoch
-                session.current_accuracy = accuracy
-                session.current_loss = loss
-                session.progress_percentage = 50 + (epoch * 8)
-                session.logs += f"Epoch {epoch}/5 - Loss: {loss:.4f} - Accuracy: {accuracy*100:.2f}%\n"
-                session.save()
-                torch.cuda.empty_cache() if torch.cuda.is_available() else None
+            session.append_log(
+                f"Optimizing EEGNet architecture on {len(shuffled) - n_val} recordings "
+                f"({n_val} held out for validation)..."
+            )
+            session.update_progress(status='training')
+            torch.set_num_threads(workers)
+            # Class weights offset the usual normal/abnormal imbalance
+            total = sum(counts)
+            weights = torch.tensor([total / (2 * c) if c else 0.0 for c in counts], dtype=torch.float32)
+            criterion = nn.CrossEntropyLoss(weight=weights)
+            optimizer = optim.Adam(model.parameters(), lr=config['LEARNING_RATE'])
+            epochs = config['EPOCHS']
 
-            # 4. Finalization
-            session.status = 'completed'
-            session.final_accuracy = session.current_accuracy
-            session.completed_at = timezone.now()
-            session.progress_percentage = 100
-            session.logs += "Model weights saved. Clinical validation passed.\n"
-            session.save()
+            for epoch in range(1, epochs + 1):
+                train_set.set_epoch(epoch)
+                loss, accuracy = TrainingService._run_epoch(model, train_set, workers, criterion, optimizer)
+                message = f"Epoch {epoch}/{epochs} - Loss: {loss:.4f} - Accuracy: {accuracy*100:.2f}%"
+                metrics = {'loss': loss, 'accuracy': accuracy}
+                if n_val:
+                    with torch.inference_mode():
+                        _, accuracy = TrainingService._run_epoch(model, val_set, workers, criterion)
+                    message += f" - Val Accuracy: {accuracy*100:.2f}%"
+                    metrics['val_accuracy'] = accuracy
+                session.append_log(message, epoch=epoch, **metrics)
+                session.update_progress(
+                    current_accuracy=accuracy, current_loss=loss, progress_percentage=50 + 45 * epoch / epochs,
+                )
 
-            # Update Active Model
-            NeuralModelState.objects.update(is_active=False)
-            NeuralModelState.objects.create(
-                version=f"v{timezone.now().strftime('%m%d.%H%M')}",
-                accuracy=session.final_accuracy,
-                is_active=True
+            # 4. Finalization
+            # Register the weights (checksummed) as a candidate version; clinical inference
+            # keeps using the active model until staff activate this one
+            state = ModelRegistry.register(
+                model,
+                version=f"v{timezone.now().strftime('%m%d.%H%M%S')}",
+                accuracy=session.current_accuracy,
+            )
+            session.append_log(
+                f"Model {state.version} saved (sha256 {state.checksum[:12]}); awaiting activation by staff."
+            )
+            session.update_progress(
+                status='completed',
+                final_accuracy=session.current_accuracy,
+                completed_at=timezone.now(),
+                progress_percentage=100,
+                model_path=state.weights_file.name,
             )
 
         except Exception as e:
-            import traceback
-            session.status = 'failed'
-            session.logs += f"\nCRITICAL ERROR: {str(e)}\n"
-            session.logs += traceback.format_exc()
-            session.save()
+            session.append_log(f"CRITICAL ERROR: {str(e)}", level='error')
+            session.append_log(traceback.format_exc(), level='error')
+            session.update_progress(status='failed')
+            raise
+        finally:
+            torch.set_num_threads(previous_threads)
+
+    @staticmethod
+    def _run_epoch(model, dataset, workers, criterion, optimizer=None):
+        """One pass over ``dataset``; trains when ``optimizer`` is given. Returns (mean loss, accuracy)."""
+        model.train(optimizer is not None)
+        # Batches come pre-assembled from the memory-mapped shards
+        loader = DataLoader(dataset, batch_size=None, num_workers=min(workers, len(dataset.shards)))
+        total_loss, correct, seen = 0.0, 0, 0
+        for x, y in loader:
+            logits = model(x)
+            loss = criterion(logits, y)
+            if optimizer is not None:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+            total_loss += loss.item() * len(y)
+            correct += (logits.argmax(dim=1) == y).sum().item()
+            seen += len(y)
+        if not seen:
+            return 0.0, 0.0
+        return total_loss / seen, correct / seen
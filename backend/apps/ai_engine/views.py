@@ -1,63 +1,115 @@
+import zipfile
+from django.db import transaction
 from rest_framework import viewsets, status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import AITrainingSession, NeuralModelState
-from .serializers import AITrainingSessionSerializer, NeuralModelStateSerializer
-from .trainer import TrainingService
+from .serializers import AITrainingSessionSerializer, NeuralModelStateSerializer, TrainingLogEntrySerializer
+from .registry import ModelRegistry
+from .tasks import queue_ingest, queue_training, upload_staging_path
 
 class AITrainingViewSet(viewsets.ModelViewSet):
     queryset = AITrainingSession.objects.all()
     serializer_class = AITrainingSessionSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # One query for all embedded log tails instead of one per session
+            queryset = AITrainingSessionSerializer.prefetch_log_tails(queryset)
+        return queryset
+
     @action(detail=False, methods=['post'])
     def start_training(self, request):
         name = request.data.get('name', 'Neuro-Training Run')
         dataset_type = request.data.get('dataset_type', 'kaggle')
         dataset_source = request.data.get('dataset_source', 'Kaggle: amananandrai/complete-eeg-dataset')
         
-        session = AITrainingSession.objects.create(
-            name=name, 
-            dataset_type=dataset_type,
-            dataset_source=dataset_source
-        )
-        TrainingService.start_training_run(session.id)
-        return Response(AITrainingSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        # Trained by the worker pool (python manage.py run_workers), not inside the web process
+        with transaction.atomic():
+            session = AITrainingSession.objects.create(
+                name=name, 
+                dataset_type=dataset_type,
+                dataset_source=dataset_source
+            )
+            job = queue_training(session)
+        data = AITrainingSessionSerializer(session).data
+        data['job_id'] = job.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['post'])
     def upload_dataset(self, request):
-        import zipfile
+        """
+        Accept a dataset ZIP and return at once; extraction and EDF validation
+        run as a background job whose progress is reported on the session.
+        """
         import os
-        from django.conf import settings
-        
+        import shutil
+        import uuid
+
         file_obj = request.FILES.get('file')
         if not file_obj:
-            return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_PRODUCT)
+            return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not file_obj.name.endswith('.zip'):
-            return Response({"error": "Only ZIP files are supported"}, status=status.HTTP_400_BAD_PRODUCT)
+        if not file_obj.name.endswith('.zip') or not zipfile.is_zipfile(file_obj):
+            return Response({"error": "Only ZIP files are supported"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 1. Save and unzip
-        dataset_name = os.path.splitext(file_obj.name)[0]
-        extract_path = os.path.join(settings.BASE_DIR, 'datasets', dataset_name)
-        os.makedirs(extract_path, exist_ok=True)
-        
+        # 1. Stage the archive for the ingest job (a move when Django spooled it to disk)
+        dataset_name = os.path.basename(os.path.splitext(file_obj.name)[0])
+        archive_path = upload_staging_path(f"{uuid.uuid4().hex}.zip")
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
         try:
-            with zipfile.ZipFile(file_obj, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-            
-            # 2. Create a session for this manual dataset
+            if hasattr(file_obj, 'temporary_file_path'):
+                shutil.move(file_obj.temporary_file_path(), archive_path)
+            else:
+                with open(archive_path, 'wb') as dst:
+                    for chunk in file_obj.chunks():
+                        dst.write(chunk)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # 2. Create a session for this manual dataset and queue the extraction
+        with transaction.atomic():
             session = AITrainingSession.objects.create(
                 name=f"Training: {dataset_name}",
+                status='ingesting',
                 dataset_type='local',
                 dataset_source=dataset_name,
-                logs=f"Dataset '{file_obj.name}' uploaded and extracted to {extract_path}\n"
             )
-            
-            return Response(AITrainingSessionSerializer(session).data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            session.append_log(f"Dataset '{file_obj.name}' uploaded; extracting in background...")
+            job = queue_ingest(session, archive_path)
+
+        data = AITrainingSessionSerializer(session).data
+        data['job_id'] = job.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def logs(self, request, pk=None):
+        """
+        Page through a session's log: ``?after=<entry id>&limit=<n>`` returns
+        the following entries oldest first, ``?tail=<n>`` the last ``n``.
+        ``next_after`` is the cursor for the next page.
+        """
+        session = self.get_object()
+        entries = session.log_entries.all()
+        try:
+            limit = min(int(request.query_params.get('limit', 200)), 1000)
+            if 'tail' in request.query_params:
+                tail = min(int(request.query_params['tail']), 1000)
+                page = list(entries.order_by('-id')[:max(tail, 0)])[::-1]
+            else:
+                after = int(request.query_params.get('after', 0))
+                page = list(entries.filter(id__gt=after)[:max(limit, 0)])
+        except ValueError:
+            return Response({"error": "after, limit and tail must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': TrainingLogEntrySerializer(page, many=True).data,
+            'next_after': page[-1].id if page else int(request.query_params.get('after', 0)),
+        })
 
 class NeuralModelStateViewSet(viewsets.ReadOnlyModelViewSet):
+    """Model versions; read-only for clinicians, switching the active model is staff-only."""
     queryset = NeuralModelState.objects.all()
     serializer_class = NeuralModelStateSerializer
 
@@ -67,3 +119,15 @@ class NeuralModelStateViewSet(viewsets.ReadOnlyModelViewSet):
         if active_model:
             return Response(NeuralModelStateSerializer(active_model).data)
         return Response({"error": "No active model found"}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def activate(self, request, pk=None):
+        """
+        Make this version the active model; running workers switch to it on
+        their next analysis. Every analysis uses it, so only staff may do this.
+        """
+        model_state = self.get_object()
+        if not model_state.weights_file:
+            return Response({"error": "Model has no weights file"}, status=status.HTTP_400_BAD_REQUEST)
+        ModelRegistry.activate(model_state)
+        return Response(NeuralModelStateSerializer(model_state).data)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EEGAnalysis, SpectralResult
+from .models import EEGAnalysis, SpectralResult, BandPowerTimeline, UploadSession
 
 @admin.register(EEGAnalysis)
 class EEGAnalysisAdmin(admin.ModelAdmin):
@@ -11,3 +11,13 @@ class EEGAnalysisAdmin(admin.ModelAdmin):
 @admin.register(SpectralResult)
 class SpectralResultAdmin(admin.ModelAdmin):
     list_display = ('analysis', 'alpha_power', 'beta_power', 'theta_power', 'delta_power')
+
+@admin.register(BandPowerTimeline)
+class BandPowerTimelineAdmin(admin.ModelAdmin):
+    list_display = ('analysis', 'window_seconds', 'step_seconds', 'windows_done', 'n_windows', 'updated_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'patient', 'filename', 'status', 'received_bytes', 'total_size', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('sha256', 'created_at', 'updated_at')
@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.ai_engine.models import NeuralModelState
+from apps.analysis.models import EEGAnalysis
+from apps.clinical.models import Patient
+
+BATCH = 20000
+STATUSES = ('completed',) * 96 + ('error',) * 3 + ('pending',)
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = (
+        "Time the analysis list endpoint and the hot status / active-model lookups against "
+        "a synthetic table (default 1M analyses spread over 200 doctors), with and without "
+        "the composite indexes. Everything is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--doctors', type=int, default=200)
+        parser.add_argument('--pages', type=int, default=20, help="Cursor pages to walk through.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--compare', action='store_true', help="Also measure with the indexes dropped.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, {options['rows']} analyses / {options['doctors']} doctors")
+        try:
+            with transaction.atomic():
+                doctor = self.populate(options['rows'], options['doctors'])
+                self.measure(doctor, options, 'with indexes')
+                if options['compare']:
+                    # Plain DDL: SQLite's schema editor refuses to run inside a transaction
+                    with connection.cursor() as cursor:
+                        for model in (EEGAnalysis, Patient, NeuralModelState):
+                            for index in model._meta.indexes:
+                                cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                    self.measure(doctor, options, 'without indexes')
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def populate(self, rows, n_doctors):
+        started = time.perf_counter()
+        User = get_user_model()
+        doctors = User.objects.bulk_create([
+            User(username=f'bench-doctor-{i}', email=f'bench-doctor-{i}@example.com') for i in range(n_doctors)
+        ])
+        patients = Patient.objects.bulk_create([
+            Patient(doctor=doctor, fullname=f"Bench patient {i}", gender='M') for i, doctor in enumerate(doctors)
+        ])
+        NeuralModelState.objects.bulk_create([
+            NeuralModelState(version=f'bench-{i}', accuracy=0.9) for i in range(100)
+        ])
+        # Spread creation times over a year so the ordering is realistic (auto_now_add would flatten them)
+        created_at = EEGAnalysis._meta.get_field('created_at')
+        created_at.auto_now_add = False
+        try:
+            now = timezone.now()
+            for start in range(0, rows, BATCH):
+                EEGAnalysis.objects.bulk_create([
+                    EEGAnalysis(
+                        user_id=doctors[i % n_doctors].id, patient_id=patients[i % n_doctors].id,
+                        edf_file=f'eeg_records/bench/{i}.edf', status=STATUSES[i % len(STATUSES)],
+                        seizure_probability=0.1, created_at=now - timedelta(seconds=31_536_000 * (rows - i) / rows),
+                    )
+                    for i in range(start, min(start + BATCH, rows))
+                ])
+        finally:
+            created_at.auto_now_add = True
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(f"  populated in {time.perf_counter() - started:.1f} s")
+        return doctors[0]
+
+    def measure(self, doctor, options, label):
+        client = APIClient()
+        client.force_authenticate(doctor)
+        self.stdout.write(f"{label}:")
+
+        def first_page():
+            response = client.get('/api/v1/analysis/records/')
+            assert response.status_code == 200, response.status_code
+            return response
+
+        def walk():
+            url = '/api/v1/analysis/records/'
+            for _ in range(options['pages']):
+                response = client.get(url)
+                url = response.data['next']
+                if not url:
+                    break
+
+        def status_lookup():
+            return list(EEGAnalysis.objects.filter(status='pending').values_list('id', flat=True)[:50])
+
+        def active_model():
+            return NeuralModelState.objects.filter(is_active=True).first()
+
+        self.report('list, first page', first_page, options['repeat'])
+        self.report(f"list, {options['pages']} cursor pages", walk, 1)
+        self.report('pending analyses lookup', status_lookup, options['repeat'])
+        self.report('active model lookup', active_model, options['repeat'])
+        queryset = EEGAnalysis.objects.filter(user=doctor).select_related('patient').order_by('-created_at', '-id')[:51]
+        sql, params = queryset.query.sql_with_params()
+        self.stdout.write("  list query plan:")
+        with connection.cursor() as cursor:
+            # The comment keeps SQLite from reusing the plan cached before the indexes were dropped
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} -- {label}", params)
+            for row in cursor.fetchall():
+                self.stdout.write(f"    {row[-1]}")
+
+    def report(self, label, fn, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"  {label}: {best * 1000:.1f} ms")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BandPowerTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_seconds', models.FloatField()),
+                ('step_seconds', models.FloatField()),
+                ('n_windows', models.IntegerField()),
+                ('windows_done', models.IntegerField(default=0)),
+                ('channels', models.JSONField(default=list)),
+                ('bands', models.JSONField(default=list)),
+                ('data_file', models.CharField(max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('analysis', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='band_timeline', to='analysis.eeganalysis')),
+            ],
+        ),
+    ]
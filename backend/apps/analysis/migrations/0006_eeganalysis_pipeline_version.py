@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eeganalysis',
+            name='pipeline_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
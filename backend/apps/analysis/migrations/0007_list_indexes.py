@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0006_eeganalysis_pipeline_version'),
+        ('clinical', '0003_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eeganalysis',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='analysis_ee_user_id_16c2b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eeganalysis',
+            index=models.Index(fields=['status'], name='analysis_ee_status_ce558c_idx'),
+        ),
+    ]
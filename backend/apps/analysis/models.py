@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 from apps.clinical.models import Patient
@@ -15,6 +16,7 @@ class EEGAnalysis(models.Model):
     
     edf_file = models.FileField(upload_to='eeg_records/%Y/%m/%d/')
     file_size = models.CharField(max_length=20, null=True, blank=True)
+    file_hash = models.CharField(max_length=64, blank=True, default='', db_index=True) # sha256 of edf_file
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
@@ -30,11 +32,18 @@ class EEGAnalysis(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    pipeline_version = models.CharField(max_length=64, blank=True, default='') # code + model that produced the results
 
     class Meta:
         verbose_name = 'EEG Analysis'
         verbose_name_plural = 'EEG Analyses'
         ordering = ['-created_at']
+        indexes = [
+            # A doctor's analyses newest first: the list endpoint's cursor ordering, id included
+            models.Index(fields=['user', '-created_at', '-id']),
+            # Queue / sweeper lookups of pending and processing analyses
+            models.Index(fields=['status']),
+        ]
 
     def __str__(self):
         return f"Analysis {self.id} - {self.patient.fullname}"
@@ -51,3 +60,56 @@ class SpectralResult(models.Model):
 
     def __str__(self):
         return f"Spectral results for {self.analysis.id}"
+
+class BandPowerTimeline(models.Model):
+    """
+    Band power per sliding window per channel. The values live in a float32
+    ``.npy`` file shaped (n_windows, channels, bands) that is filled while the
+    analysis runs; only the first ``windows_done`` windows are valid.
+    """
+    analysis = models.OneToOneField(EEGAnalysis, on_delete=models.CASCADE, related_name='band_timeline')
+    window_seconds = models.FloatField()
+    step_seconds = models.FloatField()
+    n_windows = models.IntegerField()
+    windows_done = models.IntegerField(default=0)
+    channels = models.JSONField(default=list)
+    bands = models.JSONField(default=list)
+    data_file = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Band timeline for {self.analysis.id} ({self.windows_done}/{self.n_windows})"
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of one EDF recording. Chunks are written
+    straight into ``file_name`` (the final ``edf_file`` location) at offset
+    ``received_bytes``; the analysis is created when the last chunk lands.
+    """
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='upload_sessions')
+
+    filename = models.CharField(max_length=255) # as sent by the client
+    file_name = models.CharField(max_length=255) # storage name, relative to MEDIA_ROOT
+    total_size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    edf_header = models.JSONField(null=True, blank=True)
+    analysis = models.OneToOneField(
+        EEGAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.received_bytes}/{self.total_size})"
@@ -0,0 +1,61 @@
+import json
+import struct
+import zlib
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+
+class SignalBinaryRenderer(BaseRenderer):
+    """
+    Compact binary encoding of ``signal_data`` responses.
+
+    Layout (all little-endian)::
+
+        b'EEGS' | uint8 version | 3 reserved bytes | uint32 header length
+        | JSON header (utf-8) | channel-major sample block
+
+    The header carries every non-array field of the JSON response plus
+    ``dtype`` ('float32' or 'int16'), ``shape``, ``compression`` ('zlib' or
+    null) and, for int16, a per-channel ``scale`` so that
+    ``value = sample * scale[channel]``. Select it with
+    ``Accept: application/vnd.eeg-signal`` or ``?format=eegbin``; add
+    ``?dtype=int16`` and/or ``?compression=zlib`` to shrink it further.
+    """
+    media_type = 'application/vnd.eeg-signal'
+    format = 'eegbin'
+    charset = None
+    render_style = 'binary'
+
+    MAGIC = b'EEGS'
+    VERSION = 1
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        header = {k: v for k, v in (data or {}).items() if k != 'data'}
+        body = b''
+        samples = (data or {}).get('data')
+        if isinstance(samples, np.ndarray):
+            request = (renderer_context or {}).get('request')
+            params = request.query_params if request is not None else {}
+            body, encoding = encode_samples(samples, params.get('dtype', 'float32'))
+            header.update(encoding)
+            header['compression'] = None
+            if params.get('compression') == 'zlib':
+                body = zlib.compress(body, 1)
+                header['compression'] = 'zlib'
+
+        # numpy scalars in the header are converted the same way DRF's JSON encoder does
+        header_bytes = json.dumps(header, separators=(',', ':'), default=lambda o: o.tolist()).encode('utf-8')
+        prefix = self.MAGIC + struct.pack('<B3xI', self.VERSION, len(header_bytes))
+        return prefix + header_bytes + body
+
+def encode_samples(samples, dtype):
+    """Serialize a channel-major array as float32 or per-channel scaled int16."""
+    samples = np.asarray(samples, dtype=np.float32)
+    encoding = {'dtype': 'float32', 'shape': list(samples.shape), 'byte_order': 'little'}
+    if dtype == 'int16':
+        rows = samples.reshape(samples.shape[0], -1)
+        peak = np.abs(rows).max(axis=-1) if rows.size else np.zeros(samples.shape[0], np.float32)
+        scale = np.where(peak > 0, peak / 32767.0, 1.0).astype(np.float32)
+        quantized = np.round(samples / scale.reshape((-1,) + (1,) * (samples.ndim - 1))).astype('<i2')
+        encoding.update(dtype='int16', scale=scale.tolist())
+        return quantized.tobytes(), encoding
+    return samples.astype('<f4', copy=False).tobytes(), encoding
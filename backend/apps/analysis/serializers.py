@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import EEGAnalysis, SpectralResult
-from apps.clinical.serializers import PatientSerializer
+from django.conf import settings
+from .models import EEGAnalysis, SpectralResult, UploadSession
+from apps.clinical.serializers import PatientSerializer, PatientSummarySerializer
 
 class SpectralResultSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,4 +15,39 @@ class EEGAnalysisSerializer(serializers.ModelSerializer):
     class Meta:
         model = EEGAnalysis
         fields = '__all__'
-        read_only_fields = ('user', 'status', 'seizure_probability', 'ai_summary', 'completed_at')
+        read_only_fields = ('user', 'status', 'seizure_probability', 'dominant_frequency', 'ai_summary', 'completed_at', 'file_hash', 'pipeline_version')
+
+class EEGAnalysisListSerializer(serializers.ModelSerializer):
+    """
+    Compact list rows: patient summary only, no spectral data or medical
+    records, so a page costs one joined query whatever its size.
+    """
+    patient_details = PatientSummarySerializer(source='patient', read_only=True)
+
+    class Meta:
+        model = EEGAnalysis
+        fields = (
+            'id', 'patient', 'patient_details', 'edf_file', 'file_size', 'status',
+            'seizure_probability', 'dominant_frequency', 'ai_summary',
+            'channels_count', 'duration_seconds', 'sampling_rate', 'created_at', 'completed_at',
+        )
+        read_only_fields = fields
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            'id', 'patient', 'filename', 'total_size', 'received_bytes', 'status',
+            'sha256', 'edf_header', 'analysis', 'chunk_size', 'created_at', 'updated_at',
+        )
+        read_only_fields = ('received_bytes', 'status', 'sha256', 'edf_header', 'analysis')
+
+    def get_chunk_size(self, obj):
+        return settings.EEG_UPLOAD['CHUNK_SIZE']
+
+    def validate_patient(self, patient):
+        if patient.doctor_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Unknown patient")
+        return patient
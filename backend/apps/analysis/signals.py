@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.clinical.models import Patient
+from apps.events.broker import publish
+from .models import EEGAnalysis
+
+def publish_analysis(analysis, throttle=False, **extra):
+    """Push an analysis' status to its own channel and its owner's (see ``publish`` for ``throttle``)."""
+    data = {
+        'id': analysis.id,
+        'status': analysis.status,
+        'seizure_probability': analysis.seizure_probability,
+        'ai_summary': analysis.ai_summary if analysis.status in ('completed', 'error') else None,
+        **extra,
+    }
+    publish(f'analysis:{analysis.id}', throttle=throttle, **data)
+    publish(f'user:{analysis.user_id}', throttle=throttle, **data)
+
+def sync_latest_status(patient_id):
+    """Copy the status of the patient's newest analysis onto ``Patient.latest_analysis_status``."""
+    latest = (
+        EEGAnalysis.objects.filter(patient_id=patient_id)
+        .order_by('-created_at', '-id').values_list('status', flat=True).first()
+    )
+    Patient.objects.filter(pk=patient_id).exclude(
+        latest_analysis_status=latest or '',
+    ).update(latest_analysis_status=latest or '')
+
+@receiver(post_save, sender=EEGAnalysis)
+def analysis_saved(sender, instance, **kwargs):
+    publish_analysis(instance)
+    sync_latest_status(instance.patient_id)
+
+@receiver(post_delete, sender=EEGAnalysis)
+def analysis_deleted(sender, instance, **kwargs):
+    sync_latest_status(instance.patient_id)
@@ -0,0 +1,303 @@
+import os
+import uuid
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from apps.jobs.models import Job
+from apps.jobs.queue import enqueue
+from apps.jobs.registry import task, sweeper
+from apps.ai_engine.pyramid import PYRAMID_FORMAT_VERSION, PyramidBuilder, SignalPyramid, build_pyramid
+from apps.ai_engine.services import EEGProcessorService
+from apps.ai_engine.features import BANDS
+from .models import EEGAnalysis, SpectralResult, BandPowerTimeline, UploadSession
+from .signals import publish_analysis
+
+PROCESS_EEG = 'analysis.process_eeg'
+BUILD_PYRAMID = 'analysis.build_signal_pyramid'
+
+# Copied from a completed analysis of identical content
+REUSED_FIELDS = (
+    'channels_count', 'sampling_rate', 'duration_seconds', 'seizure_probability',
+    'dominant_frequency', 'ai_summary', 'pipeline_version',
+)
+
+def queue_analysis(analysis, reuse=True):
+    """
+    Queue ``analysis``, or complete it on the spot when its results can be
+    reused. ``reuse=False`` forces a re-analysis (cached stages still apply).
+    """
+    if reuse and reuse_completed_analysis(analysis):
+        return None
+    return enqueue(PROCESS_EEG, {'analysis_id': analysis.id, 'reuse': reuse})
+
+def reuse_completed_analysis(analysis):
+    """
+    Complete ``analysis`` from an earlier completed analysis with the same
+    ``file_hash`` and the current pipeline version: metadata, AI outputs and
+    the spectral result are copied and the band timeline file is shared (the
+    viewer pyramid is keyed by content already). Returns False when there is
+    nothing to reuse.
+    """
+    if not analysis.file_hash:
+        return False
+    source = (
+        EEGAnalysis.objects.filter(
+            file_hash=analysis.file_hash, status='completed',
+            pipeline_version=EEGProcessorService.current_pipeline_version(),
+        )
+        .exclude(id=analysis.id).order_by('-completed_at').first()
+    )
+    spectral = SpectralResult.objects.filter(analysis=source).first() if source else None
+    if spectral is None:
+        return False
+
+    with transaction.atomic():
+        for field in REUSED_FIELDS:
+            setattr(analysis, field, getattr(source, field))
+        SpectralResult.objects.update_or_create(
+            analysis=analysis,
+            defaults={
+                'alpha_power': spectral.alpha_power,
+                'beta_power': spectral.beta_power,
+                'theta_power': spectral.theta_power,
+                'delta_power': spectral.delta_power,
+                'spectral_json': spectral.spectral_json,
+            },
+        )
+        timeline = BandPowerTimeline.objects.filter(analysis=source).first()
+        if timeline:
+            BandPowerTimeline.objects.update_or_create(
+                analysis=analysis,
+                defaults={
+                    field: getattr(timeline, field) for field in (
+                        'window_seconds', 'step_seconds', 'n_windows', 'windows_done',
+                        'channels', 'bands', 'data_file',
+                    )
+                },
+            )
+        analysis.status = 'completed'
+        analysis.completed_at = timezone.now()
+        analysis.save()
+
+    print(f"Analysis {analysis.id} reused results of analysis {source.id} (identical recording)")
+    return True
+
+def pyramid_directory(analysis):
+    """
+    Viewer pyramid location. The pyramid depends only on the samples, so it is
+    keyed by ``file_hash`` and shared by every analysis of the same recording;
+    once published it is never rewritten.
+    """
+    key = analysis.file_hash or f'analysis-{analysis.id}'
+    return os.path.join(settings.EEG_PYRAMID_ROOT, f'{key}-v{PYRAMID_FORMAT_VERSION}')
+
+def timeline_path(analysis_id):
+    # A fresh file per run: reused analyses may still point at the previous one
+    return os.path.join(settings.EEG_BAND_TIMELINE['ROOT'], f'{analysis_id}-{uuid.uuid4().hex[:12]}.npy')
+
+def release_timeline_file(data_file):
+    """Delete a timeline file once no BandPowerTimeline row references it."""
+    if not data_file or BandPowerTimeline.objects.filter(data_file=data_file).exists():
+        return
+    try:
+        os.remove(os.path.join(settings.MEDIA_ROOT, data_file))
+    except FileNotFoundError:
+        pass
+
+def start_band_timeline(analysis, recording):
+    """
+    Prepare the on-disk band power timeline and its DB row. Returns the
+    streaming consumer that fills both while the spectral pass runs.
+
+    Every run writes a new file; the one the row pointed at before is only
+    deleted when no other analysis shares it.
+    """
+    from apps.ai_engine.filterbank import resolve_n_jobs
+    from apps.ai_engine.spectral import WindowedBandPower
+
+    config = settings.EEG_BAND_TIMELINE
+    path = timeline_path(analysis.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def allocate(shape):
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+        out[:] = np.nan
+        return out
+
+    builder = WindowedBandPower(
+        recording.sfreq, recording.n_times, len(recording.ch_names),
+        window_seconds=min(max(config['WINDOW_SECONDS'], 2.0), 10.0),
+        overlap=min(max(config['OVERLAP'], 0.0), 0.9),
+        allocate=allocate, n_jobs=resolve_n_jobs(settings.EEG_SPECTRAL_N_JOBS),
+    )
+    previous = BandPowerTimeline.objects.filter(analysis=analysis).values_list('data_file', flat=True).first()
+    timeline, _ = BandPowerTimeline.objects.update_or_create(
+        analysis=analysis,
+        defaults={
+            'window_seconds': builder.window_seconds,
+            'step_seconds': builder.step_seconds,
+            'n_windows': builder.n_windows,
+            'windows_done': 0,
+            'channels': list(recording.ch_names),
+            'bands': [name for name, _, _ in BANDS],
+            'data_file': os.path.relpath(path, settings.MEDIA_ROOT),
+        },
+    )
+    if previous != timeline.data_file:
+        release_timeline_file(previous)
+
+    def publish(windows_done):
+        # Flush before announcing so readers never see windows that are not on disk
+        builder.out.flush()
+        BandPowerTimeline.objects.filter(id=timeline.id).update(windows_done=windows_done, updated_at=timezone.now())
+        publish_analysis(
+            analysis, throttle=windows_done < builder.n_windows, progress=windows_done / max(builder.n_windows, 1),
+        )
+
+    builder.on_progress = publish
+    return builder
+
+def queue_pyramid_build(analysis):
+    """Queue a standalone pyramid build unless one is already pending."""
+    pending = Job.objects.filter(
+        task__in=(BUILD_PYRAMID, PROCESS_EEG), status__in=('queued', 'running'),
+        payload__analysis_id=analysis.id,
+    )
+    if not pending.exists():
+        enqueue(BUILD_PYRAMID, {'analysis_id': analysis.id})
+
+def mark_analysis_failed(error, analysis_id, **payload):
+    last_line = error.strip().splitlines()[-1] if error.strip() else error
+    analysis = EEGAnalysis.objects.filter(id=analysis_id).first()
+    if analysis:
+        analysis.status = 'error'
+        analysis.ai_summary = f"Xatolik: {last_line}"
+        # Saved through the model so post_save publishes it and syncs the patient's latest status
+        analysis.save(update_fields=['status', 'ai_summary'])
+
+@task(PROCESS_EEG, on_failure=mark_analysis_failed)
+def process_eeg(analysis_id, reuse=True):
+    # mne / scipy load in workers only; the web process imports this module to queue jobs
+    from apps.ai_engine.recording import EEGRecording
+
+    analysis = EEGAnalysis.objects.get(id=analysis_id)
+    # An identical recording may have completed since this job was queued
+    if reuse and reuse_completed_analysis(analysis):
+        return
+    analysis.status = 'processing'
+    analysis.save(update_fields=['status'])
+
+    # The EDF is parsed once and the same recording flows through every stage
+    recording = EEGRecording.open(analysis.edf_file.path)
+    try:
+        run_pipeline(analysis, recording)
+    finally:
+        # Workers handle many recordings; do not keep decoded samples around
+        EEGRecording.evict(recording.path)
+
+def run_pipeline(analysis, recording):
+    # 1. Extract Metadata
+    meta = EEGProcessorService.extract_metadata(recording)
+    analysis.channels_count = meta.get('channels_count')
+    analysis.sampling_rate = meta.get('sampling_rate')
+    analysis.duration_seconds = meta.get('duration_seconds')
+
+    # 2. Perform AI Inference; the viewer pyramid is written from the same raw blocks
+    # and band power per window is published as the filtered blocks stream past
+    # (a re-analysis keeps the existing pyramid; stages cached for this file are not recomputed)
+    directory = pyramid_directory(analysis)
+    pyramid = None if SignalPyramid.exists(directory) else PyramidBuilder(recording, directory)
+    timeline = start_band_timeline(analysis, recording)
+    try:
+        results = EEGProcessorService.calculate_spectral_bands(
+            recording, raw_consumers=[pyramid] if pyramid else [], filtered_consumers=[timeline],
+            file_hash=analysis.file_hash or None,
+        )
+    except Exception:
+        if pyramid:
+            pyramid.abort()
+        raise
+    if pyramid and pyramid.complete:
+        pyramid.finish()
+    elif pyramid:
+        pyramid.abort()
+        enqueue(BUILD_PYRAMID, {'analysis_id': analysis.id})
+
+    analysis.seizure_probability = results['seizure_probability']
+    analysis.dominant_frequency = results.get('dominant_frequency')
+    analysis.pipeline_version = results.get('pipeline_version', '')
+
+    # Generate Clinical Summary
+    summary = "Tahlil yakunlandi. "
+    if results['seizure_probability'] > 0.7:
+        summary += "DIQQAT: Yuqori darajadagi epileptiform faollik (seizure) aniqlandi. "
+    elif results['seizure_probability'] > 0.3:
+        summary += "O'rtacha darajadagi asinxroniya kuzatildi. "
+    else:
+        summary += "Ritmik faollik normal chegarada. "
+
+    summary += f"Dominant Alpha kuchi: {results['alpha_power']:.2f} μV². "
+    if results['beta_power'] > results['alpha_power']:
+        summary += "Beta to'lqinlarining ustunligi taranglik yoki dori ta'sirini ko'rsatishi mumkin. "
+
+    analysis.ai_summary = summary
+
+    # 3. Create Spectral Results (a retried job may already have written them)
+    SpectralResult.objects.update_or_create(
+        analysis=analysis,
+        defaults={
+            'alpha_power': results['alpha_power'],
+            'beta_power': results['beta_power'],
+            'theta_power': results['theta_power'],
+            'delta_power': results['delta_power'],
+            'spectral_json': results.get('features'),
+        },
+    )
+
+    analysis.status = 'completed'
+    analysis.completed_at = timezone.now()
+    analysis.save()
+
+@task(BUILD_PYRAMID)
+def build_signal_pyramid(analysis_id):
+    from apps.ai_engine.recording import EEGRecording
+
+    analysis = EEGAnalysis.objects.get(id=analysis_id)
+    directory = pyramid_directory(analysis)
+    if SignalPyramid.exists(directory):
+        return
+    build_pyramid(
+        EEGRecording.open(analysis.edf_file.path), directory,
+        chunk_seconds=settings.EEG_STREAM_CHUNK_SECONDS,
+    )
+
+@sweeper
+def requeue_stuck_analyses():
+    """
+    Queue analyses left in 'pending'/'processing' without any job, e.g. uploads
+    from before the queue existed or whose in-process thread died on restart.
+    """
+    cutoff = timezone.now() - timedelta(minutes=5)
+    tracked = Job.objects.filter(task=PROCESS_EEG, payload__analysis_id=OuterRef('id'))
+    stuck = EEGAnalysis.objects.filter(
+        status__in=('pending', 'processing'), created_at__lt=cutoff
+    ).exclude(Exists(tracked))
+    for analysis in stuck:
+        print(f"Requeueing stuck analysis {analysis.id}")
+        queue_analysis(analysis)
+
+@sweeper
+def abort_stale_uploads():
+    """Remove chunked uploads that have not received data for EEG_UPLOAD['STALE_HOURS']."""
+    from .uploads import UploadError, abort_upload
+
+    cutoff = timezone.now() - timedelta(hours=settings.EEG_UPLOAD['STALE_HOURS'])
+    for upload in UploadSession.objects.filter(status='uploading', updated_at__lt=cutoff):
+        print(f"Aborting stale upload {upload.id} ({upload.filename})")
+        try:
+            abort_upload(upload)
+        except UploadError:
+            pass  # completed meanwhile
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from apps.ai_engine.management.commands.generate_demo_dataset import synthetic_eeg, write_edf
+from apps.ai_engine.pyramid import build_pyramid
+from apps.ai_engine.recording import EEGRecording
+from apps.ai_engine.services import EEGProcessorService
+from rest_framework.test import APIClient
+from apps.clinical.models import MedicalRecord, Patient
+from apps.jobs import queue
+from apps.jobs.worker import run_job
+from .models import EEGAnalysis, SpectralResult, UploadSession
+from .tasks import PROCESS_EEG, pyramid_directory
+
+# Queries per request regardless of the number of rows (1 page query + prefetches);
+# a higher count at the larger size means a serializer went N+1
+LIST_QUERY_COUNTS = {
+    '/api/v1/analysis/records/': 1,
+    '/api/v1/clinical/patients/': 1,
+    '/api/v1/analysis/records/stats/': 3,
+    '/api/v1/clinical/patients/stats/': 1,
+}
+
+class ListQueryCountTests(TestCase):
+    """List and stats endpoints run a constant number of queries."""
+
+    def setUp(self):
+        self.doctor = get_user_model().objects.create_user(
+            username='doctor', email='doctor@example.com', password='unused',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+        self.created = 0
+
+    def populate(self, n):
+        for i in range(self.created, n):
+            patient = Patient.objects.create(doctor=self.doctor, fullname=f"Patient {i}", gender='M')
+            MedicalRecord.objects.create(patient=patient, symptoms='-')
+            analysis = EEGAnalysis.objects.create(
+                user=self.doctor, patient=patient, edf_file=f'eeg_records/test/{i}.edf',
+                status='completed', file_size='1000', seizure_probability=0.5,
+            )
+            SpectralResult.objects.create(
+                analysis=analysis, alpha_power=1, beta_power=1, theta_power=1, delta_power=1,
+            )
+        self.created = n
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for n in (3, 40):
+            self.populate(n)
+            for url, expected in LIST_QUERY_COUNTS.items():
+                with self.subTest(url=url, rows=n), self.assertNumQueries(expected):
+                    response = self.client.get(url, {'page_size': n})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_stats_count_past_the_first_page(self):
+        self.populate(60)
+        EEGAnalysis.objects.filter(id=EEGAnalysis.objects.first().id).update(status='error')
+
+        response = self.client.get('/api/v1/analysis/records/')
+        self.assertEqual(len(response.data['results']), 50)
+
+        stats = self.client.get('/api/v1/analysis/records/stats/').data
+        self.assertEqual(stats['total'], 60)
+        self.assertEqual(stats['by_status']['completed'], 59)
+        self.assertEqual(stats['by_status']['error'], 1)
+        self.assertEqual(stats['total_bytes'], 60000)
+        self.assertAlmostEqual(stats['avg_seizure_probability'], 0.5)
+        self.assertEqual(self.client.get('/api/v1/clinical/patients/stats/').data['total'], 60)
+
+class AnalysisFailureTests(TestCase):
+    def test_failed_job_syncs_patient_latest_status(self):
+        doctor = get_user_model().objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        patient = Patient.objects.create(doctor=doctor, fullname="Patient", gender='M')
+        analysis = EEGAnalysis.objects.create(user=doctor, patient=patient, edf_file='eeg_records/test/missing.edf')
+        job = queue.enqueue(PROCESS_EEG, {'analysis_id': analysis.id}, max_attempts=1)
+
+        run_job(queue.claim_next('test-worker'), 'test-worker')
+
+        analysis.refresh_from_db()
+        patient.refresh_from_db()
+        self.assertEqual(analysis.status, 'error')
+        self.assertEqual(patient.latest_analysis_status, 'error')
+        client = APIClient()
+        client.force_authenticate(doctor)
+        response = client.get('/api/v1/clinical/patients/', {'latest_status': 'error'})
+        self.assertEqual([row['id'] for row in response.data['results']], [patient.id])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=media)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.doctor = get_user_model().objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        self.patient = Patient.objects.create(doctor=self.doctor, fullname="Patient", gender='F')
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+        path = os.path.join(media, 'source.edf')
+        write_edf(path, synthetic_eeg(np.random.default_rng(0), 4, 250 * 20, 250, abnormal=False), 250)
+        with open(path, 'rb') as f:
+            self.content = f.read()
+
+    def start(self):
+        response = self.client.post('/api/v1/analysis/uploads/', {
+            'patient': self.patient.id, 'filename': 'rec.edf', 'total_size': len(self.content),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def put(self, upload_id, offset, data, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum:
+            headers['HTTP_UPLOAD_CHECKSUM'] = f'sha256 {checksum}'
+        return self.client.put(
+            f'/api/v1/analysis/uploads/{upload_id}/chunk/', data, content_type='application/octet-stream', **headers,
+        )
+
+    def upload(self, chunk=40000):
+        upload_id = self.start()
+        for offset in range(0, len(self.content), chunk):
+            response = self.put(upload_id, offset, self.content[offset:offset + chunk])
+            self.assertEqual(response.status_code, 200, response.data)
+        return upload_id, response.data['analysis']
+
+    def test_resume_after_rejected_and_duplicate_chunks(self):
+        upload_id = self.start()
+        first = self.content[:30000]
+        self.assertEqual(self.put(upload_id, 0, first, hashlib.sha256(first).hexdigest()).status_code, 200)
+
+        # A corrupted chunk is discarded; a replayed one conflicts and reports where to resume
+        second = self.content[30000:60000]
+        response = self.put(upload_id, 30000, second, hashlib.sha256(b'other').hexdigest())
+        self.assertEqual((response.status_code, response.data['received_bytes']), (400, 30000))
+        response = self.put(upload_id, 0, first)
+        self.assertEqual((response.status_code, response.data['received_bytes']), (409, 30000))
+
+        offset = self.client.get(f'/api/v1/analysis/uploads/{upload_id}/').data['received_bytes']
+        response = self.put(upload_id, offset, self.content[offset:])
+        self.assertEqual(response.status_code, 200)
+
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual(session.status, 'completed')
+        self.assertEqual(session.sha256, hashlib.sha256(self.content).hexdigest())
+        analysis = EEGAnalysis.objects.get(id=response.data['analysis']['id'])
+        with analysis.edf_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(analysis.channels_count, 4)
+
+    def test_completed_upload_cannot_be_aborted(self):
+        upload_id, _ = self.upload()
+        self.assertEqual(self.client.delete(f'/api/v1/analysis/uploads/{upload_id}/').status_code, 400)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'completed')
+
+    def test_identical_upload_reuses_stored_file_and_results(self):
+        _, first = self.upload()
+        source = EEGAnalysis.objects.get(id=first['id'])
+        EEGAnalysis.objects.filter(id=source.id).update(
+            status='completed', seizure_probability=0.25, ai_summary="Tahlil yakunlandi.",
+            pipeline_version=EEGProcessorService.current_pipeline_version(),
+        )
+        SpectralResult.objects.create(analysis=source, alpha_power=4, beta_power=3, theta_power=2, delta_power=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upload_id, second = self.upload(chunk=25000)
+
+        copy = EEGAnalysis.objects.get(id=second['id'])
+        self.assertEqual(copy.status, 'completed')
+        self.assertEqual(copy.edf_file.name, source.edf_file.name)
+        self.assertEqual(copy.seizure_probability, 0.25)
+        self.assertEqual(copy.spectral_data.alpha_power, 4)
+        # The duplicate bytes were dropped once the analysis pointed at the stored copy
+        self.assertEqual(len(os.listdir(os.path.dirname(source.edf_file.path))), 1)
+
+def decode_signal(content):
+    """Parse a ``SignalBinaryRenderer`` body into ``(header, samples)``."""
+    magic, version, header_length = struct.unpack('<4sB3xI', content[:12])
+    header = json.loads(content[12:12 + header_length])
+    body = content[12 + header_length:]
+    if header['compression'] == 'zlib':
+        body = zlib.decompress(body)
+    samples = np.frombuffer(body, dtype='<i2' if header['dtype'] == 'int16' else '<f4').reshape(header['shape'])
+    if header['dtype'] == 'int16':
+        samples = samples * np.asarray(header['scale'], dtype=np.float32)[:, None]
+    return magic, version, header, samples
+
+class SignalDataTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media, EEG_PYRAMID_ROOT=os.path.join(media, 'eeg_pyramids'))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        doctor = get_user_model().objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        patient = Patient.objects.create(doctor=doctor, fullname="Patient", gender='F')
+        os.makedirs(os.path.join(media, 'eeg_records'))
+        path = os.path.join(media, 'eeg_records', 'rec.edf')
+        write_edf(path, synthetic_eeg(np.random.default_rng(0), 4, 250 * 60, 250, abnormal=True), 250)
+        self.addCleanup(EEGRecording.evict, path)
+        self.analysis = EEGAnalysis.objects.create(user=doctor, patient=patient, edf_file='eeg_records/rec.edf')
+        self.client = APIClient()
+        self.client.force_authenticate(doctor)
+
+    def get(self, **params):
+        response = self.client.get(f'/api/v1/analysis/records/{self.analysis.id}/signal_data/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_binary_encodings_carry_the_json_samples(self):
+        viewport = {'start': 5, 'end': 25, 'channels': 'EEG FP1-REF,EEG F7-REF', 'max_points': 800}
+        expected = np.asarray(self.get(**viewport).json()['data'], dtype=np.float32)
+
+        response = self.get(format='eegbin', **viewport)
+        self.assertEqual(response['Content-Type'], 'application/vnd.eeg-signal')
+        magic, version, header, samples = decode_signal(response.content)
+        self.assertEqual((magic, version, header['dtype'], header['kind']), (b'EEGS', 1, 'float32', 'minmax'))
+        self.assertEqual(header['channels'], ['EEG FP1-REF', 'EEG F7-REF'])
+        np.testing.assert_array_equal(samples, expected)
+
+        _, _, header, samples = decode_signal(self.get(format='eegbin', dtype='int16', compression='zlib', **viewport).content)
+        self.assertEqual((header['dtype'], header['compression']), ('int16', 'zlib'))
+        np.testing.assert_allclose(samples, expected, atol=np.abs(expected).max() / 32767)
+
+    def test_pyramid_serves_the_same_viewports_as_the_edf(self):
+        viewports = [{'start': 1, 'end': 3}, {'start': 0, 'end': 60, 'max_points': 500}]
+        from_edf = [self.get(**v).json() for v in viewports]
+        build_pyramid(EEGRecording.open(self.analysis.edf_file.path), pyramid_directory(self.analysis))
+        for viewport, expected in zip(viewports, from_edf):
+            with self.subTest(**viewport):
+                served = self.get(**viewport).json()
+                self.assertEqual(served['kind'], expected['kind'])
+                self.assertEqual(len(served['data']), len(expected['data']))
+                if served['kind'] == 'raw':
+                    np.testing.assert_allclose(served['data'], expected['data'], rtol=1e-6)
+                else:
+                    # Envelope buckets follow the pyramid levels; the extremes are the same
+                    np.testing.assert_allclose(np.min(served['data'], axis=1), np.min(expected['data'], axis=1), rtol=1e-6)
+                    np.testing.assert_allclose(np.max(served['data'], axis=1), np.max(expected['data'], axis=1), rtol=1e-6)
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import shutil
+import uuid
+from functools import partial
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from apps.ai_engine.edf import EDF_HEADER_BYTES, EDF_SIGNAL_HEADER_BYTES, read_edf_header
+from .models import EEGAnalysis, UploadSession
+from .tasks import queue_analysis
+
+READ_CHUNK = 1 << 20
+
+class UploadError(ValueError):
+    pass
+
+class UploadConflict(UploadError):
+    """The client's offset does not match what the server has stored."""
+
+    def __init__(self, message, received_bytes):
+        super().__init__(message)
+        self.received_bytes = received_bytes
+
+def hash_uploaded_file(upload):
+    """sha256 of a Django ``UploadedFile``, read chunk by chunk."""
+    hasher = hashlib.sha256()
+    for block in upload.chunks(READ_CHUNK):
+        hasher.update(block)
+    upload.seek(0)
+    return hasher.hexdigest()
+
+def find_stored_copy(sha256):
+    """Storage name of a recording already on disk with this content, if any."""
+    names = (
+        EEGAnalysis.objects.filter(file_hash=sha256).exclude(edf_file='')
+        .values_list('edf_file', flat=True).distinct()
+    )
+    return next((name for name in names if default_storage.exists(name)), None)
+
+def start_upload(user, patient, filename, total_size):
+    """Reserve the final storage name for the recording and open an upload session."""
+    if total_size <= 0 or total_size > settings.EEG_UPLOAD['MAX_FILE_SIZE']:
+        raise UploadError("File size out of range")
+    name = EEGAnalysis._meta.get_field('edf_file').generate_filename(None, os.path.basename(filename))
+    name = default_storage.get_available_name(name)
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return UploadSession.objects.create(
+        user=user, patient=patient, filename=filename, file_name=name, total_size=total_size,
+    )
+
+def write_chunk(session, offset, stream, length, checksum=None):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset``. The chunk is
+    streamed into a private part file first (no lock is held while the
+    client sends it) and discarded if its sha256 does not match
+    ``checksum``; it is then copied into the upload under a row lock on the
+    session, so two requests for the same offset cannot overwrite each
+    other. Returns the created ``EEGAnalysis`` once the last chunk is in,
+    otherwise None.
+    """
+    if session.status != 'uploading':
+        raise UploadError(f"Upload is {session.status}")
+    if offset != session.received_bytes:
+        raise UploadConflict("Offset mismatch", session.received_bytes)
+    if length <= 0 or length > settings.EEG_UPLOAD['MAX_CHUNK_SIZE']:
+        raise UploadError("Chunk size out of range")
+    if offset + length > session.total_size:
+        raise UploadError("Chunk runs past the declared file size")
+
+    path = default_storage.path(session.file_name)
+    part = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        chunk_hasher = hashlib.sha256()
+        written = 0
+        with open(part, 'wb') as f:
+            while written < length:
+                block = stream.read(min(READ_CHUNK, length - written))
+                if not block:
+                    break
+                f.write(block)
+                chunk_hasher.update(block)
+                written += len(block)
+        if written != length:
+            raise UploadError(f"Incomplete chunk: {written} of {length} bytes")
+        if checksum and chunk_hasher.hexdigest() != checksum.lower():
+            raise UploadError("Chunk checksum mismatch")
+
+        with transaction.atomic():
+            locked = UploadSession.objects.select_for_update().get(id=session.id)
+            if locked.status != 'uploading':
+                raise UploadError(f"Upload is {locked.status}")
+            if locked.received_bytes != offset:
+                # A duplicate request got here first
+                session.received_bytes = locked.received_bytes
+                raise UploadConflict("Offset mismatch", locked.received_bytes)
+            with open(part, 'rb') as src, open(path, 'r+b') as dst:
+                dst.seek(offset)
+                shutil.copyfileobj(src, dst, READ_CHUNK)
+            locked.received_bytes = offset + length
+            locked.save(update_fields=['received_bytes', 'updated_at'])
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    session.received_bytes = offset + length
+
+    if session.edf_header is None and session.filename.lower().endswith('.edf'):
+        _check_header(session, path)
+    if session.received_bytes == session.total_size:
+        # Hashed once, here: chunks may land on any worker process
+        return _finish(session, _file_sha256(path))
+    return None
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def _check_header(session, path):
+    """Parse the EDF header as soon as enough bytes are in; reject non-EDF uploads early."""
+    if session.received_bytes < EDF_HEADER_BYTES:
+        return
+    with open(path, 'rb') as f:
+        head = f.read(EDF_HEADER_BYTES)
+        try:
+            n_signals = int(head[252:256].decode('ascii').strip())
+        except ValueError:
+            n_signals = 0
+        if 0 < n_signals and session.received_bytes < EDF_HEADER_BYTES + n_signals * EDF_SIGNAL_HEADER_BYTES:
+            return
+        f.seek(0)
+        try:
+            info, _ = read_edf_header(f, size=session.total_size)
+        except ValueError as e:
+            abort_upload(session)
+            raise UploadError(f"Invalid EDF file: {e}")
+    session.edf_header = info
+    UploadSession.objects.filter(id=session.id).update(edf_header=info)
+
+def _finish(session, sha256):
+    header = session.edf_header or {}
+    with transaction.atomic():
+        # Identical content is stored once; drop this copy once the analysis points at the other
+        stored = find_stored_copy(sha256)
+        if stored and stored != session.file_name:
+            transaction.on_commit(partial(default_storage.delete, session.file_name))
+            session.file_name = stored
+        analysis = EEGAnalysis.objects.create(
+            user=session.user,
+            patient=session.patient,
+            edf_file=session.file_name,
+            file_size=str(session.total_size),
+            file_hash=sha256,
+            channels_count=header.get('channels_count'),
+            sampling_rate=header.get('sampling_rate'),
+            duration_seconds=header.get('duration_seconds'),
+        )
+        session.status = 'completed'
+        session.sha256 = sha256
+        session.analysis = analysis
+        session.save(update_fields=['status', 'sha256', 'analysis', 'file_name', 'updated_at'])
+        queue_analysis(analysis)
+    return analysis
+
+def abort_upload(session):
+    """Drop an unfinished upload and its partial file; a completed upload cannot be aborted."""
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(id=session.id)
+        if locked.status == 'completed':
+            raise UploadError("Upload is already completed")
+        if locked.status == 'uploading':
+            default_storage.delete(locked.file_name)
+        locked.status = 'aborted'
+        locked.save(update_fields=['status', 'updated_at'])
+    session.status = 'aborted'
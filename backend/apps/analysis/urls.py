@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EEGAnalysisViewSet
+from .views import EEGAnalysisViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 router.register('records', EEGAnalysisViewSet, basename='analysis')
+router.register('uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,107 +1,302 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import EEGAnalysis, SpectralResult
-from .serializers import EEGAnalysisSerializer
-from apps.ai_engine.services import EEGProcessorService
-import threading
-from django.utils import timezone
+from rest_framework.settings import api_settings
+from django.db import transaction
+from django.db.models import Avg, BigIntegerField, Count, Q, Sum
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from functools import partial
+import os
+import numpy as np
+from .models import EEGAnalysis, SpectralResult, BandPowerTimeline, UploadSession
+from .renderers import SignalBinaryRenderer
+from core.pagination import NewestFirstCursorPagination
+from .serializers import EEGAnalysisListSerializer, EEGAnalysisSerializer, UploadSessionSerializer
+from .uploads import (
+    UploadConflict, UploadError, abort_upload, find_stored_copy, hash_uploaded_file, start_upload, write_chunk,
+)
+from .tasks import queue_analysis, queue_pyramid_build, pyramid_directory
+
+MAX_VIEWPORT_POINTS = 20000
 
 class EEGAnalysisViewSet(viewsets.ModelViewSet):
     serializer_class = EEGAnalysisSerializer
-    
+    pagination_class = NewestFirstCursorPagination
+
     def get_queryset(self):
-        return EEGAnalysis.objects.filter(user=self.request.user)
+        queryset = EEGAnalysis.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            return queryset.select_related('patient')
+        return queryset.select_related('patient__doctor', 'spectral_data').prefetch_related('patient__records')
 
-    def perform_create(self, serializer):
-        analysis = serializer.save(user=self.request.user)
-        
-        # Start background processing
-        thread = threading.Thread(target=self.process_eeg, args=(analysis.id,))
-        thread.start()
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return EEGAnalysisListSerializer
+        return EEGAnalysisSerializer
 
-    def process_eeg(self, analysis_id):
-        try:
-            analysis = EEGAnalysis.objects.get(id=analysis_id)
-            analysis.status = 'processing'
-            analysis.save()
-            
-            # 1. Extract Metadata
-            meta = EEGProcessorService.extract_metadata(analysis.edf_file.path)
-            analysis.channels_count = meta.get('channels_count')
-            analysis.sampling_rate = meta.get('sampling_rate')
-            analysis.duration_seconds = meta.get('duration_seconds')
-            
-            # 2. Perform AI Inference
-            results = EEGProcessorService.calculate_spectral_bands(analysis.edf_file.path)
-            
-            analysis.seizure_probability = results['seizure_probability']
-            
-            # Generate Clinical Summary
-            summary = "Tahlil yakunlandi. "
-            if results['seizure_probability'] > 0.7:
-                summary += "DIQQAT: Yuqori darajadagi epileptiform faollik (seizure) aniqlandi. "
-            elif results['seizure_probability'] > 0.3:
-                summary += "O'rtacha darajadagi asinxroniya kuzatildi. "
-            else:
-                summary += "Ritmik faollik normal chegarada. "
-                
-            summary += f"Dominant Alpha kuchi: {results['alpha_power']:.2f} μV². "
-            if results['beta_power'] > results['alpha_power']:
-                summary += "Beta to'lqinlarining ustunligi taranglik yoki dori ta'sirini ko'rsatishi mumkin. "
-            
-            analysis.ai_summary = summary
-            
-            # 3. Create Spectral Results
-            SpectralResult.objects.create(
-                analysis=analysis,
-                alpha_power=results['alpha_power'],
-                beta_power=results['beta_power'],
-                theta_power=results['theta_power'],
-                delta_power=results['delta_power']
+    def perform_create(self, serializer):
+        upload = serializer.validated_data['edf_file']
+        sha256 = hash_uploaded_file(upload)
+        # Identical content is stored once: point at the existing file instead of saving another copy
+        stored = find_stored_copy(sha256)
+        with transaction.atomic():
+            analysis = serializer.save(
+                user=self.request.user, file_hash=sha256, file_size=str(upload.size),
+                **({'edf_file': stored} if stored else {}),
             )
-            
-            analysis.status = 'completed'
-            analysis.completed_at = timezone.now()
-            analysis.save()
-            
-        except Exception as e:
-            import traceback
-            analysis.status = 'error'
-            analysis.ai_summary = f"Xatolik: {str(e)}"
-            print(f"EEG Processing Error: {traceback.format_exc()}")
-            analysis.save()
+            # Hand off to the worker pool (python manage.py run_workers)
+            queue_analysis(analysis)
 
-    @action(detail=True, methods=['get'])
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Totals over all of the user's analyses (the list is paginated, so
+        clients must not count pages): per-status counts, the mean seizure
+        probability of completed analyses and the stored bytes.
+        """
+        queryset = EEGAnalysis.objects.filter(user=request.user)
+        counts = dict(queryset.order_by().values_list('status').annotate(n=Count('id')))
+        totals = queryset.aggregate(
+            avg_seizure_probability=Avg('seizure_probability', filter=Q(status='completed')),
+        )
+        # file_size is stored as text; rows from before it was recorded are skipped
+        sized = queryset.filter(file_size__regex=r'^[0-9]+$').aggregate(
+            total_bytes=Sum(Cast('file_size', BigIntegerField()))
+        )
+        return Response({
+            'total': sum(counts.values()),
+            'by_status': {value: counts.get(value, 0) for value, _ in EEGAnalysis.STATUS_CHOICES},
+            'avg_seizure_probability': totals['avg_seizure_probability'],
+            'total_bytes': sized['total_bytes'] or 0,
+        })
+
+    @action(detail=True, methods=['post'])
+    def reanalyze(self, request, pk=None):
+        """Run the pipeline again; stages whose parameters did not change come from the stage cache."""
+        analysis = self.get_object()
+        if analysis.status in ('pending', 'processing'):
+            return Response({"error": "Analysis is already queued"}, status=status.HTTP_409_CONFLICT)
+        with transaction.atomic():
+            analysis.status = 'pending'
+            analysis.save(update_fields=['status'])
+            queue_analysis(analysis, reuse=False)
+        return Response(self.get_serializer(analysis).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=True, methods=['get'],
+        renderer_classes=list(api_settings.DEFAULT_RENDERER_CLASSES) + [SignalBinaryRenderer],
+    )
     def signal_data(self, request, pk=None):
-        """Return sampled signal data for visualization."""
-        import mne
-        import numpy as np
+        """
+        Return a viewport of the signal for visualization.
+
+        Query params: ``start`` / ``end`` in seconds (default: first 10 s),
+        ``channels`` as comma-separated names or indices (default: all) and
+        ``max_points`` per channel (default 1000). Served from the precomputed
+        min/max pyramid; the EDF is only read while that is still being built.
+        JSON by default; see ``SignalBinaryRenderer`` for the binary format.
+        """
+        from apps.ai_engine.pyramid import SignalPyramid, query_recording
+        from apps.ai_engine.recording import EEGRecording
         
         analysis = self.get_object()
         
         try:
-            raw = mne.io.read_raw_edf(analysis.edf_file.path, preload=True, verbose=False)
-            
-            # Subsample for performance (take every Nth sample)
-            sfreq = raw.info['sfreq']
-            data = raw.get_data()
-            
-            # Take max 10 seconds of data, subsampled
-            max_samples = int(min(10 * sfreq, data.shape[1]))
-            step = max(1, int(sfreq / 100))  # ~100 samples per second for display
-            
-            sampled_data = data[:, :max_samples:step].tolist()
-            ch_names = raw.ch_names
-            
-            return Response({
-                "channels": ch_names,
-                "data": sampled_data,
-                "sfreq": sfreq,
-                "duration": raw.times[-1],
-                "samples_per_channel": len(sampled_data[0]) if sampled_data else 0
-            })
+            directory = pyramid_directory(analysis)
+            if SignalPyramid.exists(directory):
+                source = SignalPyramid(directory)
+                query = source.query
+            else:
+                queue_pyramid_build(analysis)
+                source = EEGRecording.open(analysis.edf_file.path)
+                query = partial(query_recording, source)
+
+            start, end, picks, max_points = parse_viewport(request.query_params, source)
+            first = int(np.floor(start * source.sfreq))
+            last = min(source.n_times, int(np.ceil(end * source.sfreq)) + 1)
+            data, t0, dt, kind = query(first, last, picks, max_points)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             import traceback
             print(f"Signal Data Error: {traceback.format_exc()}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "channels": [source.ch_names[i] for i in picks],
+            # Kept as an array: the JSON renderer lists it, the binary one packs it
+            "data": data,
+            "sfreq": source.sfreq,
+            "duration": source.duration,
+            "samples_per_channel": data.shape[1],
+            "start": start,
+            "end": end,
+            "t0": t0,
+            "dt": dt,
+            "kind": kind,
+        })
+
+    @action(detail=True, methods=['get'])
+    def spectral_features(self, request, pk=None):
+        """
+        Per-channel x per-band features stored when the analysis ran: absolute
+        and relative band power, peak frequency and band ratios. Optional
+        ``channels`` / ``bands`` (comma-separated names) narrow the result.
+        The signal is never re-read.
+        """
+        from apps.ai_engine.features import select_features
+
+        analysis = self.get_object()
+        stored = (
+            SpectralResult.objects.filter(analysis=analysis)
+            .values_list('spectral_json', flat=True).first()
+        )
+        if not stored:
+            return Response({"error": "Spectral features are not available for this analysis"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            features = select_features(stored, request.query_params.get('channels'), request.query_params.get('bands'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(features)
+
+    @action(
+        detail=True, methods=['get'],
+        renderer_classes=list(api_settings.DEFAULT_RENDERER_CLASSES) + [SignalBinaryRenderer],
+    )
+    def band_timeline(self, request, pk=None):
+        """
+        Band power per sliding window per channel (a compact spectrogram).
+        Readable while the analysis is still running: only finished windows
+        are returned. Optional ``start`` / ``end`` (seconds) and ``channels``
+        (comma-separated names) narrow it; ``data`` is [channel][band][window].
+        """
+        analysis = self.get_object()
+        timeline = BandPowerTimeline.objects.filter(analysis=analysis).first()
+        if not timeline:
+            return Response({"error": "Band timeline is not available for this analysis"}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        try:
+            start = max(0.0, float(params.get('start', 0)))
+            end = float(params.get('end', np.inf))
+        except ValueError:
+            return Response({"error": "start and end must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        picks = list(range(len(timeline.channels)))
+        if params.get('channels'):
+            names = [c.strip() for c in params['channels'].split(',')]
+            unknown = [c for c in names if c not in timeline.channels]
+            if unknown:
+                return Response({"error": f"Unknown channels: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+            picks = [timeline.channels.index(c) for c in names]
+
+        # Window k covers [k * step, k * step + window) seconds
+        step = timeline.step_seconds
+        first = int(np.ceil(start / step))
+        last = timeline.windows_done
+        if np.isfinite(end):
+            last = min(last, int(np.floor((end - timeline.window_seconds) / step)) + 1)
+        last = max(first, last)
+
+        values = np.load(os.path.join(settings.MEDIA_ROOT, timeline.data_file), mmap_mode='r')
+        data = np.ascontiguousarray(values[first:last][:, picks].transpose(1, 2, 0))
+        return Response({
+            "channels": [timeline.channels[i] for i in picks],
+            "bands": timeline.bands,
+            "window_seconds": timeline.window_seconds,
+            "step_seconds": step,
+            "times": (np.arange(first, last) * step).tolist(),
+            "windows_done": timeline.windows_done,
+            "n_windows": timeline.n_windows,
+            "complete": timeline.windows_done >= timeline.n_windows,
+            "data": data,
+        })
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked EDF upload.
+
+    1. ``POST /uploads/`` with ``patient``, ``filename``, ``total_size``
+    2. ``PUT /uploads/<id>/chunk/`` with the raw bytes as body, an
+       ``Upload-Offset`` header and optionally ``Upload-Checksum: sha256 <hex>``.
+       A 409 carries the server's ``received_bytes`` to resume from; the
+       response to the last chunk includes the queued ``analysis``.
+    3. ``GET /uploads/<id>/`` to recover the offset after an interruption,
+       ``DELETE`` to abandon the upload.
+    """
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        try:
+            serializer.instance = start_upload(
+                self.request.user, data['patient'], data['filename'], data['total_size']
+            )
+        except UploadError as e:
+            raise ValidationError({"error": str(e)})
+
+    def perform_destroy(self, instance):
+        try:
+            abort_upload(instance)
+        except UploadError as e:
+            raise ValidationError({"error": str(e)})
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"error": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+        checksum = request.headers.get('Upload-Checksum', '').strip()
+        if checksum:
+            algorithm, _, checksum = checksum.partition(' ')
+            if algorithm.lower() != 'sha256' or not checksum:
+                return Response({"error": "Only 'sha256 <hex>' checksums are supported"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read the raw request stream so the chunk is never buffered in memory
+            analysis = write_chunk(session, offset, request._request, length, checksum.strip())
+        except UploadConflict as e:
+            return Response({"error": str(e), "received_bytes": e.received_bytes}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response(
+                {"error": str(e), "received_bytes": session.received_bytes}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = UploadSessionSerializer(session, context={'request': request}).data
+        if analysis:
+            data['analysis'] = EEGAnalysisSerializer(analysis, context={'request': request}).data
+        return Response(data)
+
+def parse_viewport(params, source):
+    """Validate signal_data query params against a recording or pyramid."""
+    try:
+        start = max(0.0, float(params.get('start', 0)))
+        end = min(source.duration, float(params.get('end', start + 10)))
+        max_points = int(params.get('max_points', 1000))
+    except (TypeError, ValueError):
+        raise ValueError("start, end and max_points must be numbers")
+    if end <= start:
+        raise ValueError("end must be greater than start and within the recording")
+    max_points = min(max(max_points, 2), MAX_VIEWPORT_POINTS)
+
+    channels = params.get('channels')
+    if not channels:
+        return start, end, list(range(len(source.ch_names))), max_points
+    picks = []
+    for item in channels.split(','):
+        item = item.strip()
+        if item in source.ch_names:
+            picks.append(source.ch_names.index(item))
+        elif item.isdigit() and int(item) < len(source.ch_names):
+            picks.append(int(item))
+        else:
+            raise ValueError(f"Unknown channel: {item}")
+    return start, end, picks, max_points
@@ -3,8 +3,8 @@ from .models import Patient, MedicalRecord
 
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
-    list_display = ('fullname', 'doctor', 'gender', 'created_at')
-    list_filter = ('gender', 'created_at')
+    list_display = ('fullname', 'doctor', 'gender', 'latest_analysis_status', 'created_at')
+    list_filter = ('gender', 'latest_analysis_status', 'created_at')
     search_fields = ('fullname', 'phone')
 
 @admin.register(MedicalRecord)
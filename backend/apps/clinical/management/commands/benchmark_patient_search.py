@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.clinical.models import Patient
+
+BATCH = 20000
+FIRST_NAMES = ('Aziz', 'Dilnoza', 'Jasur', 'Kamola', 'Otabek', 'Malika', 'Sardor', 'Nodira', 'Bekzod', 'Zarina')
+LAST_NAMES = ('Karimov', 'Rahimova', 'Toshmatov', 'Yusupova', 'Aliyev', 'Saidova', 'Ergashev', 'Nazarova')
+STATUSES = ('completed',) * 90 + ('error',) * 5 + ('pending',) * 3 + ('',) * 2
+
+# (label, query params) of the patient list filters
+QUERIES = (
+    ('no filter', {}),
+    ('search common name', {'search': 'karimov'}),
+    ('search rare name', {'search': 'ergashev zarina'}),
+    ('search without matches', {'search': 'xolmatov'}),
+    ('search 2 characters', {'search': 'ov'}),
+    ('search phone fragment', {'search': '12345'}),
+    ('birth date range (1 year)', {'birth_date_from': '1980-01-01', 'birth_date_to': '1980-12-31'}),
+    ('gender', {'gender': 'F'}),
+    ('latest status error', {'latest_status': 'error'}),
+    ('latest status none', {'latest_status': 'none'}),
+    ('gender + latest status + search', {'gender': 'M', 'latest_status': 'completed', 'search': 'aziz'}),
+)
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = (
+        "Time the patient list search / filters for one doctor with a large clinic "
+        "(default 100k patients) inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        n = options['patients']
+        self.stdout.write(f"Database: {connection.vendor}, {n} patients for one doctor")
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                doctor = get_user_model().objects.create(username='bench-search', email='bench-search@example.com')
+                self.populate(doctor, n)
+                self.stdout.write(f"  populated in {time.perf_counter() - started:.1f} s")
+                client = APIClient()
+                client.force_authenticate(doctor)
+                for label, params in QUERIES:
+                    best, rows = None, 0
+                    for _ in range(max(1, options['repeat'])):
+                        started = time.perf_counter()
+                        response = client.get('/api/v1/clinical/patients/', params)
+                        elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                        rows = len(response.data['results'])
+                    self.stdout.write(f"  {label}: {best * 1000:.1f} ms ({rows} rows on the first page)")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def populate(self, doctor, n):
+        rng = random.Random(0)
+        # Spread creation times (auto_now_add would give every row the same one)
+        created_at = Patient._meta.get_field('created_at')
+        created_at.auto_now_add = False
+        try:
+            now = timezone.now()
+            for start in range(0, n, BATCH):
+                Patient.objects.bulk_create([
+                    Patient(
+                        doctor=doctor,
+                        fullname=f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}",
+                        gender=rng.choice('MF'),
+                        birth_date=date(1940, 1, 1) + timedelta(days=rng.randrange(30000)),
+                        phone=f"+9989{rng.randrange(10 ** 8):08d}",
+                        latest_analysis_status=rng.choice(STATUSES),
+                        created_at=now - timedelta(minutes=n - i),
+                    )
+                    for i in range(start, min(start + BATCH, n))
+                ])
+        finally:
+            created_at.auto_now_add = True
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE clinical_patient')
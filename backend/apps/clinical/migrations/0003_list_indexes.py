@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['doctor', '-created_at'], name='clinical_pa_doctor__3f1dc0_idx'),
+        ),
+    ]
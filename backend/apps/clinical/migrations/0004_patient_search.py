@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+import logging
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+# Matches the lookups' SQL on PostgreSQL: UPPER("fullname"::text) LIKE UPPER(%s)
+TRIGRAM_COLUMNS = ('fullname', 'phone')
+
+SQLITE_TRIGGERS = (
+    """CREATE TRIGGER clinical_patient_search_ai AFTER INSERT ON clinical_patient BEGIN
+        INSERT INTO clinical_patient_search(rowid, fullname, phone) VALUES (new.id, new.fullname, new.phone);
+    END""",
+    """CREATE TRIGGER clinical_patient_search_ad AFTER DELETE ON clinical_patient BEGIN
+        INSERT INTO clinical_patient_search(clinical_patient_search, rowid, fullname, phone)
+        VALUES ('delete', old.id, old.fullname, old.phone);
+    END""",
+    """CREATE TRIGGER clinical_patient_search_au AFTER UPDATE OF fullname, phone ON clinical_patient BEGIN
+        INSERT INTO clinical_patient_search(clinical_patient_search, rowid, fullname, phone)
+        VALUES ('delete', old.id, old.fullname, old.phone);
+        INSERT INTO clinical_patient_search(rowid, fullname, phone) VALUES (new.id, new.fullname, new.phone);
+    END""",
+)
+
+def backfill_latest_status(apps, schema_editor):
+    Patient = apps.get_model('clinical', 'Patient')
+    EEGAnalysis = apps.get_model('analysis', 'EEGAnalysis')
+    latest = EEGAnalysis.objects.filter(patient=OuterRef('pk')).order_by('-created_at', '-id').values('status')[:1]
+    Patient.objects.update(latest_analysis_status=Coalesce(Subquery(latest), Value('')))
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Substring search indexes: trigram GIN indexes on PostgreSQL, an FTS5
+    trigram table kept in sync by triggers on SQLite (skipped if this SQLite
+    build lacks it; searches then scan).
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS clinical_patient_{column}_trgm '
+                f'ON clinical_patient USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE clinical_patient_search USING fts5("
+                    "fullname, phone, content='clinical_patient', content_rowid='id', tokenize='trigram')"
+                )
+            except OperationalError as e:
+                # "no such module: fts5" (or no trigram tokenizer): anything else is a real failure
+                logger.warning("Patient search index not created (%s); searches will scan", e)
+                return
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+        schema_editor.execute("INSERT INTO clinical_patient_search(clinical_patient_search) VALUES ('rebuild')")
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS clinical_patient_{column}_trgm')
+    elif vendor == 'sqlite':
+        for name in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS clinical_patient_search_{name}')
+        schema_editor.execute('DROP TABLE IF EXISTS clinical_patient_search')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0007_list_indexes'),
+        ('clinical', '0003_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='clinical_pa_doctor__3f1dc0_idx',
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='latest_analysis_status',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['doctor', '-created_at', '-id'], name='clinical_pa_doctor__ca727e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['doctor', 'gender', '-created_at', '-id'], name='clinical_pa_doctor__b2c625_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['doctor', 'latest_analysis_status', '-created_at', '-id'], name='clinical_pa_doctor__cf0381_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['doctor', 'birth_date'], name='clinical_pa_doctor__6ebf1a_idx'),
+        ),
+        migrations.RunPython(backfill_latest_status, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
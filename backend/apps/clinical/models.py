@@ -14,12 +14,22 @@ class Patient(models.Model):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     phone = models.CharField(max_length=20, null=True, blank=True)
     address = models.TextField(null=True, blank=True)
+    # Status of the newest EEG analysis ('' if none), kept in sync by apps.analysis.signals
+    latest_analysis_status = models.CharField(max_length=20, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        # Each filter of the patient list, in the list's cursor ordering; substring search on
+        # fullname / phone uses trigram indexes created by migration 0004 (see search.py)
+        indexes = [
+            models.Index(fields=['doctor', '-created_at', '-id']),
+            models.Index(fields=['doctor', 'gender', '-created_at', '-id']),
+            models.Index(fields=['doctor', 'latest_analysis_status', '-created_at', '-id']),
+            models.Index(fields=['doctor', 'birth_date']),
+        ]
 
     def __str__(self):
         return self.fullname
@@ -0,0 +1,28 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 trigram index over fullname / phone, kept current by triggers (migration 0004)
+SQLITE_SEARCH_TABLE = 'clinical_patient_search'
+SQLITE_SEARCH_TRIGGER = 'clinical_patient_search_ai'
+
+def _sqlite_index_ready(connection):
+    # Rebuilding clinical_patient in a later SQLite migration drops the triggers; searching
+    # then falls back to a scan instead of reading a stale index
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s", [SQLITE_SEARCH_TRIGGER])
+        return cursor.fetchone() is not None
+
+def search_patients(queryset, term):
+    """
+    Case-insensitive substring search over fullname and phone. On PostgreSQL
+    the lookups use the trigram GIN indexes; on SQLite terms of 3+ characters
+    go through the FTS5 trigram table, shorter ones scan the doctor's patients.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite' and len(term) >= 3 and _sqlite_index_ready(connection):
+        phrase = '"' + term.replace('"', '""') + '"'
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s", (phrase,),
+        ))
+    return queryset.filter(Q(fullname__icontains=term) | Q(phone__icontains=term))
@@ -13,4 +13,22 @@ class PatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = '__all__'
+        read_only_fields = ('doctor', 'latest_analysis_status')
+
+class PatientListSerializer(serializers.ModelSerializer):
+    """Patient list rows: no nested medical records."""
+    doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+
+    class Meta:
+        model = Patient
+        fields = (
+            'id', 'doctor', 'doctor_name', 'fullname', 'birth_date', 'gender', 'phone',
+            'latest_analysis_status', 'created_at', 'updated_at',
+        )
         read_only_fields = ('doctor',)
+
+class PatientSummarySerializer(serializers.ModelSerializer):
+    """The few patient fields shown next to an analysis."""
+    class Meta:
+        model = Patient
+        fields = ('id', 'fullname', 'birth_date', 'gender')
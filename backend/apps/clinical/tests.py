@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import Patient
+from .search import SQLITE_SEARCH_TABLE
+
+class PatientListTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.doctor = User.objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='unused')
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def patient(self, fullname, phone=None, doctor=None):
+        return Patient.objects.create(doctor=doctor or self.doctor, fullname=fullname, phone=phone, gender='M')
+
+    def search(self, term):
+        response = self.client.get('/api/v1/clinical/patients/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return {row['fullname'] for row in response.data['results']}
+
+    def test_search_matches_substrings_of_name_and_phone(self):
+        self.patient("Aliyev Jasur", phone='+998901234567')
+        self.patient("Karimova Dilnoza", phone='+998935550011')
+        self.patient("Aliyeva Madina", doctor=self.other)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search('LIYE'), {"Aliyev Jasur"})
+        if connection.vendor == 'sqlite':
+            # Terms of 3+ characters go through the FTS5 trigram index
+            self.assertTrue(any(SQLITE_SEARCH_TABLE in q['sql'] for q in queries))
+        self.assertEqual(self.search('5550'), {"Karimova Dilnoza"})
+        self.assertEqual(self.search('AL'), {"Aliyev Jasur"})  # short terms scan
+        self.assertEqual(self.search('"x'), set())
+
+    def test_search_index_follows_edits_and_deletes(self):
+        patient = self.patient("Tursunov Bekzod")
+        patient.fullname = "Rahimov Bekzod"
+        patient.save()
+        self.assertEqual(self.search('tursun'), set())
+        self.assertEqual(self.search('rahim'), {"Rahimov Bekzod"})
+        patient.delete()
+        self.assertEqual(self.search('rahim'), set())
+
+    def test_cursor_pages_are_stable_while_rows_are_added(self):
+        created = [self.patient(f"Patient {i}") for i in range(7)]
+        seen = []
+        url, params = '/api/v1/clinical/patients/', {'page_size': 3}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            if len(seen) == 3:
+                # A patient added mid-walk belongs before the first page; nothing shifts
+                self.patient("Late patient")
+            url, params = response.data['next'], None
+        newest_first = sorted(created, key=lambda p: (p.created_at, p.id), reverse=True)
+        self.assertEqual(seen, [p.id for p in newest_first])
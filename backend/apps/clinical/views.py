@@ -1,16 +1,84 @@
+from django.db.models import Count
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from apps.analysis.models import EEGAnalysis
+from core.pagination import NewestFirstCursorPagination
 from .models import Patient, MedicalRecord
-from .serializers import PatientSerializer, MedicalRecordSerializer
+from .search import search_patients
+from .serializers import PatientSerializer, PatientListSerializer, MedicalRecordSerializer
 
 class PatientViewSet(viewsets.ModelViewSet):
     serializer_class = PatientSerializer
-    
+    pagination_class = NewestFirstCursorPagination
+
     def get_queryset(self):
-        return Patient.objects.filter(doctor=self.request.user)
+        queryset = Patient.objects.filter(doctor=self.request.user).select_related('doctor')
+        if self.action == 'list':
+            return queryset
+        return queryset.prefetch_related('records')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PatientListSerializer
+        return PatientSerializer
+
+    def filter_queryset(self, queryset):
+        """
+        List filters, each backed by an index on (doctor, ...):
+
+        - ``search``: case-insensitive substring of fullname or phone
+        - ``birth_date_from`` / ``birth_date_to``: inclusive ISO date range
+        - ``gender``: M, F or O
+        - ``latest_status``: status of the newest analysis, or ``none``
+        """
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+
+        search = params.get('search', '').strip()
+        if search:
+            queryset = search_patients(queryset, search)
+        for param, lookup in (('birth_date_from', 'birth_date__gte'), ('birth_date_to', 'birth_date__lte')):
+            if params.get(param):
+                try:
+                    value = parse_date(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise ValidationError({param: "Expected a date (YYYY-MM-DD)"})
+                queryset = queryset.filter(**{lookup: value})
+        gender = params.get('gender')
+        if gender:
+            if gender not in dict(Patient.GENDER_CHOICES):
+                raise ValidationError({'gender': f"Expected one of {', '.join(dict(Patient.GENDER_CHOICES))}"})
+            queryset = queryset.filter(gender=gender)
+        status = params.get('latest_status')
+        if status:
+            statuses = {value for value, _ in EEGAnalysis.STATUS_CHOICES}
+            if status != 'none' and status not in statuses:
+                raise ValidationError({'latest_status': f"Expected none or one of {', '.join(sorted(statuses))}"})
+            queryset = queryset.filter(latest_analysis_status='' if status == 'none' else status)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(doctor=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Patient totals for dashboards: the count and the count per latest analysis status."""
+        counts = dict(
+            Patient.objects.filter(doctor=request.user).order_by()
+            .values_list('latest_analysis_status').annotate(n=Count('id'))
+        )
+        return Response({
+            'total': sum(counts.values()),
+            'by_latest_status': {status or 'none': n for status, n in counts.items()},
+        })
+
 class MedicalRecordViewSet(viewsets.ModelViewSet):
     serializer_class = MedicalRecordSerializer
     queryset = MedicalRecord.objects.all()
@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Event
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'channel', 'created_at')
+    search_fields = ('channel',)
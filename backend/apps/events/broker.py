@@ -0,0 +1,218 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:  # only needed for the 'redis' backend
+    redis = None
+
+class Subscription:
+    """Events for a set of channels, delivered to one asyncio consumer."""
+
+    def __init__(self, channels, maxsize=1000):
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client; it is told to resynchronise instead of blocking publishers
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+class Hub:
+    """Thread-safe fan-out of events to the subscriptions of this process."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+
+    @property
+    def active(self):
+        return bool(self._subscriptions)
+
+    def dispatch(self, event):
+        with self._lock:
+            targets = list(self._subscriptions.get(event['channel'], ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # The subscriber's loop closed before it unsubscribed
+                self.unsubscribe(subscription)
+
+hub = Hub()
+
+class MemoryBackend:
+    """Publisher and subscribers share one process (development, single-process servers)."""
+
+    def __init__(self, config):
+        self.config = config
+
+    def publish(self, event):
+        hub.dispatch(event)
+
+    def start(self):
+        pass
+
+class _ListenerBackend:
+    """Backends whose events arrive on a background listener thread, started on first subscription."""
+
+    def __init__(self, config):
+        self.config = config
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen_forever, name='event-listener', daemon=True)
+                self._thread.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self.listen()
+            except Exception as e:
+                print(f"Event listener error: {e}")
+                time.sleep(self.config['POLL_INTERVAL'])
+
+    def listen(self):
+        raise NotImplementedError
+
+class DatabaseBackend(_ListenerBackend):
+    """
+    Events are rows of ``Event``; each web process polls for new rows once per
+    ``POLL_INTERVAL`` while it has subscribers, whatever their number.
+    Works across worker processes without extra infrastructure. Publishers
+    also delete rows older than ``KEEP_MINUTES``, at most once a minute.
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._purged_at = 0.0
+
+    def publish(self, event):
+        from .models import Event
+        from .tasks import purge_old_events
+
+        Event.objects.create(channel=event['channel'], data=event)
+        if time.monotonic() - self._purged_at >= self.PURGE_INTERVAL:
+            self._purged_at = time.monotonic()
+            purge_old_events()
+
+    def listen(self):
+        from .models import Event
+
+        last_id = Event.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        while True:
+            time.sleep(self.config['POLL_INTERVAL'])
+            if not hub.active:
+                continue
+            close_old_connections()
+            for event_id, data in Event.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'data'):
+                last_id = event_id
+                hub.dispatch(data)
+
+class RedisBackend(_ListenerBackend):
+    """Events go through one Redis pub/sub channel (``REDIS_URL``, ``REDIS_CHANNEL``)."""
+
+    def __init__(self, config):
+        if redis is None:
+            raise ImproperlyConfigured("The 'redis' events backend requires the redis package")
+        super().__init__(config)
+        self.client = redis.Redis.from_url(config['REDIS_URL'])
+
+    def publish(self, event):
+        self.client.publish(self.config['REDIS_CHANNEL'], json.dumps(event))
+
+    def listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.config['REDIS_CHANNEL'])
+        for message in pubsub.listen():
+            hub.dispatch(json.loads(message['data']))
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+    'redis': RedisBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """The configured backend: a name from ``BACKENDS`` or a dotted path to a class."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = settings.EVENTS['BACKEND']
+            cls = BACKENDS[name] if name in BACKENDS else import_string(name)
+            _backend = cls(settings.EVENTS)
+        return _backend
+
+_progress_sent = {}
+_progress_lock = threading.Lock()
+
+def _throttled(key):
+    """True if a progress event for ``key`` went out less than ``PROGRESS_INTERVAL`` seconds ago."""
+    now = time.monotonic()
+    interval = settings.EVENTS['PROGRESS_INTERVAL']
+    with _progress_lock:
+        if now - _progress_sent.get(key, -interval) < interval:
+            return True
+        _progress_sent[key] = now
+        if len(_progress_sent) > 1000:
+            for stale in [k for k, sent in _progress_sent.items() if now - sent >= interval]:
+                del _progress_sent[stale]
+    return False
+
+def publish(channel, throttle=False, **data):
+    """
+    Publish a status event on ``channel`` once the current transaction
+    commits. Failures are logged and never propagate to the publisher.
+
+    ``throttle`` marks a progress-only update: it is dropped when one for the
+    same channel and ``id`` was published less than ``PROGRESS_INTERVAL``
+    seconds ago. Events carry the full state, so the next one catches up.
+    """
+    if throttle and _throttled((channel, data.get('id'))):
+        return
+    event = {'channel': channel, 'time': timezone.now().isoformat(), **data}
+
+    def send():
+        try:
+            get_backend().publish(event)
+        except Exception as e:
+            print(f"Event publish error ({channel}): {e}")
+
+    transaction.on_commit(send)
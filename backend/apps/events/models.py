@@ -0,0 +1,13 @@
+from django.db import models
+
+class Event(models.Model):
+    """
+    A published status event, used by the 'database' broker backend to reach
+    web processes other than the publisher's. Rows are short-lived.
+    """
+    channel = models.CharField(max_length=100)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.channel} #{self.id}"
@@ -0,0 +1,11 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from apps.jobs.registry import sweeper
+from .models import Event
+
+@sweeper
+def purge_old_events():
+    """Events only matter to listeners polling right now; keep a short window."""
+    cutoff = timezone.now() - timedelta(minutes=settings.EVENTS['KEEP_MINUTES'])
+    Event.objects.filter(created_at__lt=cutoff).delete()
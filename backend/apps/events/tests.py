@@ -0,0 +1,53 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from . import broker
+from .views import _authenticate
+
+class StreamTicketTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.ticket = client.post('/api/v1/events/ticket/').data['ticket']
+
+    def authenticate(self, **params):
+        return _authenticate(RequestFactory().get('/api/v1/events/stream/', params))
+
+    def test_ticket_opens_the_stream_only_while_fresh(self):
+        self.assertEqual(self.authenticate(ticket=self.ticket), self.user)
+        with override_settings(EVENTS={**settings.EVENTS, 'TICKET_SECONDS': -1}):
+            self.assertIsNone(self.authenticate(ticket=self.ticket))
+        self.assertIsNone(self.authenticate(ticket=self.ticket + 'x'))
+
+    def test_access_token_is_not_accepted_in_the_url(self):
+        token = str(AccessToken.for_user(self.user))
+        self.assertIsNone(self.authenticate(token=token))
+        self.assertIsNone(self.authenticate(ticket=token))
+        response = self.client.get('/api/v1/events/stream/', {'channels': 'training', 'token': token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(APIClient().post('/api/v1/events/ticket/').status_code, 401)
+
+class PublishThrottleTests(TestCase):
+    def setUp(self):
+        broker._progress_sent.clear()
+
+    def test_progress_ticks_are_rate_limited_but_status_changes_are_not(self):
+        sent = []
+        backend = mock.Mock(publish=sent.append)
+        with mock.patch.object(broker, 'get_backend', return_value=backend), \
+                self.captureOnCommitCallbacks(execute=True):
+            for progress in range(10):
+                broker.publish('training', throttle=True, id=1, progress_percentage=progress)
+            broker.publish('training', throttle=True, id=2, progress_percentage=50)
+            broker.publish('training', id=1, status='completed', progress_percentage=100)
+
+        self.assertEqual(
+            [(e['id'], e['progress_percentage']) for e in sent],
+            [(1, 0), (2, 50), (1, 100)],
+        )
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import StreamTicketView, event_stream
+
+urlpatterns = [
+    path('stream/', event_stream, name='event-stream'),
+    path('ticket/', StreamTicketView.as_view(), name='event-ticket'),
+]
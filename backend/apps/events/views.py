@@ -0,0 +1,126 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from apps.users.authentication import CachedJWTAuthentication
+from .broker import get_backend, hub
+
+# Tickets are signed for this purpose only: they open a stream and nothing else
+TICKET_SALT = 'apps.events.stream-ticket'
+
+class StreamTicketView(APIView):
+    """
+    ``POST /api/v1/events/ticket/``: a ticket for opening one event stream.
+    ``EventSource`` cannot send headers, so the stream URL carries this
+    short-lived ticket instead of the access token.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ticket = signing.TimestampSigner(salt=TICKET_SALT).sign(str(request.user.pk))
+        return Response({"ticket": ticket, "expires_in": settings.EVENTS['TICKET_SECONDS']})
+
+def _authenticate(request):
+    """
+    The user of a ``ticket`` query parameter (see ``StreamTicketView``) or,
+    for clients that can send headers, of the ``Authorization`` JWT.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=settings.EVENTS['TICKET_SECONDS'])
+        except signing.BadSignature:
+            return None
+        return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    raw = auth.get_raw_token(header) if header else None
+    if not raw:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError):
+        return None
+
+def _allowed_channels(user, requested):
+    """
+    Resolve requested channels for ``user``:
+
+    - ``analyses``: every analysis of the user (``user:<id>``)
+    - ``analysis:<id>``: one of the user's analyses
+    - ``training``: all training sessions
+    """
+    from apps.analysis.models import EEGAnalysis
+
+    channels = set()
+    for name in filter(None, (c.strip() for c in requested.split(','))):
+        if name == 'analyses':
+            channels.add(f'user:{user.id}')
+        elif name == 'training':
+            channels.add('training')
+        elif name.startswith('analysis:') and name[9:].isdigit():
+            if not EEGAnalysis.objects.filter(id=int(name[9:]), user=user).exists():
+                raise PermissionError(f"Unknown analysis: {name[9:]}")
+            channels.add(name)
+        else:
+            raise ValueError(f"Unknown channel: {name}")
+    if not channels:
+        raise ValueError("No channels requested")
+    return channels
+
+def _format(event):
+    kind = event['channel'].split(':', 1)[0]
+    return f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+
+async def event_stream(request):
+    """
+    Server-Sent Events stream of status / progress / log updates.
+
+    ``GET /api/v1/events/stream/?channels=analysis:12,training&ticket=<ticket>``.
+    Each message's ``event`` is the channel kind ('analysis', 'user',
+    'training') and its data the JSON event. A ``resync`` event means updates
+    were dropped and the client should refetch. Requires an ASGI server.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided or are invalid"}, status=401)
+    try:
+        channels = await sync_to_async(_allowed_channels)(user, request.GET.get('channels', ''))
+    except PermissionError as e:
+        return JsonResponse({"error": str(e)}, status=403)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    get_backend().start()
+    subscription = hub.subscribe(channels)
+    heartbeat = settings.EVENTS['HEARTBEAT_SECONDS']
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                yield _format(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
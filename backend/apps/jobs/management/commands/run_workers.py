@@ -0,0 +1,31 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.jobs.worker import WorkerPool
+
+class Command(BaseCommand):
+    help = "Run the background job worker pool (EEG analysis, dataset ingest, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS['PROCESSES'] or os.cpu_count(),
+            help="Number of worker processes, i.e. the maximum number of jobs running at once.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOBS['POLL_INTERVAL'],
+            help="Seconds an idle worker waits before polling the queue again.",
+        )
+        parser.add_argument(
+            '--max-jobs-per-child', type=int, default=settings.JOBS['MAX_JOBS_PER_CHILD'],
+            help="Recycle a worker process after this many jobs (0 = never).",
+        )
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(
+            processes=max(1, options['processes']),
+            poll_interval=options['poll_interval'],
+            max_jobs_per_child=options['max_jobs_per_child'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(f"Starting {pool.processes} worker process(es)")
+        pool.run()
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+def _option(key):
+    return settings.JOBS[key]
+
+def enqueue(task_name, payload=None, max_attempts=None, delay=0):
+    """Persist a job for the worker pool. Returns the created ``Job``."""
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        max_attempts=max_attempts or _option('MAX_ATTEMPTS'),
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+def claim_next(worker_id):
+    """
+    Atomically lease the oldest runnable job to ``worker_id``.
+    Uses a conditional UPDATE so it is race-free on SQLite and PostgreSQL alike.
+    """
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            heartbeat_at=now,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+def heartbeat(job_id, worker_id):
+    Job.objects.filter(id=job_id, locked_by=worker_id, status='running').update(heartbeat_at=timezone.now())
+
+def mark_done(job, worker_id):
+    """
+    Finish a job leased by ``worker_id``. Returns False when the lease was lost
+    (the job was requeued as stale and may belong to another worker by now).
+    """
+    return bool(Job.objects.filter(id=job.id, locked_by=worker_id, status='running').update(
+        status='done', finished_at=timezone.now(), locked_by=None, last_error=None
+    ))
+
+def retry_delay(attempts):
+    delay = _option('RETRY_BACKOFF') * (2 ** max(attempts - 1, 0))
+    return min(delay, _option('RETRY_BACKOFF_MAX'))
+
+def mark_failed(job, error):
+    """
+    Schedule a retry with exponential backoff. Returns False once attempts
+    are exhausted and the job is marked as permanently failed.
+    """
+    now = timezone.now()
+    running = Job.objects.filter(id=job.id, status='running')
+    if job.attempts < job.max_attempts:
+        running.update(
+            status='queued',
+            locked_by=None,
+            last_error=error,
+            run_after=now + timedelta(seconds=retry_delay(job.attempts)),
+        )
+        return True
+    running.update(status='failed', locked_by=None, last_error=error, finished_at=now)
+    return False
+
+def requeue_stale():
+    """
+    Requeue jobs whose worker stopped sending heartbeats (crash, OOM kill, deploy).
+    Returns the jobs that ran out of attempts so their failure hooks can run.
+    """
+    cutoff = timezone.now() - timedelta(seconds=_option('STALE_AFTER'))
+    exhausted = []
+    for job in Job.objects.filter(status='running', heartbeat_at__lt=cutoff):
+        if not mark_failed(job, "Worker lost (heartbeat timeout)"):
+            exhausted.append(job)
+    return exhausted
+
+def purge_finished():
+    cutoff = timezone.now() - timedelta(days=_option('KEEP_FINISHED_DAYS'))
+    Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
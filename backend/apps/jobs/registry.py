@@ -0,0 +1,34 @@
+from django.utils.module_loading import autodiscover_modules
+
+_tasks = {}
+_sweepers = []
+
+def task(name, on_failure=None):
+    """
+    Register a function as a queue task under ``name``.
+    ``on_failure(error, **payload)`` runs once the job has exhausted its retries.
+    """
+    def decorator(func):
+        _tasks[name] = func
+        func.task_name = name
+        func.on_failure = on_failure
+        return func
+    return decorator
+
+def sweeper(func):
+    """Register a callable the worker supervisor runs periodically to recover lost work."""
+    _sweepers.append(func)
+    return func
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f"Unknown task: {name}")
+
+def get_sweepers():
+    return list(_sweepers)
+
+def autodiscover():
+    # Every installed app may ship a tasks.py module registering handlers
+    autodiscover_modules('tasks')
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'status', 'attempts', 'max_attempts', 'last_error', 'created_at', 'started_at', 'finished_at')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if data['last_error'] and not (request and request.user.is_staff):
+            # Tracebacks name file paths and internals; clinicians get the exception line only
+            data['last_error'] = data['last_error'].strip().splitlines()[-1]
+        return data
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import queue
+from .models import Job
+
+class QueueLeaseTests(TestCase):
+    def test_claim_leases_oldest_runnable_job_once(self):
+        first = queue.enqueue('test.task', {'n': 1})
+        queue.enqueue('test.task', {'n': 2})
+        queue.enqueue('test.task', {'n': 3}, delay=60)
+
+        claimed = queue.claim_next('w1')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.locked_by, claimed.attempts), ('running', 'w1', 1))
+        self.assertEqual(queue.claim_next('w2').payload, {'n': 2})
+        # The delayed job is not runnable yet
+        self.assertIsNone(queue.claim_next('w3'))
+
+    def test_only_the_leasing_worker_marks_done(self):
+        queue.enqueue('test.task')
+        job = queue.claim_next('w1')
+
+        self.assertFalse(queue.mark_done(job, 'w2'))
+        self.assertEqual(Job.objects.get(id=job.id).status, 'running')
+        self.assertTrue(queue.mark_done(job, 'w1'))
+        self.assertEqual(Job.objects.get(id=job.id).status, 'done')
+
+    def test_failures_retry_with_backoff_until_attempts_run_out(self):
+        queue.enqueue('test.task', max_attempts=2)
+        job = queue.claim_next('w1')
+
+        self.assertTrue(queue.mark_failed(job, 'boom'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        job = queue.claim_next('w1')
+        self.assertFalse(queue.mark_failed(job, 'boom again'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('failed', 'boom again'))
+
+    def test_stale_leases_are_requeued(self):
+        queue.enqueue('test.task')
+        job = queue.claim_next('w1')
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(queue.requeue_stale(), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('queued', None))
+        # The old worker finishing late must not overwrite the requeued job
+        self.assertFalse(queue.mark_done(job, 'w1'))
+
+class JobViewSetTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        self.staff = User.objects.create_user(username='ops', email='ops@example.com', password='unused', is_staff=True)
+        self.job = queue.enqueue('test.task', {'archive': '/srv/uploads/x.zip'})
+        Job.objects.filter(id=self.job.id).update(last_error='Traceback (most recent call last):\n  ...\nValueError: bad archive')
+        self.client = APIClient()
+
+    def test_list_is_staff_only_and_paginated(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/v1/jobs/').status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/v1/jobs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.job.id])
+
+    def test_clinicians_poll_a_job_without_its_traceback(self):
+        self.client.force_authenticate(self.user)
+        data = self.client.get(f'/api/v1/jobs/{self.job.id}/').data
+        self.assertEqual(data['last_error'], 'ValueError: bad archive')
+        self.assertNotIn('payload', data)
+
+        self.client.force_authenticate(self.staff)
+        self.assertIn('Traceback', self.client.get(f'/api/v1/jobs/{self.job.id}/').data['last_error'])
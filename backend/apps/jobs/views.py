@@ -0,0 +1,19 @@
+from rest_framework import viewsets
+from rest_framework.permissions import IsAdminUser
+from core.pagination import NewestFirstCursorPagination
+from .models import Job
+from .serializers import JobSerializer
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of background jobs, e.g. the handle returned by a dataset upload.
+    Listing the queue is staff-only; anyone holding a job id may poll it.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = NewestFirstCursorPagination
+
+    def get_permissions(self):
+        if self.action == 'list':
+            return [IsAdminUser()]
+        return super().get_permissions()
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from importlib import import_module
+from django.conf import settings
+from django.db import close_old_connections, connections
+from . import queue, registry
+
+def run_job(job, worker_id):
+    """Execute a leased job while a side thread keeps its heartbeat fresh."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(settings.JOBS['HEARTBEAT_INTERVAL']):
+            try:
+                queue.heartbeat(job.id, worker_id)
+            except Exception as e:
+                print(f"[{worker_id}] Heartbeat failed for job {job.id}: {e}")
+        connections.close_all()
+
+    beater = threading.Thread(target=beat, daemon=True)
+    beater.start()
+    try:
+        func = registry.get_task(job.task)
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        print(f"[{worker_id}] Job {job.id} ({job.task}) failed:\n{error}")
+        if not queue.mark_failed(job, error):
+            run_failure_hook(job, error)
+    else:
+        if not queue.mark_done(job, worker_id):
+            print(f"[{worker_id}] Job {job.id} ({job.task}) finished after its lease was lost; left to its new owner")
+    finally:
+        stop.set()
+        beater.join()
+
+def run_failure_hook(job, error):
+    try:
+        hook = registry.get_task(job.task).on_failure
+        if hook:
+            hook(error, **job.payload)
+    except Exception:
+        print(f"Failure hook for job {job.id} ({job.task}) raised:\n{traceback.format_exc()}")
+
+def sweep():
+    """Recover jobs from dead workers and let apps requeue work that never reached the queue."""
+    for job in queue.requeue_stale():
+        run_failure_hook(job, job.last_error or "Worker lost")
+    queue.purge_finished()
+    for func in registry.get_sweepers():
+        try:
+            func()
+        except Exception:
+            print(f"Sweeper {func.__name__} raised:\n{traceback.format_exc()}")
+
+def worker_main(worker_id, stop_event, poll_interval, max_jobs):
+    """Entry point of a single worker process: one job at a time until told to stop."""
+    import django
+    django.setup()
+    registry.autodiscover()
+
+    # Ctrl+C reaches the whole process group; let the supervisor decide when we stop.
+    # Handlers only flip a flag: setting the shared Event from inside a signal
+    # handler can deadlock against a wait() that already holds its lock.
+    terminated = []
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: terminated.append(True))
+
+    processed = 0
+    while not (terminated or stop_event.is_set()):
+        close_old_connections()
+        job = queue.claim_next(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job, worker_id)
+        processed += 1
+        if max_jobs and processed >= max_jobs:
+            # Recycle the process to hand fragmented numpy/MNE memory back to the OS
+            break
+    connections.close_all()
+
+class WorkerPool:
+    """Supervises a fixed number of worker processes, restarting them when they exit."""
+
+    def __init__(self, processes, poll_interval, max_jobs_per_child=0, stdout=None):
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.max_jobs_per_child = max_jobs_per_child
+        self.stdout = stdout
+        self.stop_event = multiprocessing.Event()
+        self.stopping = False
+        self.children = {}
+        self.prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def spawn(self, slot):
+        worker_id = f"{self.prefix}:{slot}"
+        # Forked children must not share the parent's database sockets
+        connections.close_all()
+        proc = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_id, self.stop_event, self.poll_interval, self.max_jobs_per_child),
+            name=f"eeg-worker-{slot}",
+        )
+        proc.start()
+        self.children[slot] = proc
+        self.log(f"Started worker {worker_id} (pid {proc.pid})")
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        registry.autodiscover()
+        # Task modules defer their heavy imports; load them once here so forked workers share them
+        for name in settings.JOBS['PRELOAD_MODULES']:
+            import_module(name)
+
+        for slot in range(self.processes):
+            self.spawn(slot)
+
+        last_sweep = 0
+        while not self.stopping:
+            if time.monotonic() - last_sweep >= settings.JOBS['SWEEP_INTERVAL']:
+                sweep()
+                close_old_connections()
+                last_sweep = time.monotonic()
+            for slot, proc in list(self.children.items()):
+                if not proc.is_alive() and not self.stopping:
+                    self.log(f"Worker {slot} exited with code {proc.exitcode}, restarting")
+                    self.spawn(slot)
+            time.sleep(1)
+
+        self.stop_event.set()
+        self.log("Shutting down, waiting for running jobs to finish...")
+        for proc in self.children.values():
+            proc.join()
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+def user_cache():
+    return caches[settings.AUTH_USER_CACHE['ALIAS']]
+
+def forget_cached_user(user_id):
+    """Drop a user from the token authentication cache (see apps.users.signals)."""
+    user_cache().delete(user_cache_key(user_id))
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` resolving the token's user from the cache for up to
+    ``AUTH_USER_CACHE['TIMEOUT']`` seconds instead of loading the row on every
+    request. Saving or deleting a user evicts it at once; the timeout bounds
+    staleness for bulk ``update()`` calls. Disabled by default unless a shared
+    ``CACHE_BACKEND`` is configured, since evictions from a process-local
+    cache would not reach other workers.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        timeout = settings.AUTH_USER_CACHE['TIMEOUT']
+        key = user_cache_key(user_id)
+        user = user_cache().get(key) if timeout else None
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            if timeout:
+                user_cache().set(key, user, timeout)
+
+        # The same checks as JWTAuthentication, applied to cached users too
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -1,17 +1,35 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
 
 User = get_user_model()
 
 class EmailBackend(ModelBackend):
+    """
+    Log in with an email address or a username, resolved in one query. Also
+    the only password backend, so a failed login hashes the password once.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Check if 'username' is actually an email
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            # Fallback to standard username check
-            return super().authenticate(request, username, password, **kwargs)
-        except Exception:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        # An email match wins over another account using it as its username.
+        # Usernames are unique, so three rows are enough to see a duplicated email.
+        candidates = sorted(
+            User.objects.filter(Q(email=username) | Q(username=username))[:3],
+            key=lambda user: user.email != username,
+        )
+        if len(candidates) > 1 and candidates[1].email == username:
+            # Several accounts share this email: refuse rather than pick one
+            User().set_password(password)
+            return None
+        if not candidates:
+            # Hash anyway so response time does not reveal whether the account exists
+            User().set_password(password)
             return None
+        user = candidates[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
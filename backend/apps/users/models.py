@@ -18,6 +18,8 @@ class User(AbstractUser):
         db_table = 'auth_user'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        # EmailBackend looks users up by email or username
+        indexes = [models.Index(fields=['email'])]
 
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
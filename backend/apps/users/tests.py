@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import user_cache
+
+@override_settings(AUTH_USER_CACHE={'ALIAS': 'default', 'TIMEOUT': 60})
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache().clear()
+        self.addCleanup(user_cache().clear)
+        self.user = get_user_model().objects.create_user(username='doctor', email='doctor@example.com', password='unused')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def me(self):
+        return self.client.get('/api/v1/users/me/')
+
+    def test_user_row_is_loaded_once(self):
+        self.assertEqual(self.me().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me().data['username'], 'doctor')
+
+    def test_saving_the_user_evicts_it(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.me().status_code, 401)
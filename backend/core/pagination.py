@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+class NewestFirstCursorPagination(CursorPagination):
+    """
+    Keyset pagination over ``-created_at`` (``id`` breaks ties): each page is
+    one indexed range scan however deep the client pages, and rows created
+    meanwhile never shift or repeat entries. ``?page_size=`` up to 200.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
     'apps.clinical',
     'apps.analysis',
     'apps.ai_engine',
+    'apps.jobs',
+    'apps.events',
 ]
 
 AUTH_USER_MODEL = 'users.User'
@@ -72,16 +74,45 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres selects PostgreSQL through psycopg 3 (see requirements.txt).
+# Connections persist for DB_CONN_MAX_AGE seconds, or come from a per-process
+# pool when DB_POOL_MAX_SIZE > 0. The SQLite default runs in WAL mode so
+# readers do not block on the worker's progress writes; transaction_mode
+# needs Django 5.1.
+if os.environ.get('DB_ENGINE', 'sqlite') == 'postgres':
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'med_taxlil'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # A pool owns its connections, so persistent connections are off with it
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {'min_size': 1, 'max_size': DB_POOL_MAX_SIZE, 'timeout': 10},
+            } if DB_POOL_MAX_SIZE else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
     }
-}
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -103,11 +134,28 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# EmailBackend accepts a username too (and keeps ModelBackend's permission checks)
 AUTHENTICATION_BACKENDS = [
     'apps.users.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Process-local by default; CACHE_BACKEND / CACHE_LOCATION select a shared cache
+# (e.g. django.core.cache.backends.redis.RedisCache) so evictions reach every worker
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Users resolved from access tokens are cached for TIMEOUT seconds (0 disables),
+# evicted when saved or deleted. Off by default with the process-local cache,
+# where an eviction would only reach the process that saved the user.
+AUTH_USER_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60 if 'CACHE_BACKEND' in os.environ else 0)),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -129,3 +177,99 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True # For development
+
+# Parsed EDF recordings kept open per process (see apps.ai_engine.recording)
+EEG_RECORDING_CACHE_SIZE = 4
+
+# Block length for streamed filtering / Welch PSD; bounds peak memory per analysis
+EEG_STREAM_CHUNK_SECONDS = 60
+
+# Threads per analysis for filtering / PSD / band power, split by channel groups
+# (0 = one per CPU core); keep JOBS['PROCESSES'] x this within the host's cores
+EEG_SPECTRAL_N_JOBS = int(os.environ.get('EEG_SPECTRAL_N_JOBS', 1))
+
+# Memory-mapped min/max pyramids served by the signal viewer
+EEG_PYRAMID_ROOT = MEDIA_ROOT / 'eeg_pyramids'
+
+# Resumable chunked EDF uploads (sizes in bytes; abandoned uploads are removed after STALE_HOURS)
+EEG_UPLOAD = {
+    'CHUNK_SIZE': 8 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 64 * 1024 * 1024,
+    'MAX_FILE_SIZE': 8 * 1024 ** 3,
+    'STALE_HOURS': 48,
+}
+
+# Per-stage analysis outputs (filtered signal, PSD, band features, model scores)
+# keyed on file hash + stage parameters; least recently used entries are evicted
+# beyond MAX_BYTES (0 disables the cache). The filtered signal is as large as
+# the decoded recording, so it is only cached with STORE_FILTERED
+EEG_STAGE_CACHE = {
+    'ROOT': MEDIA_ROOT / 'stage_cache',
+    'MAX_BYTES': int(os.environ.get('EEG_STAGE_CACHE_MAX_BYTES', 20 * 1024 ** 3)),
+    'STORE_FILTERED': os.environ.get('EEG_STAGE_CACHE_STORE_FILTERED', '') == '1',
+}
+
+# Time-resolved band power (window length 2 - 10 s, overlap fraction 0 - 0.9)
+EEG_BAND_TIMELINE = {
+    'WINDOW_SECONDS': 4.0,
+    'OVERLAP': 0.5,
+    'ROOT': MEDIA_ROOT / 'eeg_timelines',
+}
+
+# CPU inference with the active EEGNetSmall (windows per forward pass, torch threads;
+# 0 keeps torch's default, model versions kept loaded per worker). RUNTIME is
+# 'eager', 'torchscript' or 'onnx' (needs onnxruntime); INT8 enables dynamic
+# quantization. Compiled runtimes must match eager scores within PARITY_TOLERANCE.
+EEG_INFERENCE = {
+    'BATCH_SIZE': int(os.environ.get('EEG_INFERENCE_BATCH_SIZE', 256)),
+    'THREADS': int(os.environ.get('EEG_INFERENCE_THREADS', 0)),
+    'CACHE_SIZE': 2,
+    'RUNTIME': os.environ.get('EEG_INFERENCE_RUNTIME', 'eager'),
+    'INT8': os.environ.get('EEG_INFERENCE_INT8', '') == '1',
+    'PARITY_TOLERANCE': 0.02,
+    'ARTIFACT_ROOT': MEDIA_ROOT / 'models' / 'compiled',
+}
+
+# Model training: DataLoader worker processes (0 = one per CPU core), the
+# content-addressed preprocessed segment cache and optimisation settings
+EEG_TRAINING = {
+    'WORKERS': int(os.environ.get('EEG_TRAINING_WORKERS', 0)),
+    'CACHE_ROOT': MEDIA_ROOT / 'segment_cache',
+    'EPOCHS': 5,
+    'BATCH_SIZE': 64,
+    'LEARNING_RATE': 1e-3,
+}
+
+# Background job queue (run with: python manage.py run_workers)
+JOBS = {
+    'PROCESSES': int(os.environ.get('JOBS_PROCESSES', 2)),  # 0 = one per CPU core
+    'POLL_INTERVAL': 1.0,         # seconds
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF': 30,          # seconds, doubled on every retry
+    'RETRY_BACKOFF_MAX': 3600,
+    'HEARTBEAT_INTERVAL': 15,
+    'STALE_AFTER': 120,           # running jobs without a heartbeat for this long are requeued
+    'SWEEP_INTERVAL': 30,
+    'MAX_JOBS_PER_CHILD': 50,
+    'KEEP_FINISHED_DAYS': 7,
+    # Imported by the supervisor before forking workers (web processes never load them)
+    'PRELOAD_MODULES': [
+        'apps.ai_engine.recording',
+        'apps.ai_engine.spectral',
+        'apps.ai_engine.inference',
+    ],
+}
+
+# Status push (Server-Sent Events at /api/v1/events/stream/, served under ASGI).
+# BACKEND: 'memory' (single process), 'database' (default, polled Event rows)
+# or 'redis' (needs the redis package); a dotted class path plugs in another.
+EVENTS = {
+    'BACKEND': os.environ.get('EVENTS_BACKEND', 'database'),
+    'REDIS_URL': os.environ.get('EVENTS_REDIS_URL', 'redis://localhost:6379/0'),
+    'REDIS_CHANNEL': 'eeg-events',
+    'POLL_INTERVAL': 0.5,         # seconds, 'database' backend
+    'KEEP_MINUTES': 10,
+    'HEARTBEAT_SECONDS': 15,
+    'PROGRESS_INTERVAL': 1.0,     # seconds between progress-only events per channel and object
+    'TICKET_SECONDS': 60,         # lifetime of a stream ticket (see apps.events.views)
+}
@@ -16,6 +16,8 @@ urlpatterns = [
     path('api/v1/clinical/', include('apps.clinical.urls')),
     path('api/v1/analysis/', include('apps.analysis.urls')),
     path('api/v1/ai-engine/', include('apps.ai_engine.urls')),
+    path('api/v1/jobs/', include('apps.jobs.urls')),
+    path('api/v1/events/', include('apps.events.urls')),
     
     # Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
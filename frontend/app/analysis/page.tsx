@@ -13,6 +13,7 @@ import { EegSignalPreview } from "@/components/shared/eeg-signal-preview"
 import { EegViewer } from "@/components/viewer/eeg-viewer"
 
 import apiClient from "@/lib/api-client"
+import { subscribeEvents } from "@/lib/events"
 
 type AnalysisState = 'IDLE' | 'UPLOADING' | 'PRE_PROCESSING' | 'NEURAL_INFERENCE' | 'POST_PROCESSING' | 'COMPLETED' | 'ERROR'
 
@@ -20,13 +21,26 @@ export default function AnalysisPage() {
     const [state, setState] = useState<AnalysisState>('IDLE')
     const [results, setResults] = useState<any>(null)
     const [history, setHistory] = useState<any[]>([])
+    const [nextPage, setNextPage] = useState<string | null>(null)
     const [logs, setLogs] = useState<{ time: string, msg: string, type: 'info' | 'warn' | 'success' }[]>([])
     const [pollingId, setPollingId] = useState<number | null>(null)
 
     const fetchHistory = async () => {
         try {
             const response = await apiClient.get("/analysis/records/")
-            setHistory(response.data)
+            setHistory(response.data.results ?? response.data)
+            setNextPage(response.data.next ?? null)
+        } catch (err) {
+            console.error("Failed to fetch history:", err)
+        }
+    }
+
+    const loadMoreHistory = async () => {
+        if (!nextPage) return
+        try {
+            const response = await apiClient.get(nextPage)
+            setHistory(prev => [...prev, ...response.data.results])
+            setNextPage(response.data.next)
         } catch (err) {
             console.error("Failed to fetch history:", err)
         }
@@ -66,6 +80,9 @@ export default function AnalysisPage() {
 
     useEffect(() => {
         if (pollingId) {
+            // Status changes are pushed; fetch the full record when one arrives
+            const close = subscribeEvents([`analysis:${pollingId}`], () => pollAnalysis(pollingId), () => pollAnalysis(pollingId))
+            if (close) return close
             const interval = setInterval(() => pollAnalysis(pollingId), 2000)
             return () => clearInterval(interval)
         }
@@ -359,6 +376,13 @@ export default function AnalysisPage() {
                                                 </div>
                                             ))
                                         )}
+                                        {nextPage && (
+                                            <div className="flex justify-center pt-2">
+                                                <Button variant="outline" className="rounded-2xl font-black" onClick={loadMoreHistory}>
+                                                    Yana yuklash
+                                                </Button>
+                                            </div>
+                                        )}
                                     </div>
                                 </TabsContent>
                             </Tabs>
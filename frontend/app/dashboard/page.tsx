@@ -23,17 +23,19 @@ export default function DashboardPage() {
     useEffect(() => {
         const fetchDashboardData = async () => {
             try {
-                const [patientsRes, analysisRes, modelRes] = await Promise.all([
-                    apiClient.get("/clinical/patients/"),
-                    apiClient.get("/analysis/records/"),
+                // Totals come from the stats endpoints; the lists are paginated
+                const [patientStats, analysisStats, recentRes, modelRes] = await Promise.all([
+                    apiClient.get("/clinical/patients/stats/"),
+                    apiClient.get("/analysis/records/stats/"),
+                    apiClient.get("/analysis/records/", { params: { page_size: 4 } }),
                     apiClient.get("/ai-engine/models/active/")
                 ])
 
                 setStats({
-                    patients: patientsRes.data.length,
+                    patients: patientStats.data.total,
                     accuracy: modelRes.data?.accuracy ? Number((modelRes.data.accuracy * 100).toFixed(1)) : 94.8,
-                    dataSize: `${(analysisRes.data.length * 45.2).toFixed(1)} MB`,
-                    recentAnalyses: analysisRes.data.slice(0, 4)
+                    dataSize: `${(analysisStats.data.total_bytes / (1024 * 1024)).toFixed(1)} MB`,
+                    recentAnalyses: recentRes.data.results ?? recentRes.data
                 })
             } catch (err) {
                 console.error("Dashboard fetch failed:", err)
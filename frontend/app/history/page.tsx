@@ -13,6 +13,8 @@ import apiClient from "@/lib/api-client"
 
 export default function HistoryPage() {
     const [history, setHistory] = useState<any[]>([])
+    const [nextPage, setNextPage] = useState<string | null>(null)
+    const [totals, setTotals] = useState<any>(null)
     const [isLoading, setIsLoading] = useState(true)
     const [expandedId, setExpandedId] = useState<number | null>(null)
     const [searchQuery, setSearchQuery] = useState("")
@@ -20,8 +22,13 @@ export default function HistoryPage() {
     const fetchHistory = useCallback(async () => {
         setIsLoading(true)
         try {
-            const response = await apiClient.get("/analysis/records/")
-            setHistory(response.data)
+            const [response, statsRes] = await Promise.all([
+                apiClient.get("/analysis/records/"),
+                apiClient.get("/analysis/records/stats/")
+            ])
+            setHistory(response.data.results ?? response.data)
+            setNextPage(response.data.next ?? null)
+            setTotals(statsRes.data)
         } catch (err) {
             console.error("Failed to fetch history:", err)
         } finally {
@@ -29,6 +36,20 @@ export default function HistoryPage() {
         }
     }, [])
 
+    const loadMore = async () => {
+        if (!nextPage) return
+        setIsLoading(true)
+        try {
+            const response = await apiClient.get(nextPage)
+            setHistory(prev => [...prev, ...response.data.results])
+            setNextPage(response.data.next)
+        } catch (err) {
+            console.error("Failed to fetch history:", err)
+        } finally {
+            setIsLoading(false)
+        }
+    }
+
     useEffect(() => {
         fetchHistory()
     }, [fetchHistory])
@@ -38,15 +59,14 @@ export default function HistoryPage() {
         item.patient_details?.fullname.toLowerCase().includes(searchQuery.toLowerCase())
     )
 
+    // Aggregates over the whole archive, not just the pages loaded so far
     const stats = {
-        totalSize: (history.length * 45.2).toFixed(1), // Simulated aggregate
-        avgConfidence: history.length > 0
-            ? (history.reduce((acc, curr) => acc + (curr.seizure_probability || 0), 0) / history.length * 100).toFixed(1)
-            : "0",
+        totalSize: ((totals?.total_bytes ?? 0) / (1024 * 1024)).toFixed(1),
+        avgConfidence: ((totals?.avg_seizure_probability ?? 0) * 100).toFixed(1),
         countsByStatus: {
-            completed: history.filter(h => h.status === 'completed').length,
-            error: history.filter(h => h.status === 'error').length,
-            processing: history.filter(h => h.status === 'processing').length
+            completed: totals?.by_status.completed ?? 0,
+            error: totals?.by_status.error ?? 0,
+            processing: (totals?.by_status.processing ?? 0) + (totals?.by_status.pending ?? 0)
         }
     }
 
@@ -55,6 +75,8 @@ export default function HistoryPage() {
             try {
                 await apiClient.delete(`/analysis/records/${id}/`)
                 setHistory(prev => prev.filter(h => h.id !== id))
+                const statsRes = await apiClient.get("/analysis/records/stats/")
+                setTotals(statsRes.data)
             } catch (err) {
                 console.error("Delete failed:", err)
             }
@@ -237,6 +259,14 @@ export default function HistoryPage() {
                                             )}
                                         </tbody>
                                     </table>
+                                    {nextPage && (
+                                        <div className="p-6 flex justify-center">
+                                            <Button variant="outline" className="rounded-2xl font-black" disabled={isLoading} onClick={loadMore}>
+                                                {isLoading ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : null}
+                                                Yana yuklash
+                                            </Button>
+                                        </div>
+                                    )}
                                 </div>
                             )}
                         </MedCard>
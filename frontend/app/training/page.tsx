@@ -1,6 +1,6 @@
 "use client"
 
-import { useEffect, useState, useCallback } from "react"
+import { useEffect, useState, useCallback, useRef } from "react"
 import { MedCard } from "@/components/shared/med-card"
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, AreaChart, Area } from 'recharts';
 import { Database, Cpu, TrendingUp, CheckCircle2, Loader2, Zap, Activity, ShieldCheck, Cpu as CpuIcon, Terminal, PlayCircle, AlertTriangle } from "lucide-react"
@@ -9,6 +9,7 @@ import { BrainSignalBackground } from "@/components/shared/brain-signal-bg"
 import { Button } from "@/components/ui/button"
 import { cn } from "@/lib/utils"
 import apiClient from "@/lib/api-client"
+import { subscribeEvents } from "@/lib/events"
 
 export default function TrainingPage() {
     const [sessions, setSessions] = useState<any[]>([])
@@ -17,14 +18,16 @@ export default function TrainingPage() {
     const [isStarting, setIsStarting] = useState(false)
     const [uploading, setUploading] = useState(false)
     const [datasetType, setDatasetType] = useState<'kaggle' | 'local'>('kaggle')
+    const knownIds = useRef<Set<number>>(new Set())
 
     const fetchSessions = useCallback(async () => {
         try {
             const response = await apiClient.get("/ai-engine/sessions/")
             setSessions(response.data)
+            knownIds.current = new Set(response.data.map((s: any) => s.id))
 
             const active = response.data.find((s: any) =>
-                ['downloading', 'preprocessing', 'training'].includes(s.status)
+                ['downloading', 'ingesting', 'preprocessing', 'training'].includes(s.status)
             ) || response.data[0]
 
             setCurrentSession(active)
@@ -35,11 +38,31 @@ export default function TrainingPage() {
         }
     }, [])
 
+    const applyEvent = useCallback((event: any) => {
+        if (!knownIds.current.has(event.id)) {
+            // A session we have not listed yet
+            fetchSessions()
+            return
+        }
+        const merge = (session: any) => {
+            if (session?.id !== event.id) return session
+            const { channel, time, log_entry, ...fields } = event
+            if (!log_entry) return { ...session, ...fields }
+            // Entries already in the fetched tail are skipped
+            if (log_entry.id <= (session.last_log_id || 0)) return session
+            return { ...session, logs: (session.logs || '') + log_entry.message + '\n', last_log_id: log_entry.id }
+        }
+        setSessions((prev) => prev.map(merge))
+        setCurrentSession((prev: any) => merge(prev))
+    }, [fetchSessions])
+
     useEffect(() => {
         fetchSessions()
+        const close = subscribeEvents(['training'], applyEvent, fetchSessions)
+        if (close) return close
         const interval = setInterval(fetchSessions, 3000)
         return () => clearInterval(interval)
-    }, [fetchSessions])
+    }, [fetchSessions, applyEvent])
 
     const startTraining = async () => {
         setIsStarting(true)
@@ -71,7 +94,7 @@ export default function TrainingPage() {
             })
             setDatasetType('local')
             await fetchSessions()
-            alert("Dataset yuklandi! Endi 'Local Dataset' tanlagan holda o'qitishni boshlashingiz mumkin.")
+            alert("Dataset yuklandi! Arxiv fonda ochilmoqda; jarayon tugagach 'Local Dataset' tanlagan holda o'qitishni boshlashingiz mumkin.")
         } catch (err) {
             console.error("Upload failed:", err)
             alert("Yuklashda xatolik yuz berdi.")
@@ -155,10 +178,10 @@ export default function TrainingPage() {
                             </div>
                             <Button
                                 onClick={startTraining}
-                                disabled={isStarting || ['downloading', 'preprocessing', 'training'].includes(activeSession.status)}
+                                disabled={isStarting || ['downloading', 'ingesting', 'preprocessing', 'training'].includes(activeSession.status)}
                                 className="rounded-3xl h-16 px-10 font-black shadow-2xl shadow-emerald-500/20 micro-interact glow-teal flex gap-3"
                             >
-                                {isStarting || ['downloading', 'preprocessing', 'training'].includes(activeSession.status) ? (
+                                {isStarting || ['downloading', 'ingesting', 'preprocessing', 'training'].includes(activeSession.status) ? (
                                     <Loader2 className="w-6 h-6 animate-spin" />
                                 ) : (
                                     <PlayCircle className="w-6 h-6" />
@@ -8,6 +8,7 @@ import { Progress } from "@/components/ui/progress"
 import { Card, CardContent } from "@/components/ui/card"
 import { cn } from "@/lib/utils"
 import apiClient from "@/lib/api-client"
+import { uploadEdfInChunks } from "@/lib/chunked-upload"
 
 interface EdfUploadProps {
     onSuccess: (data: any) => void
@@ -29,16 +30,14 @@ export function EdfUpload({ onSuccess, onUploadStart }: EdfUploadProps) {
         setStatusMessage("Yuklanmoqda...")
         onUploadStart()
 
-        const formData = new FormData()
-        formData.append("edf_file", file)
-
         try {
             setStatusMessage("Bemorlar ro'yxati tekshirilmoqda...")
-            const patientsRes = await apiClient.get("/clinical/patients/")
+            const patientsRes = await apiClient.get("/clinical/patients/", { params: { page_size: 1 } })
+            const patients = patientsRes.data.results ?? patientsRes.data
             let patientId;
 
-            if (patientsRes.data.length > 0) {
-                patientId = patientsRes.data[0].id
+            if (patients.length > 0) {
+                patientId = patients[0].id
             } else {
                 setStatusMessage("Test bemor yaratilmoqda...")
                 const newPatient = await apiClient.post("/clinical/patients/", {
@@ -49,17 +48,13 @@ export function EdfUpload({ onSuccess, onUploadStart }: EdfUploadProps) {
                 patientId = newPatient.data.id
             }
 
-            formData.append("patient", patientId)
-
             setStatusMessage("EEG fayli yuklanmoqda...")
-            const response = await apiClient.post("/analysis/records/", formData, {
-                headers: {
-                    "Content-Type": "multipart/form-data",
-                },
+            const analysis = await uploadEdfInChunks(file, patientId, (fraction) => {
+                setStatusMessage(`EEG fayli yuklanmoqda... ${Math.round(fraction * 100)}%`)
             })
 
             setStatusMessage("Muvaffaqiyatli!")
-            onSuccess(response.data)
+            onSuccess(analysis)
         } catch (err: any) {
             console.error("Upload error:", err)
             const errorMsg = err?.response?.data?.detail || err?.response?.data?.error || err?.message || "Noma'lum xatolik"
@@ -0,0 +1,61 @@
+import apiClient from "@/lib/api-client"
+
+const MAX_RETRIES = 5
+
+async function sha256Hex(data: ArrayBuffer): Promise<string | null> {
+    // crypto.subtle only exists in secure contexts (https / localhost)
+    if (typeof crypto === "undefined" || !crypto.subtle) return null
+    const digest = await crypto.subtle.digest("SHA-256", data)
+    return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, "0")).join("")
+}
+
+/**
+ * Upload an EDF recording through the resumable chunk protocol
+ * (POST /analysis/uploads/, then PUT .../chunk/ per chunk).
+ * Network failures resume from the offset the server reports.
+ * Resolves with the queued analysis.
+ */
+export async function uploadEdfInChunks(
+    file: File,
+    patientId: number,
+    onProgress?: (fraction: number) => void,
+): Promise<any> {
+    const { data: session } = await apiClient.post("/analysis/uploads/", {
+        patient: patientId,
+        filename: file.name,
+        total_size: file.size,
+    })
+    const chunkSize: number = session.chunk_size
+    let offset = 0
+    let retries = 0
+
+    while (true) {
+        const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer()
+        const checksum = await sha256Hex(chunk)
+        try {
+            const { data } = await apiClient.put(`/analysis/uploads/${session.id}/chunk/`, chunk, {
+                headers: {
+                    "Content-Type": "application/octet-stream",
+                    "Upload-Offset": String(offset),
+                    ...(checksum ? { "Upload-Checksum": `sha256 ${checksum}` } : {}),
+                },
+            })
+            offset = data.received_bytes
+            retries = 0
+            onProgress?.(offset / file.size)
+            if (data.status === "completed") return data.analysis
+        } catch (err: any) {
+            const status = err?.response?.status
+            if (status === 400 && !String(err.response.data?.error).includes("checksum")) throw err
+            if (++retries > MAX_RETRIES) throw err
+            if (status === 409 || status === 400) {
+                offset = err.response.data.received_bytes
+            } else {
+                // Connection dropped: ask the server how far it got
+                await new Promise((resolve) => setTimeout(resolve, 1000 * retries))
+                const { data } = await apiClient.get(`/analysis/uploads/${session.id}/`)
+                offset = data.received_bytes
+            }
+        }
+    }
+}
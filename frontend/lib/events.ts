@@ -0,0 +1,61 @@
+import apiClient from "@/lib/api-client"
+
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'
+
+export type StatusEvent = { channel: string, id: number, [key: string]: any }
+
+/**
+ * Subscribe to server-pushed status events (Server-Sent Events).
+ * ``channels``: 'analyses' (all of the user's analyses), 'analysis:<id>' or 'training'.
+ * ``onResync`` runs when the stream (re)connects or dropped events, so callers
+ * refetch once instead of polling. Returns a function closing the stream, or
+ * null when EventSource is unavailable (callers then fall back to polling).
+ */
+export function subscribeEvents(
+    channels: string[],
+    onEvent: (event: StatusEvent) => void,
+    onResync?: () => void,
+): (() => void) | null {
+    if (typeof window === 'undefined' || typeof EventSource === 'undefined') return null
+    if (!localStorage.getItem('access_token')) return null
+
+    let source: EventSource | null = null
+    let closed = false
+    let retry: ReturnType<typeof setTimeout> | undefined
+
+    // EventSource cannot send the JWT header, so each connection opens with a short-lived stream ticket
+    const connect = async () => {
+        let ticket: string
+        try {
+            ({ data: { ticket } } = await apiClient.post('/events/ticket/'))
+        } catch {
+            if (!closed) retry = setTimeout(connect, 5000)
+            return
+        }
+        if (closed) return
+
+        const params = new URLSearchParams({ channels: channels.join(','), ticket })
+        const current = new EventSource(`${API_BASE_URL}/events/stream/?${params}`)
+        source = current
+        const handle = (message: MessageEvent) => onEvent(JSON.parse(message.data))
+        for (const kind of ['analysis', 'user', 'training']) {
+            current.addEventListener(kind, handle as EventListener)
+        }
+        current.addEventListener('resync', () => onResync?.())
+        // EventSource reconnects by itself; anything published meanwhile is refetched
+        current.onopen = () => onResync?.()
+        // Once the ticket has expired a reconnect is refused and the source closes: fetch a new ticket
+        current.onerror = () => {
+            if (current.readyState === EventSource.CLOSED && !closed) {
+                retry = setTimeout(connect, 3000)
+            }
+        }
+    }
+
+    connect()
+    return () => {
+        closed = true
+        clearTimeout(retry)
+        source?.close()
+    }
+}